@@ -1,26 +1,55 @@
-from flask import Flask, request, jsonify, session
+from flask import Flask, Response, request, jsonify, session, stream_with_context
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
-from models import db, User, Achievement, ChatSession,ChildProfile, DoodleSession, LLMInteractions, ParentChild, SavingGoal, Transaction, HomeworkSchedule, PomodoroSession, ScreenTime, Notification, HealthTask, HealthStreak, WaterLog, LoginStreak, PsychometricTestResult, UserModuleProgress
+from models import db, User, Achievement, ActivityCalendar, ChatSession, ChildProfile, ChildStats, DashboardMetrics, DoodleSession, HealthRollup, LLMInteractions, LLMInteractionArchive, ParentChild, SavingGoal, Transaction, HomeworkSchedule, PomodoroSession, Notification, HealthTask, WaterLog, LoginStreak, PsychometricTestResult, UserModuleProgress
 import re, requests
+import atexit
+import signal
+import sys
 import PIL
 import os
 import random
 import glob
 import base64
 from config import Config
-from openai import OpenAI
 import secrets
+import threading
 import time
 import traceback
-from datetime import datetime, date
-import json
+from contextlib import closing
+from datetime import datetime, date, timedelta
+import click
 
 # NEW: JWT imports
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 
 # Import our psychometry module
 from services.psychometry import PsychometryService
+from services.pomodoro_sweeper import LAST_ACTIVE_BACKFILL, close_stale_sessions
+from services.chat_context import build_chat_messages, build_summary_messages
+from services.counters import (SCREEN_TIME_DEDUPE_STATEMENTS, WATER_LOG_DEDUPE_STATEMENTS, add_screen_time_hours,
+                               ensure_login_streak, increment_water_count, record_login_day)
+from services.dashboard_metrics import rollup_dashboard_metrics, snapshot_to_dict
+from services.child_stats import dashboard_stats, rebuild_child_stats, record_achievement, update_child_stats
+from services.parent_overview import children_overview, parent_children
+from services.chat_search import (SEARCH_STATEMENT, build_match_query, chat_search_available, install_chat_search,
+                                  render_snippet)
+from services.chat_stream import MoodTagFilter, sse_event, split_mood_tag
+from services.conversation_cache import ConversationCache
+from services.health_history import BUCKETS as HISTORY_BUCKETS, DEFAULT_RANGE_DAYS, MAX_DAILY_RANGE_DAYS, METRICS as HISTORY_METRICS, health_history, rebuild_rollups
+from services.health_tasks import HEALTH_TASK_DEDUPE_STATEMENTS, seconds_until, seed_for_active_children, seed_health_tasks
+from services.leaderboard import GLOBAL_SCOPE, LeaderboardCache, family_scope, first_parent_id, load_scores
+from services.llm_gateway import create_gateway
+from services.llm_pool import BoundedExecutor
+from services.pagination import decode_cursor, encode_cursor, parse_limit
+from services.scheduler import Scheduler
+from services.write_buffer import CoalescingBuffer
+from services.streaks import (KINDS as STREAK_KINDS, backfill_from_counters, current_streak, heatmap, load_timeline,
+                              refresh_health_streak, refresh_login_streak, set_active, streak_summary)
+from services.study_time import (DEFAULT_RANGE_DAYS as STUDY_DEFAULT_RANGE_DAYS, MAX_RANGE_DAYS as STUDY_MAX_RANGE_DAYS,
+                                 STARTED_AT_BACKFILL, reopen_session_day, rollup_study_time, study_time_series)
+from services.task_bulk import TASK_STATUSES, apply_operations, validate_operations
+from services.task_list import MAX_RANGE_DAYS as TASK_MAX_RANGE_DAYS, task_to_dict, tasks_by_day, tasks_with_session_stats
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -67,8 +96,20 @@ def missing_token_callback(error):
 
 EMAIL_REGEX = re.compile(r"[^@]+@[^@]+\.[^@]+") 
 
-# Initialize OpenAI client
-client = OpenAI(base_url="https://api.groq.com/openai/v1",api_key=app.config['GROQ_API_KEY'])
+# Shared LLM gateway (Groq / OpenRouter) used by the chatbot and psychometry
+llm_gateway = create_gateway(app.config)
+
+# Bounded pool for LLM calls so slow providers can't exhaust request threads
+llm_pool = BoundedExecutor(app.config['LLM_MAX_WORKERS'], app.config['LLM_MAX_QUEUE'])
+
+# Cleaned context windows of recently active chat sessions
+conversation_cache = ConversationCache(app.config['CHAT_CACHE_MAX_SESSIONS'], app.config['CHAT_CONTEXT_MAX_TURNS'])
+
+# Periodic maintenance jobs, started by start_background_jobs()
+scheduler = Scheduler()
+scheduler_lock = threading.Lock()
+leaderboard_cache = LeaderboardCache(ttl=app.config['LEADERBOARD_CACHE_SECONDS'],
+                                     max_scopes=app.config['LEADERBOARD_MAX_SCOPES'])
 
 # ---------------------------
 # Utility Functions
@@ -107,32 +148,59 @@ def load_chatbot_prompt():
 # Load system prompt from markdown file
 SYSTEM_PROMPT = load_chatbot_prompt()
 
+def make_message_preview(message):
+    """Short preview of a chat message for the session sidebar"""
+    if not message:
+        return ''
+    return message[:50] + '...' if len(message) > 50 else message
+
 @app.route('/api/chat/sessions/<int:user_id>', methods=['GET'])
 def api_chat_sessions(user_id):
-    """Get all chat sessions for a user"""
+    """Get a page of chat sessions for a user, most recently active first.
+
+    Interaction count and last message preview are stored on ChatSession,
+    so a page is a single range scan over (user_id, updated_at, id).
+    Pass the returned `next_cursor` as `cursor` to load the next page.
+    """
     try:
-        sessions = ChatSession.query.filter_by(user_id=user_id)\
-                                   .order_by(ChatSession.updated_at.desc()).all()
+        try:
+            limit = parse_limit(request.args.get('limit'), default=50)
+            cursor = request.args.get('cursor')
+            position = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        query = ChatSession.query.filter_by(user_id=user_id)
+        if position:
+            query = query.filter(db.tuple_(ChatSession.updated_at, ChatSession.id) < position)
+        sessions = query.order_by(ChatSession.updated_at.desc(), ChatSession.id.desc())\
+                        .limit(limit + 1).all()
+        
+        has_more = len(sessions) > limit
+        sessions = sessions[:limit]
         
         sessions_data = []
         for session in sessions:
-            interaction_count = LLMInteractions.query.filter_by(session_id=session.id).count()
-            last_message = LLMInteractions.query.filter_by(session_id=session.id)\
-                                                .order_by(LLMInteractions.user_timestamp.desc()).first()
-            
+            updated_at = session.updated_at or session.created_at
             sessions_data.append({
                 'id': session.id,
                 'created_at': session.created_at.isoformat(),
-                'updated_at': session.updated_at.isoformat() if session.updated_at else session.created_at.isoformat(),
+                'updated_at': updated_at.isoformat(),
                 'mood_tag': session.mood_tag,
-                'interaction_count': interaction_count,
-                'last_message_preview': last_message.user_message[:50] + '...' if last_message and len(last_message.user_message) > 50 else last_message.user_message if last_message else '',
+                'interaction_count': session.interaction_count or 0,
+                'last_message_preview': session.last_message_preview or '',
                 'summary': session.summary
             })
         
+        next_cursor = None
+        if has_more:
+            last = sessions[-1]
+            next_cursor = encode_cursor(last.updated_at or last.created_at, last.id)
+        
         return jsonify({
             'success': True,
-            'sessions': sessions_data
+            'sessions': sessions_data,
+            'next_cursor': next_cursor
         }), 200
     except Exception as e:
         return jsonify({
@@ -140,36 +208,88 @@ def api_chat_sessions(user_id):
             'error': str(e)
         }), 500
 
+def parse_interaction_page_args():
+    """Read `limit`, `before` and `after` cursor arguments for transcript endpoints"""
+    limit = parse_limit(request.args.get('limit'), default=25)
+    before = request.args.get('before')
+    after = request.args.get('after')
+    if before and after:
+        raise ValueError("Use either 'before' or 'after', not both")
+    return limit, decode_cursor(before) if before else None, decode_cursor(after) if after else None
+
+def paginate_interactions(query, limit, before=None, after=None):
+    """Keyset page of interactions ordered by (user_timestamp, id).
+
+    Without cursors the newest `limit` interactions are returned. `before`
+    scrolls back to older interactions and `after` fetches newer ones. The
+    page is returned oldest first together with cursors for both directions
+    (None when there is nothing further that way).
+    """
+    sort_key = db.tuple_(LLMInteractions.user_timestamp, LLMInteractions.id)
+    if after:
+        rows = query.filter(sort_key > after)\
+                    .order_by(LLMInteractions.user_timestamp.asc(), LLMInteractions.id.asc())\
+                    .limit(limit + 1).all()
+        has_newer, has_older = len(rows) > limit, True
+        rows = rows[:limit]
+    else:
+        if before:
+            query = query.filter(sort_key < before)
+        rows = query.order_by(LLMInteractions.user_timestamp.desc(), LLMInteractions.id.desc())\
+                    .limit(limit + 1).all()
+        has_older, has_newer = len(rows) > limit, before is not None
+        rows = list(reversed(rows[:limit]))
+    
+    older_cursor = encode_cursor(rows[0].user_timestamp, rows[0].id) if rows and has_older else None
+    newer_cursor = encode_cursor(rows[-1].user_timestamp, rows[-1].id) if rows and has_newer else None
+    if not rows and after:
+        # Nothing new yet - keep polling from the same position
+        newer_cursor = encode_cursor(*after)
+    return rows, older_cursor, newer_cursor
+
+def interaction_to_messages(interaction, **extra):
+    """Convert an interaction into user/assistant chat messages"""
+    user_message = {
+        'id': f"user_{interaction.id}",
+        'message': interaction.user_message,
+        'sender': 'user',
+        'timestamp': interaction.user_timestamp.isoformat(),
+        **extra
+    }
+    messages = [user_message]
+    
+    # Add bot response if available
+    if interaction.llm_response:
+        messages.append({
+            'id': f"bot_{interaction.id}",
+            'message': interaction.llm_response,
+            'sender': 'assistant',
+            'timestamp': interaction.llm_timestamp.isoformat() if interaction.llm_timestamp else interaction.user_timestamp.isoformat(),
+            **extra
+        })
+    return messages
+
 @app.route('/api/chat/session/<int:session_id>', methods=['GET'])
 def api_get_session(session_id):
-    """Get detailed session with all interactions"""
+    """Get a session with a page of its interactions (newest page by default)"""
     try:
+        try:
+            limit, before, after = parse_interaction_page_args()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
         session = db.session.get(ChatSession, session_id)
         if not session:
             return jsonify({'success': False, 'error': 'Session not found'}), 404
         
-        interactions = LLMInteractions.query.filter_by(session_id=session_id)\
-                                           .order_by(LLMInteractions.user_timestamp.asc()).all()
+        interactions, older_cursor, newer_cursor = paginate_interactions(
+            LLMInteractions.query.filter_by(session_id=session_id), limit, before, after)
         
         messages = []
         for interaction in interactions:
-            # Add user message
-            messages.append({
-                'id': f"user_{interaction.id}",
-                'message': interaction.user_message,
-                'sender': 'user',
-                'timestamp': interaction.user_timestamp.isoformat(),
-                'mood_tag': interaction.mood_tag
-            })
-            
-            # Add bot response if available
-            if interaction.llm_response:
-                messages.append({
-                    'id': f"bot_{interaction.id}",
-                    'message': interaction.llm_response,
-                    'sender': 'assistant',
-                    'timestamp': interaction.llm_timestamp.isoformat() if interaction.llm_timestamp else interaction.user_timestamp.isoformat()
-                })
+            turn = interaction_to_messages(interaction)
+            turn[0]['mood_tag'] = interaction.mood_tag
+            messages.extend(turn)
         
         return jsonify({
             'success': True,
@@ -179,7 +299,9 @@ def api_get_session(session_id):
                 'updated_at': session.updated_at.isoformat() if session.updated_at else session.created_at.isoformat(),
                 'mood_tag': session.mood_tag,
                 'summary': session.summary,
-                'messages': messages
+                'messages': messages,
+                'older_cursor': older_cursor,
+                'newer_cursor': newer_cursor
             }
         }), 200
     except Exception as e:
@@ -202,6 +324,7 @@ def update_session_summary(session_id):
         session.summary = summary
         session.updated_at = datetime.utcnow()
         db.session.commit()
+        conversation_cache.invalidate(session_id)
         
         return jsonify({
             'success': True,
@@ -235,76 +358,28 @@ def chatbot():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/chat/sessions/<int:user_id>', methods=['GET'])
-def get_chat_sessions(user_id):
-    """Get all chat sessions for a user with metadata"""
-    try:
-        sessions = ChatSession.query.filter_by(user_id=user_id)\
-                                   .order_by(ChatSession.updated_at.desc()).all()
-        
-        session_list = []
-        for session in sessions:
-            # Get interaction count
-            interaction_count = LLMInteractions.query.filter_by(session_id=session.id).count()
-            
-            # Get last message preview
-            last_interaction = LLMInteractions.query.filter_by(session_id=session.id)\
-                                                   .order_by(LLMInteractions.user_timestamp.desc()).first()
-            
-            last_message_preview = "New conversation"
-            if last_interaction:
-                preview_text = last_interaction.user_message
-                last_message_preview = (preview_text[:50] + "...") if len(preview_text) > 50 else preview_text
-            
-            session_list.append({
-                'id': session.id,
-                'updated_at': session.updated_at.isoformat(),
-                'interaction_count': interaction_count,
-                'last_message_preview': last_message_preview,
-                'mood_tag': session.mood_tag  # Include mood_tag from session
-            })
-        
-        return jsonify({
-            'success': True,
-            'sessions': session_list
-        }), 200
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
-    
 @app.route('/chat-history/<int:user_id>', methods=['GET'])
 def get_chat_history(user_id):
     """Legacy route - updated for new model"""
     try:
-        # Get recent interactions across all sessions
-        interactions = db.session.query(LLMInteractions)\
-                                 .join(ChatSession)\
-                                 .filter(ChatSession.user_id == user_id)\
-                                 .order_by(LLMInteractions.user_timestamp.asc())\
-                                 .limit(50).all()
+        try:
+            limit, before, after = parse_interaction_page_args()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Get a page of interactions across all sessions
+        query = LLMInteractions.query.join(ChatSession).filter(ChatSession.user_id == user_id)
+        interactions, older_cursor, newer_cursor = paginate_interactions(query, limit, before, after)
         
         chat_history = []
         for interaction in interactions:
-            # Add user message
-            chat_history.append({
-                'id': f"user_{interaction.id}",
-                'message': interaction.user_message,
-                'sender': 'user',
-                'timestamp': interaction.user_timestamp.isoformat()
-            })
-            
-            # Add bot response if available
-            if interaction.llm_response:
-                chat_history.append({
-                    'id': f"bot_{interaction.id}",
-                    'message': interaction.llm_response,
-                    'sender': 'assistant',
-                    'timestamp': interaction.llm_timestamp.isoformat() if interaction.llm_timestamp else interaction.user_timestamp.isoformat()
-                })
+            chat_history.extend(interaction_to_messages(interaction))
         
-        return jsonify({'chat_history': chat_history}), 200
+        return jsonify({
+            'chat_history': chat_history,
+            'older_cursor': older_cursor,
+            'newer_cursor': newer_cursor
+        }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -312,14 +387,14 @@ def get_chat_history(user_id):
 def clear_chat_history(user_id):
     """Legacy route - updated for new model"""
     try:
-        # Delete all sessions and their interactions for user
-        sessions = ChatSession.query.filter_by(user_id=user_id).all()
-        for session in sessions:
-            LLMInteractions.query.filter_by(session_id=session.id).delete()
-            db.session.delete(session)
-        
+        session_ids, deleted_interactions = purge_user_chat_history(user_id)
         db.session.commit()
-        return jsonify({'message': 'Chat history cleared successfully'}), 200
+        conversation_cache.invalidate(*session_ids)
+        return jsonify({
+            'message': 'Chat history cleared successfully',
+            'deleted_sessions': len(session_ids),
+            'deleted_interactions': deleted_interactions
+        }), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -442,6 +517,14 @@ def api_chat():
         if not message:
             return jsonify({'success': False, 'error': 'Message is required'}), 400
         
+        # Stream tokens as Server-Sent Events when the client asks for it
+        if data.get('stream') or request.accept_mimetypes.best == 'text/event-stream':
+            events = stream_chatbot_logic(user_id, message, session_id)
+            return Response(stream_with_context(events), mimetype='text/event-stream', headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
+            })
+        
         # Use existing chatbot logic with session support
         response_data = chatbot_logic(user_id, message, session_id)
         return jsonify({
@@ -459,41 +542,76 @@ def api_chat():
 
 @app.route('/api/chat/history/<int:user_id>', methods=['GET'])
 def api_chat_history(user_id):
-    """API endpoint to get chat history with new session-based model"""
+    """API endpoint to get chat history with new session-based model.
+
+    Returns the newest page of interactions across the user's sessions;
+    pass `older_cursor` as `before` to scroll back.
+    """
     try:
-        # Get recent chat sessions for user (last 5 sessions)
-        sessions = ChatSession.query.filter_by(user_id=user_id)\
-                                   .order_by(ChatSession.updated_at.desc())\
-                                   .limit(5).all()
+        try:
+            limit, before, after = parse_interaction_page_args()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        query = LLMInteractions.query.join(ChatSession).filter(ChatSession.user_id == user_id)
+        interactions, older_cursor, newer_cursor = paginate_interactions(query, limit, before, after)
         
         messages = []
-        for session in reversed(sessions):  # Show oldest sessions first
-            interactions = LLMInteractions.query.filter_by(session_id=session.id)\
-                                               .order_by(LLMInteractions.user_timestamp.asc()).all()
-            
-            for interaction in interactions:
-                # Add user message
-                messages.append({
-                    'id': f"user_{interaction.id}",
-                    'message': interaction.user_message,
-                    'sender': 'user',
-                    'timestamp': interaction.user_timestamp.isoformat(),
-                    'session_id': session.id
-                })
-                
-                # Add bot response if available
-                if interaction.llm_response:
-                    messages.append({
-                        'id': f"bot_{interaction.id}",
-                        'message': interaction.llm_response,
-                        'sender': 'assistant',
-                        'timestamp': interaction.llm_timestamp.isoformat() if interaction.llm_timestamp else interaction.user_timestamp.isoformat(),
-                        'session_id': session.id
-                    })
+        for interaction in interactions:
+            messages.extend(interaction_to_messages(interaction, session_id=interaction.session_id))
+        
+        return jsonify({
+            'success': True,
+            'messages': messages,
+            'older_cursor': older_cursor,
+            'newer_cursor': newer_cursor
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/chat/search', methods=['GET'])
+def api_chat_search():
+    """Full-text search over a user's chat history, best matches first.
+
+    Uses the llm_interactions_fts index, so matching never scans the
+    interactions table. Page with `limit` and `offset`.
+    """
+    try:
+        if not chat_search_available(db.session.connection()):
+            return jsonify({'success': False, 'error': 'Chat search is not available on this database'}), 503
+        
+        user_id = request.args.get('user_id', type=int)
+        match_query = build_match_query(request.args.get('q'))
+        if not user_id or not match_query:
+            return jsonify({'success': False, 'error': 'user_id and a search query (q) are required'}), 400
+        try:
+            limit = parse_limit(request.args.get('limit'), default=20, maximum=50)
+            offset = max(0, int(request.args.get('offset', 0)))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'limit and offset must be integers'}), 400
+        
+        statement = db.text(SEARCH_STATEMENT).columns(user_timestamp=db.DateTime, llm_timestamp=db.DateTime)
+        rows = db.session.execute(statement, {
+            'query': match_query, 'user_id': user_id, 'limit': limit + 1, 'offset': offset
+        }).all()
+        
+        results = [{
+            'interaction_id': row.id,
+            'session_id': row.session_id,
+            'message_snippet': render_snippet(row.message_snippet),
+            'response_snippet': render_snippet(row.response_snippet),
+            'mood_tag': row.mood_tag,
+            'timestamp': row.user_timestamp.isoformat() if row.user_timestamp else None,
+            'score': round(-row.rank, 6)
+        } for row in rows[:limit]]
         
         return jsonify({
             'success': True,
-            'messages': messages[-50:]  # Limit to last 50 messages
+            'results': results,
+            'next_offset': offset + limit if len(rows) > limit else None
         }), 200
     except Exception as e:
         return jsonify({
@@ -556,15 +674,14 @@ def get_current_user_profile():
 def get_health_tasks(user_id):
     try:
         today = date.today()
-        tasks = HealthTask.query.filter_by(user_id=user_id, date=today).all()
+        tasks = HealthTask.query.filter_by(user_id=user_id, date=today).order_by(HealthTask.id).all()
 
         if not tasks:
-            # Default tasks if none exist for today
-            default_tasks = ['Running', 'Yoga', 'Meditation', 'Eat Fruits','Helping in household chores']
-            for name in default_tasks:
-                db.session.add(HealthTask(user_id=user_id, task_name=name, date=today))
+            # Default tasks if none exist for today (usually pre-created by the nightly seeding job).
+            # Conflicting inserts from a concurrent request are skipped by the unique index.
+            seed_health_tasks([user_id], today)
             db.session.commit()
-            tasks = HealthTask.query.filter_by(user_id=user_id, date=today).all()
+            tasks = HealthTask.query.filter_by(user_id=user_id, date=today).order_by(HealthTask.id).all()
 
         return jsonify({
             'success': True,
@@ -586,6 +703,8 @@ def toggle_task_completion(task_id):
             return jsonify({'success': False, 'error': 'Task not found'}), 404
 
         task.completed = not task.completed
+        if task.date == date.today():
+            update_child_stats(task.user_id, deltas={'today_health_tasks': 1 if task.completed else -1})
         db.session.commit()
 
         # Automatically evaluate streak after toggling
@@ -601,10 +720,11 @@ def toggle_task_completion(task_id):
 @app.route('/api/health/streak/<int:user_id>', methods=['GET'])
 def get_streak(user_id):
     try:
-        streak = HealthStreak.query.filter_by(user_id=user_id).first()
+        # From the calendar, so a missed day shows up without waiting for the next toggle
+        origin, bits = load_timeline(user_id, 'health')
         return jsonify({
             'success': True,
-            'streak': streak.current_streak if streak else 0
+            'streak': current_streak(bits, origin, date.today())
         }), 200
     except Exception as e:
         return jsonify({
@@ -616,16 +736,11 @@ def get_streak(user_id):
 def increment_water(user_id):
     try:
         today = date.today()
-        log = WaterLog.query.filter_by(user_id=user_id, date=today).first()
-
-        if not log:
-            log = WaterLog(user_id=user_id, count=1, date=today)
-            db.session.add(log)
-        else:
-            log.count += 1
+        count = increment_water_count(user_id, today)
 
+        update_child_stats(user_id, values={'today_water_goal': int(count >= 8)})
         db.session.commit()
-        return jsonify({'success': True, 'count': log.count}), 200
+        return jsonify({'success': True, 'count': count}), 200
     except Exception as e:
         return jsonify({
             'success': False, 
@@ -662,33 +777,53 @@ def get_water_log(user_id):
             'error': str(e) 
         }), 500
 
+@app.route('/api/health/history/<int:user_id>', methods=['GET'])
+def get_health_history(user_id):
+    """Water or screen-time totals per day, week, month or year for trend charts"""
+    try:
+        metric = request.args.get('metric', 'water')
+        bucket = request.args.get('bucket', 'day')
+        if metric not in HISTORY_METRICS:
+            return jsonify({'success': False, 'error': f"metric must be one of {', '.join(HISTORY_METRICS)}"}), 400
+        if bucket not in HISTORY_BUCKETS:
+            return jsonify({'success': False, 'error': f"bucket must be one of {', '.join(HISTORY_BUCKETS)}"}), 400
+        
+        try:
+            end = date.fromisoformat(request.args['to']) if request.args.get('to') else date.today()
+            start = date.fromisoformat(request.args['from']) if request.args.get('from') \
+                else end - timedelta(days=DEFAULT_RANGE_DAYS[bucket] - 1)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'from and to must be dates (YYYY-MM-DD)'}), 400
+        if start > end:
+            return jsonify({'success': False, 'error': 'from must not be after to'}), 400
+        if bucket in ('day', 'week') and (end - start).days >= MAX_DAILY_RANGE_DAYS:
+            return jsonify({'success': False,
+                            'error': f'Ranges over {MAX_DAILY_RANGE_DAYS} days need bucket=month or year'}), 400
+        
+        points = health_history(user_id, metric, bucket, start, end)
+        return jsonify({
+            'success': True,
+            'metric': metric,
+            'unit': HISTORY_METRICS[metric][2],
+            'bucket': bucket,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'total': round(sum(point['total'] for point in points), 4),
+            'points': points
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 def evaluate_streak_internal(user_id):
+    """Record whether today counts as a health day and refresh the derived HealthStreak"""
     try:
         today = date.today()
-        streak = HealthStreak.query.filter_by(user_id=user_id).first()
-
-        # --- Reset if the child skipped a day ---
-        if streak and streak.last_updated:
-            missed_days = (today - streak.last_updated).days
-            if missed_days > 1:
-                streak.current_streak = 0
-                streak.last_updated = today
-                db.session.commit()
-                return
-
-        # --- Count today's completed tasks ---
         completed_count = HealthTask.query.filter_by(user_id=user_id, date=today, completed=True).count()
-
-        if completed_count >= 2:
-            if not streak:
-                streak = HealthStreak(user_id=user_id, current_streak=1, last_updated=today)
-                db.session.add(streak)
-            elif streak.last_updated != today:
-                streak.current_streak += 1
-                streak.last_updated = today
-
-            db.session.commit()
+        streak = refresh_health_streak(user_id, completed_count, today)
+        update_child_stats(user_id, values={'health_streak': streak.current_streak if streak else 0})
+        db.session.commit()
     except Exception as e:
+        db.session.rollback()
         print("Streak Eval Error:", traceback.format_exc())
 
 def update_login_streak(user_id):
@@ -696,40 +831,17 @@ def update_login_streak(user_id):
     try:
         today = date.today()
         
-        # Get or create login streak record
-        login_streak = LoginStreak.query.filter_by(user_id=user_id).first()
+        # Create the record on first login and count each login day once,
+        # both as single statements so concurrent logins can't double count
+        ensure_login_streak(user_id)
+        record_login_day(user_id, today)
+        login_streak = LoginStreak.query.filter_by(user_id=user_id).populate_existing().first()
         
-        if not login_streak:
-            # First time login - create new streak record
-            login_streak = LoginStreak(
-                user_id=user_id,
-                current_streak=1,
-                last_login_date=today,
-                total_logins=1,
-                longest_streak=1
-            )
-            db.session.add(login_streak)
-        else:
-            # Check if this is a new login day
-            if login_streak.last_login_date != today:
-                yesterday = date.fromordinal(today.toordinal() - 1)
-                
-                if login_streak.last_login_date == yesterday:
-                    # Consecutive day login - increment streak
-                    login_streak.current_streak += 1
-                elif login_streak.last_login_date < yesterday:
-                    # Break in streak - reset to 1
-                    login_streak.current_streak = 1
-                # If last_login_date is today, don't update (already logged in today)
-                
-                # Update last login date and total logins
-                login_streak.last_login_date = today
-                login_streak.total_logins += 1
-                
-                # Update longest streak if current is longer
-                if login_streak.current_streak > login_streak.longest_streak:
-                    login_streak.longest_streak = login_streak.current_streak
+        # Current and longest streak are derived from the login calendar
+        set_active(user_id, 'login', today)
+        refresh_login_streak(login_streak, today)
         
+        update_child_stats(user_id, values={'login_streak': login_streak.current_streak, 'today_login': 1})
         db.session.commit()
         print(f"Updated login streak for user {user_id}: {login_streak.current_streak} days")
         
@@ -763,9 +875,10 @@ def get_login_streak(user_id):
         login_streak = LoginStreak.query.filter_by(user_id=user_id).first()
         
         if login_streak:
+            origin, bits = load_timeline(user_id, 'login')
             return jsonify({
                 'success': True,
-                'current_streak': login_streak.current_streak,
+                'current_streak': current_streak(bits, origin, date.today()),
                 'total_logins': login_streak.total_logins,
                 'longest_streak': login_streak.longest_streak,
                 'last_login_date': login_streak.last_login_date.isoformat()
@@ -792,118 +905,25 @@ def get_login_streak(user_id):
         }), 500
             
 
-# ---------------------------
-# Dashboard Statistics Calculation Functions
-# ---------------------------
-
-def calculate_total_stars(user_id):
-    """Calculate total stars earned by a user - simplified using Achievement table"""
-    try:
-        stars = 0
-        
-        # Stars per achievement based on activity type
-        achievements = Achievement.query.filter_by(user_id=user_id).all()
-        for achievement in achievements:
-            if 'Memory Game' in achievement.badge_name:
-                stars += 5  # Memory Game gives 5 stars
-            else:
-                stars += 10  # Other activities give 10 stars
-        
-        # 1 star per login streak day
-        login_streak = LoginStreak.query.filter_by(user_id=user_id).first()
-        if login_streak:
-            stars += login_streak.current_streak * 1
-        
-        # 2 stars per health streak day  
-        health_streak = HealthStreak.query.filter_by(user_id=user_id).first()
-        if health_streak:
-            stars += health_streak.current_streak * 2
-        
-        return stars
-    except Exception as e:
-        print(f"Error calculating total stars: {e}")
-        return 0
-
-def calculate_quests_completed(user_id):
-    """Calculate total quests/activities completed by a user - includes modules, tasks, and achievements"""
-    try:
-        quests = 0
-        
-        # 1. Count completed module submodules from UserModuleProgress
-        module_progress = UserModuleProgress.query.filter_by(user_id=user_id, completed=True).all()
-        quests += len(module_progress)
-        
-        # 2. Count completed tasks from HomeworkSchedule (task tracker)
-        completed_tasks = HomeworkSchedule.query.filter_by(user_id=user_id, status='completed').all()
-        quests += len(completed_tasks)
-        
-        # 3. Count achievements (excluding module progress records)
-        achievements = Achievement.query.filter_by(user_id=user_id).all()
-        for achievement in achievements:
-            # Skip module progress records (they're stored as achievements but counted above)
-            if not achievement.badge_name or not achievement.badge_name.startswith('module_'):
-                quests += 1
-        
-        print(f"📊 Quests calculated for user {user_id}: {quests} total (modules: {len(module_progress)}, tasks: {len(completed_tasks)}, achievements: {len([a for a in achievements if not a.badge_name or not a.badge_name.startswith('module_')])})")
-        
-        return quests
-    except Exception as e:
-        print(f"Error calculating quests completed: {e}")
-        return 0
-
-def calculate_skills_mastered(user_id):
-    """Calculate number of skills mastered by a user - simplified using Achievement table"""
+@app.route('/api/streaks/<int:user_id>', methods=['GET'])
+def get_streak_calendar(user_id):
+    """Login and health streaks with history, plus a calendar heatmap for one year"""
     try:
-        # Simple calculation: every 3 achievements = 1 skill mastered
-        achievements_count = Achievement.query.filter_by(user_id=user_id).count()
-        skills = achievements_count // 3  # Integer division
-        
-        return skills
-    except Exception as e:
-        print(f"Error calculating skills mastered: {e}")
-        return 0
-
-def calculate_todays_goals(user_id, today):
-    """Calculate goals completed today - includes various goal sources"""
-    try:
-        goals = 0
-        
-        # 1. Achievements earned today (excluding module progress)
-        today_achievements = Achievement.query.filter_by(user_id=user_id).filter(
-            db.func.date(Achievement.date_awarded) == today
-        ).all()
-        for achievement in today_achievements:
-            if not achievement.badge_name or not achievement.badge_name.startswith('module_'):
-                goals += 1
-        
-        # 2. Module progress completed today (simplified - count all completed modules)
-        today_module_progress = UserModuleProgress.query.filter_by(user_id=user_id, completed=True).count()
-        goals += today_module_progress
-        
-        # 3. Tasks completed today (from task tracker - simplified)
-        today_tasks = HomeworkSchedule.query.filter_by(user_id=user_id, status='completed').count()
-        goals += today_tasks
+        year = request.args.get('year', date.today().year, type=int)
+        kinds = [request.args['kind']] if request.args.get('kind') else list(STREAK_KINDS)
+        if any(kind not in STREAK_KINDS for kind in kinds):
+            return jsonify({'success': False, 'error': f"kind must be one of {', '.join(STREAK_KINDS)}"}), 400
         
-        # 4. Health tasks completed today
-        today_health_tasks = HealthTask.query.filter_by(user_id=user_id, completed=True, date=today).count()
-        goals += today_health_tasks
-        
-        # 5. Login streak (if logged in today)
-        login_streak = LoginStreak.query.filter_by(user_id=user_id).first()
-        if login_streak and login_streak.last_login_date == today:
-            goals += 1
-        
-        # 6. Water intake goal (if drank water today)
-        water_log = WaterLog.query.filter_by(user_id=user_id, date=today).first()
-        if water_log and water_log.count >= 8:  # 8 glasses goal
-            goals += 1
-        
-        print(f"📊 Today's goals for user {user_id}: {goals} total (achievements: {len([a for a in today_achievements if not a.badge_name or not a.badge_name.startswith('module_')])}, modules: {today_module_progress}, tasks: {today_tasks}, health: {today_health_tasks})")
-        
-        return goals
+        return jsonify({
+            'success': True,
+            'user_id': user_id,
+            'streaks': {
+                kind: dict(streak_summary(user_id, kind), heatmap=heatmap(user_id, kind, year))
+                for kind in kinds
+            }
+        }), 200
     except Exception as e:
-        print(f"Error calculating today's goals: {e}")
-        return 0
+        return jsonify({'success': False, 'error': str(e)}), 500
 
 # ---------------------------
 # Child Dashboard Routes
@@ -911,51 +931,64 @@ def calculate_todays_goals(user_id, today):
 
 @app.route('/api/child/stats/<int:user_id>', methods=['GET'])
 def api_child_stats(user_id):
-    """Get child dashboard statistics calculated from real data"""
+    """Get child dashboard statistics from the ChildStats table (one primary-key lookup)"""
     try:
-        today = date.today()
-        
-        # Calculate Stars Collected
-        total_stars = calculate_total_stars(user_id)
-        
-        # Calculate Quests Completed
-        quests_completed = calculate_quests_completed(user_id)
-        
-        # Calculate Skills Mastered
-        skills_mastered = calculate_skills_mastered(user_id)
-        
-        # Calculate Today's Goals
-        todays_goals = calculate_todays_goals(user_id, today)
-        
-        # Get login streak
-        login_streak = LoginStreak.query.filter_by(user_id=user_id).first()
-        streak_days = login_streak.current_streak if login_streak else 0
-        
-        # Calculate user level based on total stars
-        user_level = max(1, total_stars // 50)  # Level up every 50 stars
-        
-        stats = {
-            'totalStars': total_stars,
-            'questsCompleted': quests_completed,
-            'skillsLearned': skills_mastered,
-            'todayGoals': todays_goals,
-            'streakDays': streak_days,
-            'userLevel': user_level
-        }
+        stats_row = db.session.get(ChildStats, user_id)
+        if not stats_row:
+            # First visit since the table was added: build the row from the source tables
+            rebuild_child_stats([user_id])
+            db.session.commit()
+            stats_row = db.session.get(ChildStats, user_id)
+            if not stats_row:
+                return jsonify({'success': False, 'error': 'User not found'}), 404
         
-        print(f"📊 Dashboard stats for user {user_id}: {stats}")
+        stats = dashboard_stats(stats_row)
         
         return jsonify({
             'success': True,
             'stats': stats
         }), 200
     except Exception as e:
+        db.session.rollback()
         print(f"Error calculating stats for user {user_id}: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@app.route('/api/leaderboard', methods=['GET'])
+def api_leaderboard():
+    """Top children by stars, globally or within a family, plus the caller's rank"""
+    try:
+        scope = request.args.get('scope', 'global')
+        user_id = request.args.get('user_id', type=int)
+        parent_id = request.args.get('parent_id', type=int)
+        limit = parse_limit(request.args.get('limit'), default=10, maximum=100)
+
+        if scope == 'global':
+            snapshot = leaderboard_cache.get(GLOBAL_SCOPE, load_scores)
+        elif scope == 'family':
+            if parent_id is None and user_id is not None:
+                parent_id = first_parent_id(user_id)
+            if parent_id is None:
+                return jsonify({'success': False, 'error': 'Family leaderboard needs parent_id or a linked user_id'}), 400
+            snapshot = leaderboard_cache.get(family_scope(parent_id), lambda: load_scores(parent_id))
+        else:
+            return jsonify({'success': False, 'error': "scope must be 'global' or 'family'"}), 400
+
+        return jsonify({
+            'success': True,
+            'scope': scope,
+            'parent_id': parent_id,
+            'total': len(snapshot),
+            'leaderboard': snapshot.top(limit),
+            'me': snapshot.rank_of(user_id) if user_id is not None else None
+        }), 200
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/achievement/test', methods=['POST'])
 def create_test_achievement():
     """Create a test achievement for testing dashboard stats"""
@@ -975,6 +1008,7 @@ def create_test_achievement():
         )
         
         db.session.add(achievement)
+        record_achievement(achievement)
         db.session.commit()
         
         print(f"✅ Created test achievement for user {user_id}: {achievement.badge_name}")
@@ -1055,18 +1089,18 @@ def api_toggle_quest(quest_id):
             'error': str(e)
         }), 500
 
-def chatbot_logic(user_id, user_message, session_id=None):
-    """Extracted chatbot logic for reuse with new session-based model"""
+CHAT_FALLBACK_REPLY = "I apologize, but I'm having trouble connecting to my knowledge base right now. Please try again in a moment. [MOOD: neutral]"
+# Saved for a streamed turn whose client left before any reply text arrived
+CHAT_INTERRUPTED_REPLY = "(This reply was interrupted.) [MOOD: neutral]"
+
+def start_chat_turn(user_id, user_message, session_id=None):
+    """Record the user's message and build the LLM context for a chat turn"""
     
     # Get or create chat session
-    if session_id:
-        chat_session = db.session.get(ChatSession, session_id)
-        if not chat_session:
-            chat_session = ChatSession(user_id=user_id)
-            db.session.add(chat_session)
-            db.session.flush()
-    else:
-        # ALWAYS create a new session when session_id is None
+    chat_session = db.session.get(ChatSession, session_id) if session_id else None
+    is_new_session = chat_session is None
+    if is_new_session:
+        # ALWAYS create a new session when session_id is None or unknown
         chat_session = ChatSession(user_id=user_id)
         db.session.add(chat_session)
         db.session.flush()
@@ -1078,57 +1112,118 @@ def chatbot_logic(user_id, user_message, session_id=None):
         user_timestamp=datetime.utcnow()
     )
     db.session.add(user_interaction)
-    db.session.flush()
-    
-    # Get recent interactions for context (last 10)
-    recent_interactions = LLMInteractions.query.filter_by(session_id=chat_session.id)\
-                                              .order_by(LLMInteractions.user_timestamp.desc())\
-                                              .limit(10).all()
     
-    # Build conversation context
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    # Keep the sidebar listing columns current (atomic increment in SQL)
+    chat_session.interaction_count = db.func.coalesce(ChatSession.interaction_count, 0) + 1
+    chat_session.last_message_preview = make_message_preview(user_message)
+    chat_session.updated_at = user_interaction.user_timestamp
+    db.session.flush()
     
-    # Add recent chat history in chronological order
-    for interaction in reversed(recent_interactions[1:]):  # Skip current interaction
-        messages.append({"role": "user", "content": interaction.user_message})
-        if interaction.llm_response:
-            # Clean the LLM response to remove mood tags before adding to context
-            clean_response = interaction.llm_response
-            if '[MOOD:' in clean_response:
-                clean_response = clean_response.split('[MOOD:')[0].strip()
-            messages.append({"role": "assistant", "content": clean_response})
+    # Build conversation context from the newest turns that fit the token budget
+    turns = load_context_turns(chat_session, user_interaction.id, is_new_session)
+    messages, overflow = build_chat_messages(
+        SYSTEM_PROMPT, chat_session.summary, turns, user_message,
+        app.config['CHAT_CONTEXT_TOKEN_BUDGET']
+    )
     
-    # Add current user message
-    messages.append({"role": "user", "content": user_message})
+    # Ask for older turns to be folded into the summary once enough have piled up
+    summarize_before_id = None
+    if len(overflow) >= app.config['CHAT_SUMMARY_BATCH_TURNS'] or len(turns) >= app.config['CHAT_CONTEXT_MAX_TURNS']:
+        window = turns[len(overflow):]
+        summarize_before_id = window[0][0] if window else user_interaction.id
     
-    # Get response from LLM
+    return chat_session, user_interaction, messages, summarize_before_id
+
+def load_context_turns(chat_session, current_interaction_id, is_new_session=False):
+    """Recent turns not yet folded into the session summary, oldest first.
+
+    Served from the conversation cache when possible; on a miss the window
+    is read from the database, cleaned once and cached.
+    """
+    summarized_through = chat_session.summarized_through_id or 0
+    turns = [] if is_new_session else conversation_cache.get(chat_session.id)
+    if is_new_session:
+        conversation_cache.put(chat_session.id, turns)
+    elif turns is None:
+        query = LLMInteractions.query.filter(LLMInteractions.session_id == chat_session.id,
+                                             LLMInteractions.id != current_interaction_id)
+        if summarized_through:
+            query = query.filter(LLMInteractions.id > summarized_through)
+        recent_interactions = query.order_by(LLMInteractions.user_timestamp.desc(), LLMInteractions.id.desc())\
+                                   .limit(app.config['CHAT_CONTEXT_MAX_TURNS']).all()
+        
+        # Clean the LLM responses to remove mood tags before adding to context
+        turns = [
+            (interaction.id, interaction.user_message,
+             split_mood_tag(interaction.llm_response)[0] if interaction.llm_response else None)
+            for interaction in reversed(recent_interactions)
+        ]
+        conversation_cache.put(chat_session.id, turns)
+    return [turn for turn in turns if turn[0] > summarized_through]
+
+_summaries_in_progress = set()
+_summaries_lock = threading.Lock()
+
+def schedule_session_summary(session_id, before_id):
+    """Queue a background update of the rolling summary, skipping it if the LLM pool is busy"""
+    with _summaries_lock:
+        if session_id in _summaries_in_progress:
+            return
+        _summaries_in_progress.add(session_id)
     try:
-        response = client.chat.completions.create(
-            model="meta-llama/llama-4-maverick-17b-128e-instruct",
-            messages=messages,
-            max_tokens=250,
-            temperature=0.7
-        )
-        
-        bot_reply = response.choices[0].message.content.strip()
+        llm_pool.submit(summarize_chat_session, session_id, before_id, wait=0)
     except Exception as e:
-        print(f"Error getting AI response: {e}")
-        bot_reply = "I apologize, but I'm having trouble connecting to my knowledge base right now. Please try again in a moment. [MOOD: neutral]"
+        with _summaries_lock:
+            _summaries_in_progress.discard(session_id)
+        print(f"Skipping summary for session {session_id}: {e}")
+
+def summarize_chat_session(session_id, before_id):
+    """Fold unsummarized turns older than before_id into ChatSession.summary.
+
+    Runs on the LLM worker pool, never on the request path. The summary is
+    only written if no other update moved it on while the LLM was busy.
+    """
+    try:
+        with app.app_context():
+            chat_session = db.session.get(ChatSession, session_id)
+            if not chat_session:
+                return
+            previous_through = chat_session.summarized_through_id or 0
+            previous_summary = chat_session.summary
+            interactions = LLMInteractions.query.filter(LLMInteractions.session_id == session_id,
+                                                        LLMInteractions.id > previous_through,
+                                                        LLMInteractions.id < before_id)\
+                                                .order_by(LLMInteractions.id.asc()).all()
+            if not interactions:
+                return
+            turns = [(i.id, i.user_message, split_mood_tag(i.llm_response)[0] if i.llm_response else None)
+                     for i in interactions]
+            db.session.rollback()  # don't keep the read open during the LLM call
+            
+            summary = create_chat_completion(build_summary_messages(previous_summary, turns),
+                                             max_tokens=200, temperature=0.3)
+            
+            ChatSession.query.filter(
+                ChatSession.id == session_id,
+                db.func.coalesce(ChatSession.summarized_through_id, 0) == previous_through
+            ).update({
+                'summary': summary,
+                'summarized_through_id': turns[-1][0],
+                'updated_at': ChatSession.updated_at  # summaries shouldn't reorder the sidebar
+            }, synchronize_session=False)
+            db.session.commit()
+            print(f"Folded {len(turns)} turns into summary for session {session_id}")
+    except Exception as e:
+        print(f"Error summarizing session {session_id}: {e}")
+    finally:
+        with _summaries_lock:
+            _summaries_in_progress.discard(session_id)
+
+def finish_chat_turn(chat_session, user_interaction, bot_reply):
+    """Store the LLM reply and detected mood, then commit the chat turn"""
     
     # Extract mood from LLM response
-    detected_mood = 'neutral'
-    clean_bot_reply = bot_reply
-    
-    if '[MOOD:' in bot_reply:
-        try:
-            # Extract mood from the response
-            mood_part = bot_reply.split('[MOOD:')[1].split(']')[0].strip().lower()
-            detected_mood = mood_part
-            # Remove mood tag from the response shown to user
-            clean_bot_reply = bot_reply.split('[MOOD:')[0].strip()
-        except (IndexError, AttributeError):
-            print("Failed to parse mood from LLM response")
-            detected_mood = 'neutral'
+    clean_bot_reply, detected_mood = split_mood_tag(bot_reply)
     
     # Update the interaction with bot response and detected mood
     user_interaction.llm_response = bot_reply  # Keep full response with mood tag
@@ -1140,6 +1235,7 @@ def chatbot_logic(user_id, user_message, session_id=None):
     chat_session.updated_at = datetime.utcnow()
     
     db.session.commit()
+    conversation_cache.append(chat_session.id, (user_interaction.id, user_interaction.user_message, clean_bot_reply))
     
     print(f"Updated session {chat_session.id} mood to: {detected_mood}")
     
@@ -1150,6 +1246,303 @@ def chatbot_logic(user_id, user_message, session_id=None):
         'mood': detected_mood
     }
 
+def create_chat_completion(messages, max_tokens=250, temperature=0.7):
+    """Blocking chat completion call, run on the LLM worker pool"""
+    result = llm_gateway.complete('chat', messages, deadline=app.config['LLM_CALL_TIMEOUT'],
+                                  max_tokens=max_tokens, temperature=temperature)
+    return result.content.strip()
+
+def chatbot_logic(user_id, user_message, session_id=None):
+    """Extracted chatbot logic for reuse with new session-based model.
+
+    Runs as a two-phase pipeline so SQLite's write lock is never held
+    across the LLM round trip: the user turn is committed first, the LLM
+    is called outside any transaction, and the reply is saved in a short
+    second transaction.
+    """
+    chat_session, user_interaction, messages, summarize_before_id = start_chat_turn(user_id, user_message, session_id)
+    chat_session_id = chat_session.id
+    interaction_id = user_interaction.id
+    
+    # Phase 1: commit the user turn and release the write lock
+    db.session.commit()
+    
+    # Phase 2: get response from LLM outside any transaction
+    try:
+        future = llm_pool.submit(create_chat_completion, messages, wait=app.config['LLM_QUEUE_WAIT'])
+        bot_reply = future.result(timeout=app.config['LLM_CALL_TIMEOUT'])
+    except Exception as e:
+        print(f"Error getting AI response: {e}")
+        bot_reply = CHAT_FALLBACK_REPLY
+    
+    # Phase 3: short transaction to store the reply
+    result = finish_chat_turn(
+        db.session.get(ChatSession, chat_session_id),
+        db.session.get(LLMInteractions, interaction_id),
+        bot_reply
+    )
+    if summarize_before_id:
+        schedule_session_summary(chat_session_id, summarize_before_id)
+    return result
+
+def stream_chatbot_logic(user_id, user_message, session_id=None):
+    """Streaming variant of chatbot_logic that yields Server-Sent Events.
+
+    Emits a `session` event straight away, a `token` event for every piece
+    of visible reply text and a final `done` event once the reply and mood
+    have been saved. If the client disconnects mid-reply, the text received
+    so far is saved as the turn's reply when the generator is closed.
+    """
+    chat_session, user_interaction, messages, summarize_before_id = start_chat_turn(user_id, user_message, session_id)
+    # Commit the user turn so no write transaction stays open while tokens stream
+    db.session.commit()
+    chat_session_id = chat_session.id
+    interaction_id = user_interaction.id
+    
+    def save_reply(bot_reply):
+        result = finish_chat_turn(
+            db.session.get(ChatSession, chat_session_id),
+            db.session.get(LLMInteractions, interaction_id),
+            bot_reply
+        )
+        if summarize_before_id:
+            schedule_session_summary(chat_session_id, summarize_before_id)
+        return result
+    
+    def generate():
+        mood_filter = MoodTagFilter()
+        reply_parts = []
+        saving = False
+        try:
+            yield sse_event({'type': 'session', 'session_id': chat_session_id})
+            try:
+                with llm_pool.slot(wait=app.config['LLM_QUEUE_WAIT']), \
+                     closing(llm_gateway.stream('chat', messages, deadline=app.config['LLM_CALL_TIMEOUT'],
+                                                max_tokens=250, temperature=0.7)) as stream:
+                    for delta in stream:
+                        reply_parts.append(delta)
+                        visible = mood_filter.feed(delta)
+                        if visible:
+                            yield sse_event({'type': 'token', 'content': visible})
+            except Exception as e:
+                print(f"Error streaming AI response: {e}")
+                if not reply_parts:
+                    reply_parts = [CHAT_FALLBACK_REPLY]
+                    visible = mood_filter.feed(CHAT_FALLBACK_REPLY)
+                    if visible:
+                        yield sse_event({'type': 'token', 'content': visible})
+            
+            remaining = mood_filter.flush()
+            if remaining:
+                yield sse_event({'type': 'token', 'content': remaining})
+            
+            saving = True
+            try:
+                result = save_reply(''.join(reply_parts).strip())
+            except Exception as e:
+                db.session.rollback()
+                yield sse_event({'type': 'error', 'success': False, 'error': str(e)})
+                return
+            yield sse_event({'type': 'done', 'success': True, **result})
+        finally:
+            if not saving:
+                # Closed mid-reply (client gone): keep the partial reply so the turn isn't left unanswered
+                try:
+                    save_reply(''.join(reply_parts).strip() or CHAT_INTERRUPTED_REPLY)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Could not save interrupted reply: {e}")
+    
+    return generate()
+
+def purge_user_chat_history(user_id):
+    """Delete all of a user's chat sessions and interactions with set-based statements.
+
+    The interactions go first, in one DELETE over the user's sessions, then
+    the sessions themselves. Returns the deleted session ids and the number
+    of interactions deleted.
+    """
+    session_ids = [row.id for row in db.session.query(ChatSession.id).filter_by(user_id=user_id)]
+    user_sessions = db.select(ChatSession.id).where(ChatSession.user_id == user_id)
+    deleted_interactions = LLMInteractions.query.filter(LLMInteractions.session_id.in_(user_sessions))\
+                                                .delete(synchronize_session=False)
+    ChatSession.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    return session_ids, deleted_interactions
+
+def apply_chat_retention(days=None, mode=None, batch_size=None):
+    """Archive or delete chat interactions older than the retention period.
+
+    Rows are handled oldest first in batches of `batch_size`, committing
+    after each batch, so the write lock is only held for a moment and chats
+    keep working while a large backlog is cleared. Sessions left without
+    interactions are removed. Returns the number of interactions processed.
+    """
+    days = app.config['CHAT_RETENTION_DAYS'] if days is None else days
+    mode = mode or app.config['CHAT_RETENTION_MODE']
+    batch_size = batch_size or app.config['CHAT_RETENTION_BATCH_SIZE']
+    if days <= 0:
+        return 0
+    if mode not in ('archive', 'delete'):
+        raise ValueError(f"Unknown chat retention mode: {mode}")
+    
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    removed = 0
+    while True:
+        rows = db.session.query(LLMInteractions.id, LLMInteractions.session_id)\
+                         .filter(LLMInteractions.user_timestamp < cutoff)\
+                         .order_by(LLMInteractions.user_timestamp)\
+                         .limit(batch_size).all()
+        if not rows:
+            break
+        interaction_ids = [row.id for row in rows]
+        session_ids = {row.session_id for row in rows}
+        
+        if mode == 'archive':
+            db.session.execute(db.insert(LLMInteractionArchive).from_select(
+                ['id', 'session_id', 'user_id', 'user_message', 'user_timestamp',
+                 'llm_response', 'llm_timestamp', 'mood_tag', 'archived_at'],
+                db.select(LLMInteractions.id, LLMInteractions.session_id,
+                          db.func.coalesce(ChatSession.user_id, 0), LLMInteractions.user_message,
+                          LLMInteractions.user_timestamp, LLMInteractions.llm_response,
+                          LLMInteractions.llm_timestamp, LLMInteractions.mood_tag,
+                          db.literal(datetime.utcnow()))
+                  .outerjoin(ChatSession, ChatSession.id == LLMInteractions.session_id)
+                  .where(LLMInteractions.id.in_(interaction_ids))
+            ))
+        LLMInteractions.query.filter(LLMInteractions.id.in_(interaction_ids)).delete(synchronize_session=False)
+        
+        # Keep the sidebar counters in step and drop sessions that are now empty
+        remaining = db.select(db.func.count(LLMInteractions.id))\
+                      .where(LLMInteractions.session_id == ChatSession.id).scalar_subquery()
+        ChatSession.query.filter(ChatSession.id.in_(session_ids))\
+                         .update({'interaction_count': remaining}, synchronize_session=False)
+        ChatSession.query.filter(ChatSession.id.in_(session_ids), ChatSession.interaction_count == 0)\
+                         .delete(synchronize_session=False)
+        db.session.commit()
+        conversation_cache.invalidate(*session_ids)
+        
+        removed += len(interaction_ids)
+        if len(rows) < batch_size:
+            break
+    
+    if removed:
+        print(f"🧹 Chat retention: {mode}d {removed} interactions older than {days} days")
+    return removed
+
+def run_chat_retention_job():
+    with app.app_context():
+        try:
+            return apply_chat_retention()
+        except Exception:
+            db.session.rollback()
+            raise
+
+@app.cli.command('chat-retention')
+@click.option('--days', type=int, default=None, help='Retention period (defaults to CHAT_RETENTION_DAYS)')
+@click.option('--mode', type=click.Choice(['archive', 'delete']), default=None)
+@click.option('--batch-size', type=int, default=None)
+def chat_retention_command(days, mode, batch_size):
+    """Archive or delete old chat interactions once (for cron)"""
+    removed = apply_chat_retention(days, mode, batch_size)
+    click.echo(f"Processed {removed} interactions")
+
+def run_dashboard_metrics_job():
+    with app.app_context():
+        try:
+            snapshot = rollup_dashboard_metrics()
+            db.session.commit()
+            return snapshot_to_dict(snapshot)
+        except Exception:
+            db.session.rollback()
+            raise
+
+def run_pomodoro_sweeper_job():
+    with app.app_context():
+        try:
+            closed = close_stale_sessions(datetime.utcnow(),
+                                          timedelta(minutes=app.config['POMODORO_STALE_MINUTES']),
+                                          timedelta(minutes=app.config['POMODORO_STALE_MAX_WORK_MINUTES']))
+            db.session.commit()
+            if closed:
+                print(f"🧹 Closed {closed} stale pomodoro sessions")
+            return {'closed': closed}
+        except Exception:
+            db.session.rollback()
+            raise
+
+def run_health_task_seeding_job():
+    with app.app_context():
+        try:
+            tomorrow = date.today() + timedelta(days=1)
+            seeded = seed_for_active_children(tomorrow, app.config['HEALTH_TASK_ACTIVE_DAYS'])
+            db.session.commit()
+            return {'date': tomorrow.isoformat(), 'children': seeded}
+        except Exception:
+            db.session.rollback()
+            raise
+
+def run_study_time_rollup_job():
+    with app.app_context():
+        try:
+            written = rollup_study_time(date.today(), app.config['STUDY_ROLLUP_SETTLE_DAYS'])
+            db.session.commit()
+            return {'rows': written}
+        except Exception:
+            db.session.rollback()
+            raise
+
+@app.cli.command('seed-health-tasks')
+@click.option('--date', 'day', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Day to create tasks for (defaults to tomorrow)')
+@click.option('--active-days', type=int, default=None, help='Defaults to HEALTH_TASK_ACTIVE_DAYS')
+def seed_health_tasks_command(day, active_days):
+    """Create a day's default health tasks for all recently active children"""
+    day = day.date() if day else date.today() + timedelta(days=1)
+    seeded = seed_for_active_children(day, active_days or app.config['HEALTH_TASK_ACTIVE_DAYS'])
+    db.session.commit()
+    click.echo(f"Seeded health tasks for {seeded} children on {day.isoformat()}")
+
+@app.cli.command('rollup-dashboard-metrics')
+def rollup_dashboard_metrics_command():
+    """Write a DashboardMetrics snapshot of the activity since the last one (for cron)"""
+    snapshot = rollup_dashboard_metrics()
+    db.session.commit()
+    click.echo(f"Snapshot {snapshot.id}: {snapshot.active_kids} active kids, "
+               f"{snapshot.session_count} sessions, {snapshot.achievements_awarded} badges")
+
+@app.cli.command('rebuild-health-rollups')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user')
+def rebuild_health_rollups_command(user_id):
+    """Recompute the month/year water and screen-time rollups from the daily rows"""
+    written = rebuild_rollups([user_id] if user_id else None)
+    db.session.commit()
+    click.echo(f"Wrote {written} rollup rows")
+
+@app.cli.command('rollup-study-time')
+def rollup_study_time_command():
+    """Move settled days of Pomodoro sessions into the study-time rollup (for cron)"""
+    written = rollup_study_time(date.today(), app.config['STUDY_ROLLUP_SETTLE_DAYS'])
+    db.session.commit()
+    click.echo(f"Wrote {written} study-time rollup rows")
+
+@app.cli.command('close-stale-sessions')
+@click.option('--minutes', type=int, default=None, help='Idle minutes before an open session is closed')
+def close_stale_sessions_command(minutes):
+    """Close Pomodoro sessions that were left open (for cron)"""
+    closed = close_stale_sessions(datetime.utcnow(),
+                                  timedelta(minutes=minutes or app.config['POMODORO_STALE_MINUTES']),
+                                  timedelta(minutes=app.config['POMODORO_STALE_MAX_WORK_MINUTES']))
+    db.session.commit()
+    click.echo(f"Closed {closed} stale sessions")
+
+@app.cli.command('rebuild-child-stats')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user')
+def rebuild_child_stats_command(user_id):
+    """Recompute the ChildStats table from the source tables"""
+    rebuilt = rebuild_child_stats([user_id] if user_id else None)
+    db.session.commit()
+    click.echo(f"Rebuilt stats for {rebuilt} users")
+
 #Finance tracker APIs
 @app.route('/api/parentchild', methods=['GET'])
 def get_parent_child_links():
@@ -1169,6 +1562,25 @@ def get_parent_child_links():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/parent/<int:parent_id>/overview', methods=['GET'])
+def api_parent_overview(parent_id):
+    """Dashboard, health and login figures for all of a parent's children in one request"""
+    try:
+        if not db.session.get(User, parent_id):
+            return jsonify({'success': False, 'error': 'Parent not found'}), 404
+
+        children = children_overview(parent_children(parent_id))
+        db.session.commit()  # keeps any ChildStats rows built on first visit
+        return jsonify({
+            'success': True,
+            'parent_id': parent_id,
+            'children': children
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error building overview for parent {parent_id}: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/finance/transactions/<int:user_id>', methods=['GET'])
 @jwt_required()
 def get_transactions(user_id):
@@ -1298,12 +1710,8 @@ def add_savings_goal():
 # ---------------------------
 
 
-# Configuration - Move these to environment variables in production
-OPENROUTER_API_KEY = app.config['OPENROUTER_API_KEY']
-OPENROUTER_API_URL = app.config['OPENROUTER_API_URL']
-
-# Initialize Psychometry Service
-psychometry_service = PsychometryService(OPENROUTER_API_KEY, OPENROUTER_API_URL)
+# Initialize Psychometry Service (LLM calls go through the shared gateway)
+psychometry_service = PsychometryService(llm_gateway)
 
 # Psychometry Assessment Routes
 @app.route('/api/psychometry/start', methods=['POST'])
@@ -1477,7 +1885,7 @@ def complete_psychometry_assessment():
 @app.route('/api/tasks/<int:user_id>', methods=['GET'])
 @jwt_required()
 def get_tasks(user_id):
-    """Get all tasks for a specific user - requires JWT token"""
+    """Get a user's tasks, optionally only those due in a date range / with a status - requires JWT token"""
     try:
         current_user_id = get_jwt_identity()
         current_user = User.query.get(current_user_id)
@@ -1487,34 +1895,37 @@ def get_tasks(user_id):
         if current_user.id != user_id and current_user.role != 'parent':
             return jsonify({'error': 'Unauthorized access'}), 403
         
-        tasks = HomeworkSchedule.query.filter_by(user_id=user_id).order_by(HomeworkSchedule.due_date.asc()).all()
-        
-        tasks_data = []
-        for task in tasks:
-            # Get session statistics and calculate totals
-            sessions = PomodoroSession.query.filter_by(homework_id=task.id)
-            total_work_time = sum(s.work_duration for s in sessions)
-            total_break_time = sum(s.break_duration for s in sessions)
-            total_time_spent_minutes = total_work_time // 60  # Convert to minutes
-            
-            session_stats = {
-                'total_sessions': sessions.count(),
-                'completed_sessions': sessions.filter_by(completed=True).count(),
-                'incomplete_sessions': sessions.filter_by(completed=False).count(),
-                'total_work_time': total_work_time // 60,  # Convert to minutes
-                'total_break_time': total_break_time // 60   # Convert to minutes
-            }
-            
-            tasks_data.append({
-                'id': task.id,
-                'subject': task.subject,
-                'task': task.task,
-                'due_date': task.due_date.isoformat() if task.due_date else None,
-                'status': task.status,
-                'created_at': task.created_at.isoformat() if task.created_at else None,
-                'time_spent': total_time_spent_minutes,
-                'session_stats': session_stats
-            })
+        view = request.args.get('view', 'list')
+        if view not in ('list', 'calendar'):
+            return jsonify({'success': False, 'error': 'view must be list or calendar'}), 400
+        statuses = [status for status in request.args.get('status', '').split(',') if status]
+        if any(status not in TASK_STATUSES for status in statuses):
+            return jsonify({'success': False, 'error': f"status must be one of {', '.join(TASK_STATUSES)}"}), 400
+        try:
+            start = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+            end = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+        except ValueError:
+            return jsonify({'success': False, 'error': 'from and to must be dates (YYYY-MM-DD)'}), 400
+        if view == 'calendar':
+            # Default to the current week, Monday to Sunday
+            if start is None:
+                week_of = end or date.today()
+                start = week_of - timedelta(days=week_of.weekday())
+            end = end or start + timedelta(days=6)
+        if start and end:
+            if start > end:
+                return jsonify({'success': False, 'error': 'from must not be after to'}), 400
+            if view == 'calendar' and (end - start).days >= TASK_MAX_RANGE_DAYS:
+                return jsonify({'success': False, 'error': f'Calendars are limited to {TASK_MAX_RANGE_DAYS} days'}), 400
+        
+        tasks_data = [task_to_dict(row) for row in tasks_with_session_stats(user_id, start, end, statuses)]
+        if view == 'calendar':
+            return jsonify({
+                'success': True,
+                'from': start.isoformat(),
+                'to': end.isoformat(),
+                'days': tasks_by_day(tasks_data, start, end)
+            }), 200
 
         return jsonify({
             'success': True,
@@ -1588,7 +1999,10 @@ def update_task_status(task_id):
         if task.user_id != current_user_id and current_user.role != 'parent':
             return jsonify({'success': False, 'error': 'Unauthorized: Can only update your own tasks'}), 403
 
+        completed_delta = int(new_status == 'completed') - int(task.status == 'completed')
         task.status = new_status
+        if completed_delta:
+            update_child_stats(task.user_id, deltas={'completed_tasks': completed_delta})
         # Note: updated_at will be automatically set by SQLAlchemy if the column exists
         db.session.commit()
         
@@ -1599,6 +2013,36 @@ def update_task_status(task_id):
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/tasks/bulk', methods=['POST'])
+@jwt_required()
+def bulk_tasks():
+    """Create, update the status of, or delete many tasks in one transaction - requires JWT token"""
+    try:
+        current_user = db.session.get(User, get_jwt_identity())
+        data = request.get_json() or {}
+        operations = data.get('operations')
+        
+        if current_user is None:
+            return jsonify({'success': False, 'error': 'User not found'}), 404
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'success': False, 'error': 'operations must be a non-empty list'}), 400
+        if len(operations) > app.config['TASK_BULK_MAX_ITEMS']:
+            return jsonify({'success': False,
+                            'error': f"At most {app.config['TASK_BULK_MAX_ITEMS']} operations per request"}), 400
+        
+        # Nothing is written unless every operation is valid
+        parsed, errors = validate_operations(operations, current_user)
+        if errors:
+            return jsonify({'success': False, 'error': f'{len(errors)} invalid operations, nothing was changed',
+                            'results': errors}), 400
+        
+        results = apply_operations(parsed)
+        db.session.commit()
+        return jsonify({'success': True, 'results': results}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # ---------------------------
 # Pomodoro Session Routes
 # ---------------------------
@@ -1620,16 +2064,21 @@ def start_pomodoro():
             print("❌ Missing 'user_id' in request")
         if 'homework_id' not in data:
             print("❌ Missing 'homework_id' in request")
+        now = datetime.utcnow()
         session = PomodoroSession(
             user_id=data['user_id'],
             homework_id=data['homework_id'],
-            start_time=datetime.utcnow()
+            start_time=now,
+            started_at=now,
+            last_active_at=now
         )
         db.session.add(session)
 
         # Update task status to 'in-progress'
         task = db.session.get(HomeworkSchedule, data['homework_id'])
         if task:
+            if task.status == 'completed':
+                update_child_stats(task.user_id, deltas={'completed_tasks': -1})
             task.status = 'in-progress'
 
         # Session started successfully
@@ -1670,6 +2119,7 @@ def complete_pomodoro(session_id):
         session.break_duration = break_duration
         session.completed = True
         session.end_time = datetime.utcnow()
+        reopen_session_day(session)
 
         db.session.commit()
         return jsonify({'success': True, 'message': 'Pomodoro session completed'}), 200
@@ -1691,6 +2141,8 @@ def pause_pomodoro(session_id):
             session.work_duration += work_duration
 
         session.start_time = None  # Reset start time for next resume
+        session.last_active_at = datetime.utcnow()
+        reopen_session_day(session)
 
         # Session is now paused
 
@@ -1709,6 +2161,7 @@ def resume_pomodoro(session_id):
             return jsonify({'success': False, 'error': 'Session not found'}), 404
 
         session.start_time = datetime.utcnow()
+        session.last_active_at = session.start_time
 
         # Session resumed - break time will be calculated when session ends
 
@@ -1739,6 +2192,7 @@ def abandon_pomodoro(session_id):
         session.work_duration = work_duration
         session.break_duration = break_duration
         session.end_time = datetime.utcnow()
+        reopen_session_day(session)
 
         db.session.commit()
         return jsonify({'success': True, 'message': 'Session abandoned'}), 200
@@ -1748,26 +2202,43 @@ def abandon_pomodoro(session_id):
 
 @app.route('/api/task-time/analytics/<int:user_id>', methods=['GET'])
 def get_task_time_analytics(user_id):
-    """Get time analytics for a user"""
+    """Get time analytics for a user, with daily and per-subject study time over a date range"""
     try:
         homework_id = request.args.get('homework_id', type=int)
-        
-        # Get session statistics
+        try:
+            end = date.fromisoformat(request.args['to']) if request.args.get('to') else date.today()
+            start = date.fromisoformat(request.args['from']) if request.args.get('from') \
+                else end - timedelta(days=STUDY_DEFAULT_RANGE_DAYS - 1)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'from and to must be dates (YYYY-MM-DD)'}), 400
+        if start > end:
+            return jsonify({'success': False, 'error': 'from must not be after to'}), 400
+        if (end - start).days >= STUDY_MAX_RANGE_DAYS:
+            return jsonify({'success': False, 'error': f'Ranges are limited to {STUDY_MAX_RANGE_DAYS} days'}), 400
+        
+        # All-time session statistics in one aggregate query
         sessions = PomodoroSession.query.filter_by(user_id=user_id)
         if homework_id:
             sessions = sessions.filter_by(homework_id=homework_id)
-        
-        # Calculate analytics from PomodoroSession data
-        total_work_time = sum(s.work_duration for s in sessions)
-        total_break_time = sum(s.break_duration for s in sessions)
+        totals = sessions.with_entities(
+            db.func.coalesce(db.func.sum(PomodoroSession.work_duration), 0),
+            db.func.coalesce(db.func.sum(PomodoroSession.break_duration), 0),
+            db.func.count(PomodoroSession.id),
+            db.func.sum(db.case((PomodoroSession.completed.is_(True), 1), else_=0)),
+            db.func.sum(db.case((PomodoroSession.completed.is_(False), 1), else_=0)),
+            db.func.avg(PomodoroSession.work_duration),
+            db.func.avg(PomodoroSession.break_duration)
+        ).one()
+        total_work_time, total_break_time, total_sessions, completed, incomplete, avg_work, avg_break = totals
         
         session_stats = {
-            'total_sessions': sessions.count(),
-            'completed_sessions': sessions.filter_by(completed=True).count(),
-            'incomplete_sessions': sessions.filter_by(completed=False).count(),
-            'average_work_time': sessions.with_entities(db.func.avg(PomodoroSession.work_duration)).scalar() or 0,
-            'average_break_time': sessions.with_entities(db.func.avg(PomodoroSession.break_duration)).scalar() or 0
+            'total_sessions': total_sessions,
+            'completed_sessions': completed or 0,
+            'incomplete_sessions': incomplete or 0,
+            'average_work_time': avg_work or 0,
+            'average_break_time': avg_break or 0
         }
+        daily, by_subject = study_time_series(user_id, start, end, homework_id)
         
         return jsonify({
             'success': True,
@@ -1782,7 +2253,11 @@ def get_task_time_analytics(user_id):
                     'work_duration': s.work_duration,
                     'break_duration': s.break_duration,
                     'completed': s.completed
-                } for s in sessions.order_by(PomodoroSession.start_time.desc()).limit(10).all()]
+                } for s in sessions.order_by(PomodoroSession.start_time.desc()).limit(10).all()],
+                'from': start.isoformat(),
+                'to': end.isoformat(),
+                'daily': daily,
+                'by_subject': by_subject
             }
         }), 200
     except Exception as e:
@@ -1806,27 +2281,104 @@ def log_screen_time():
         duration_hours = duration_seconds / 3600.0
         today = date.today()
         
-        # Check if there's already a record for today
-        existing_record = ScreenTime.query.filter_by(user_id=user_id, date=today).first()
-        
-        if existing_record:
-            # Add to existing record
-            existing_record.hours += duration_hours
-        else:
-            # Create new record
-            new_record = ScreenTime(
-                user_id=user_id,
-                hours=duration_hours,
-                date=today
-            )
-            db.session.add(new_record)
+        # Add to today's record (created on the first log of the day)
+        total_hours = add_screen_time_hours(user_id, today, duration_hours)
         
         db.session.commit()
-        return jsonify({'success': True, 'message': 'Screen time logged successfully'}), 200
+        return jsonify({
+            'success': True,
+            'message': 'Screen time logged successfully',
+            'total_hours': round(total_hours, 4)
+        }), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def write_screen_time_batch(items):
+    """Flush target of screen_time_buffer: all pending (user, day) totals in one transaction.
+
+    Each total is written in its own savepoint; the keys that failed are
+    returned for the buffer to retry instead of undoing the whole batch.
+    """
+    failed = []
+    with app.app_context():
+        try:
+            for key, hours in items:
+                user_id, day = key
+                try:
+                    with db.session.begin_nested():
+                        add_screen_time_hours(user_id, day, hours)
+                except Exception as e:
+                    print(f"❌ Could not write screen time for {key!r}: {e}")
+                    failed.append(key)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    return failed
+
+screen_time_buffer = CoalescingBuffer(write_screen_time_batch,
+                                      max_keys=app.config['SCREEN_TIME_BUFFER_MAX_KEYS'],
+                                      max_age=app.config['SCREEN_TIME_BUFFER_SECONDS'])
+# Write whatever is still buffered when the process exits cleanly
+atexit.register(screen_time_buffer.flush)
+
+def parse_sample_day(timestamp):
+    """Local date of a heartbeat timestamp: ISO 8601 string, epoch seconds or milliseconds"""
+    if timestamp is None:
+        return date.today()
+    if isinstance(timestamp, bool):
+        raise ValueError('timestamp must be an ISO 8601 string or epoch number')
+    if isinstance(timestamp, (int, float)):
+        seconds = timestamp / 1000.0 if timestamp > 1e11 else timestamp  # JavaScript Date.now() is in ms
+        return datetime.fromtimestamp(seconds).date()
+    moment = datetime.fromisoformat(str(timestamp))
+    return (moment.astimezone() if moment.tzinfo else moment).date()
+
+# Largest id an INTEGER column holds on every supported database
+MAX_ROW_ID = 2**31 - 1
+
+@app.route('/api/screen-time/batch', methods=['POST'])
+def log_screen_time_batch():
+    """Accept many screen-time heartbeats at once; they are summed in memory and written in batches"""
+    try:
+        data = request.get_json() or {}
+        user_id = data.get('user_id')
+        samples = data.get('samples')
+        
+        if not isinstance(user_id, int) or isinstance(user_id, bool) or not isinstance(samples, list):
+            return jsonify({'success': False, 'error': 'user_id and a samples list are required'}), 400
+        # Checked before buffering: a bad key would only fail later, in the background flush
+        if not 0 < user_id <= MAX_ROW_ID or db.session.get(User, user_id) is None:
+            return jsonify({'success': False, 'error': 'Unknown user_id'}), 400
+        if len(samples) > app.config['SCREEN_TIME_BATCH_MAX_SAMPLES']:
+            return jsonify({'success': False,
+                            'error': f"At most {app.config['SCREEN_TIME_BATCH_MAX_SAMPLES']} samples per request"}), 400
+        
+        today = date.today()
+        accepted, rejected = [], []
+        for index, sample in enumerate(samples):
+            try:
+                duration_seconds = float(sample['duration_seconds'])
+                if not 0 < duration_seconds <= 86400:
+                    raise ValueError('duration_seconds must be between 0 and 86400')
+                day = parse_sample_day(sample.get('timestamp'))
+                if day > today:
+                    raise ValueError('timestamp is in the future')
+            except (KeyError, TypeError, ValueError, OverflowError, OSError) as e:
+                rejected.append({'index': index, 'error': str(e) if not isinstance(e, KeyError) else f'{e} is required'})
+                continue
+            accepted.append(((user_id, day), duration_seconds / 3600.0))
+        
+        screen_time_buffer.add_many(accepted)
+        return jsonify({
+            'success': True,
+            'accepted': len(accepted),
+            'rejected': rejected
+        }), 202
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # ---------------------------
 # Module Progress Routes
 # ---------------------------
@@ -1945,6 +2497,7 @@ def save_module_progress():
                 module_name=module_type
             ).first()
         
+        was_completed = bool(existing_progress.completed) if existing_progress else False
         if existing_progress:
             # Update existing progress
             existing_progress.progress = progress_percentage
@@ -1967,6 +2520,10 @@ def save_module_progress():
             db.session.add(new_progress)
             print(f"✅ Created new progress record for {module_type}")
         
+        completed_delta = int(bool(is_completed)) - int(was_completed)
+        if completed_delta:
+            update_child_stats(user_id, deltas={'completed_modules': completed_delta})
+        
         # Commit changes
         db.session.commit()
         
@@ -2748,6 +3305,108 @@ def internal_error(error):
 # Application Initialization
 # ---------------------------
 
+UNIQUE_INDEX_DEDUPES = {
+    'uq_health_task_user_date_name': HEALTH_TASK_DEDUPE_STATEMENTS,
+    'uq_water_log_user_date': WATER_LOG_DEDUPE_STATEMENTS,
+    'uq_screen_time_user_date': SCREEN_TIME_DEDUPE_STATEMENTS
+}
+
+def upgrade_database_schema():
+    """Bring an existing database up to date with the models.
+
+    db.create_all() only creates missing tables, so columns and indexes
+    added to existing models are created here. Safe to run repeatedly.
+    """
+    inspector = db.inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    connection.execute(db.text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                    print(f"✅ Added column {table.name}.{column.name}")
+            
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    try:
+                        # Unique indexes on old data need duplicates removed first
+                        for statement in UNIQUE_INDEX_DEDUPES.get(index.name, []):
+                            connection.execute(db.text(statement))
+                        index.create(connection)
+                        print(f"✅ Created index {index.name}")
+                    except Exception as e:
+                        print(f"❌ Could not create index {index.name}: {e}")
+        
+        # Backfill the chat sidebar columns for sessions created before they existed
+        connection.execute(db.text("""
+            UPDATE chat_session SET
+                interaction_count = (SELECT COUNT(*) FROM llm_interactions i WHERE i.session_id = chat_session.id),
+                last_message_preview = (
+                    SELECT CASE WHEN LENGTH(i.user_message) > 50
+                                THEN SUBSTR(i.user_message, 1, 50) || '...'
+                                ELSE i.user_message END
+                    FROM llm_interactions i WHERE i.session_id = chat_session.id
+                    ORDER BY i.user_timestamp DESC, i.id DESC LIMIT 1),
+                updated_at = COALESCE(updated_at, created_at)
+            WHERE interaction_count IS NULL OR updated_at IS NULL
+        """))
+        
+        # Sessions opened before last_active_at existed are judged by their start time
+        connection.execute(db.text(LAST_ACTIVE_BACKFILL))
+        
+        # Sessions from before started_at existed are counted on the day they were (last) started
+        connection.execute(db.text(STARTED_AT_BACKFILL))
+        
+        # Full-text index for /api/chat/search, kept in sync by triggers
+        try:
+            if install_chat_search(connection):
+                print("✅ Chat search index ready")
+        except Exception as e:
+            print(f"❌ Could not set up chat search index: {e}")
+
+@app.before_request
+def ensure_background_jobs():
+    # WSGI servers never run __main__, so the first request starts the jobs
+    if not scheduler.started:
+        start_background_jobs()
+
+def start_background_jobs():
+    """Register and start the periodic maintenance jobs (once per process)"""
+    if not app.config['BACKGROUND_JOBS_ENABLED']:
+        return
+    # The debug reloader's parent process only watches files; the child it spawns serves requests
+    if app.debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return
+    with scheduler_lock:
+        if scheduler.started:
+            return
+        register_background_jobs()
+        scheduler.start()
+    print(f"⏰ Started {len(scheduler.jobs)} background jobs")
+
+def register_background_jobs():
+    """Add every enabled maintenance job to the scheduler"""
+    if app.config['CHAT_RETENTION_DAYS'] > 0:
+        scheduler.add_job('chat-retention', app.config['CHAT_RETENTION_INTERVAL_HOURS'] * 3600,
+                          run_chat_retention_job, initial_delay=60)
+    scheduler.add_job('screen-time-flush', app.config['SCREEN_TIME_BUFFER_SECONDS'],
+                      screen_time_buffer.flush_if_due)
+    scheduler.add_job('dashboard-metrics', app.config['DASHBOARD_METRICS_INTERVAL_MINUTES'] * 60,
+                      run_dashboard_metrics_job, initial_delay=120)
+    scheduler.add_job('pomodoro-sweeper', app.config['POMODORO_SWEEP_INTERVAL_MINUTES'] * 60,
+                      run_pomodoro_sweeper_job, initial_delay=90)
+    scheduler.add_job('study-time-rollup', app.config['STUDY_ROLLUP_INTERVAL_HOURS'] * 3600,
+                      run_study_time_rollup_job, initial_delay=180)
+    if app.config['HEALTH_TASK_SEEDING_ENABLED']:
+        scheduler.add_job('health-task-seeding', 24 * 3600, run_health_task_seeding_job,
+                          initial_delay=seconds_until(app.config['HEALTH_TASK_SEED_HOUR'], datetime.now()))
+
 def initialize_database():
     """Initialize the database and create default users"""
     try:
@@ -2760,6 +3419,17 @@ def initialize_database():
             # Create all database tables (won't recreate if they exist)
             print("🔄 Creating database tables...")
             db.create_all()
+            upgrade_database_schema()
+            if not db.session.query(HealthRollup.user_id).first():
+                rolled_up = rebuild_rollups()
+                db.session.commit()
+                if rolled_up:
+                    print(f"✅ Built {rolled_up} water/screen-time rollups")
+            if not db.session.query(ActivityCalendar.user_id).first():
+                marked = backfill_from_counters()
+                db.session.commit()
+                if marked:
+                    print(f"✅ Backfilled {marked} streak days into activity_calendar")
             print("✅ Database tables created successfully!")
             
             # Create default admin user
@@ -2799,6 +3469,7 @@ def complete_activity():
         )
         
         db.session.add(achievement)
+        record_achievement(achievement)
         db.session.commit()
         
         # Calculate stars based on activity type
@@ -2901,6 +3572,7 @@ def create_achievement():
             achievement.icon = icon
         
         db.session.add(achievement)
+        record_achievement(achievement)
         db.session.commit()
         
         print(f"✅ Created achievement: {badge_name} for user {user_id}")
@@ -2925,6 +3597,48 @@ def create_achievement():
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/admin/chat-cache', methods=['GET'])
+def get_chat_cache_stats():
+    """Hit/miss counters for this worker's conversation cache"""
+    return jsonify({
+        'success': True,
+        'cache': conversation_cache.stats()
+    }), 200
+
+@app.route('/api/admin/llm-providers', methods=['GET'])
+def get_llm_provider_stats():
+    """Circuit breaker state and p95 latency of each LLM provider"""
+    return jsonify({
+        'success': True,
+        'providers': llm_gateway.stats()
+    }), 200
+
+@app.route('/api/admin/jobs', methods=['GET'])
+def get_background_jobs():
+    """Schedule and last result of the periodic maintenance jobs"""
+    return jsonify({
+        'success': True,
+        'jobs': scheduler.status(),
+        'buffers': {'screen_time': screen_time_buffer.stats()}
+    }), 200
+
+@app.route('/api/admin/metrics', methods=['GET'])
+def get_dashboard_metrics():
+    """Most recent DashboardMetrics snapshots, newest first"""
+    try:
+        limit = parse_limit(request.args.get('limit'), default=24, maximum=500)
+        snapshots = DashboardMetrics.query.filter(DashboardMetrics.period_end.isnot(None))\
+                                          .order_by(DashboardMetrics.period_end.desc(), DashboardMetrics.id.desc())\
+                                          .limit(limit).all()
+        return jsonify({
+            'success': True,
+            'snapshots': [snapshot_to_dict(snapshot) for snapshot in snapshots]
+        }), 200
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/admin/recreate-database', methods=['POST'])
 def recreate_database():
     """Recreate database tables (development only)"""
@@ -2938,11 +3652,16 @@ def recreate_database():
             
             # Create all tables with updated schema
             db.create_all()
+            with db.engine.begin() as connection:
+                install_chat_search(connection, rebuild=True)
             print("✅ Created all tables with updated schema")
             
             # Create default admin user
             create_default_admin()
             print("✅ Created default admin user")
+            
+            conversation_cache.clear()
+            leaderboard_cache.invalidate()
         
         return jsonify({
             'success': True,
@@ -2958,4 +3677,8 @@ def recreate_database():
 if __name__ == '__main__':
     # Initialize database when running directly
     initialize_database()
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    app.debug = True
+    start_background_jobs()
+    # Exit normally on SIGTERM so atexit handlers (buffered screen time) still run
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    app.run(port=5000)
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""Benchmark: database write throughput while chatbot calls are in flight.
+
+Runs the Flask app against a throwaway SQLite database with a fake LLM that
+takes --llm-latency seconds to answer. Writer threads hammer the water log
+endpoint first on an idle app and then while --chats chat threads keep LLM
+calls in flight, so any write lock held across the LLM round trip shows up
+as a throughput drop and "database is locked" errors.
+
+Usage (from the backend directory):
+    python benchmarks/chat_write_contention.py --chats 8 --writers 4 --duration 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_writers(client, user_ids, duration, stop_event=None):
+    """Hit the water log endpoint from one thread per user until time runs out"""
+    results = {'ok': 0, 'errors': 0, 'latencies': []}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def writer(user_id):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = client.post(f'/api/health/water/{user_id}')
+            elapsed = time.perf_counter() - started
+            with lock:
+                if response.status_code == 200:
+                    results['ok'] += 1
+                    results['latencies'].append(elapsed)
+                else:
+                    results['errors'] += 1
+
+    threads = [threading.Thread(target=writer, args=(user_id,)) for user_id in user_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if stop_event:
+        stop_event.set()
+    return results
+
+
+def run_chats(client, user_id, stop_event, counter):
+    while not stop_event.is_set():
+        response = client.post('/api/chat', json={'message': 'Tell me a joke', 'user_id': user_id})
+        counter.append(response.status_code)
+
+
+def report(label, results, duration):
+    latencies = results['latencies']
+    print(f"{label:<22} writes/s={results['ok'] / duration:8.1f}  "
+          f"errors={results['errors']:<5} "
+          f"p50={percentile(latencies, 50) * 1000:7.1f}ms  "
+          f"p95={percentile(latencies, 95) * 1000:7.1f}ms  "
+          f"max={max(latencies, default=0) * 1000:7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chats', type=int, default=8, help='concurrent chat threads')
+    parser.add_argument('--writers', type=int, default=4, help='concurrent writer threads')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per phase')
+    parser.add_argument('--llm-latency', type=float, default=1.0, help='fake LLM latency in seconds')
+    args = parser.parse_args()
+
+    database_dir = tempfile.mkdtemp(prefix='kidquest-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(database_dir, 'bench.db')}"
+    # Answer LLM calls with the gateway's offline fake provider
+    os.environ['LLM_FAKE_PROVIDER'] = '1'
+    os.environ['LLM_FAKE_LATENCY'] = str(args.llm_latency)
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+
+    import app as kidquest
+    kidquest.initialize_database()
+    client = kidquest.app.test_client()
+    writer_ids = list(range(1, args.writers + 1))
+
+    print(f"Database: {os.environ['DATABASE_URL']}")
+    print(f"{args.writers} writers, {args.chats} chats, fake LLM latency {args.llm_latency}s, "
+          f"{args.duration}s per phase\n")
+
+    report('idle', run_writers(client, writer_ids, args.duration), args.duration)
+
+    stop_event = threading.Event()
+    chat_statuses = []
+    chat_threads = [threading.Thread(target=run_chats, args=(client, 1000 + i, stop_event, chat_statuses))
+                    for i in range(args.chats)]
+    for thread in chat_threads:
+        thread.start()
+    time.sleep(min(args.llm_latency / 2, 1.0))  # let the first LLM calls get in flight
+    busy = run_writers(client, writer_ids, args.duration, stop_event)
+    for thread in chat_threads:
+        thread.join()
+
+    report('chats in flight', busy, args.duration)
+    failed_chats = sum(1 for status in chat_statuses if status != 200)
+    print(f"\nchat turns completed: {len(chat_statuses)} ({failed_chats} failed)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Stress test: concurrent water / screen-time increments must not be lost.
+
+Starts --threads threads that each send --requests increments for the same
+child, first through the old read-modify-write code (copied below) and then
+through the API endpoints, which use a single INSERT ... ON CONFLICT DO
+UPDATE ... RETURNING statement. Afterwards the stored totals are compared
+with the number of successful increments; the atomic path must lose none.
+
+Usage (from the backend directory):
+    python benchmarks/counter_stress.py --threads 8 --requests 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCREEN_SECONDS = 36  # 0.01 hours per request
+
+
+def legacy_increments(kidquest, models, user_id, today):
+    """increment_water / log_screen_time as they were: read the row, add in Python, commit"""
+    db = models.db
+
+    def increment():
+        with kidquest.app.app_context():
+            try:
+                log = models.WaterLog.query.filter_by(user_id=user_id, date=today).first()
+                if not log:
+                    db.session.add(models.WaterLog(user_id=user_id, count=1, date=today))
+                else:
+                    log.count += 1
+                db.session.commit()  # the two counters were separate requests
+                screen = models.ScreenTime.query.filter_by(user_id=user_id, date=today).first()
+                if screen:
+                    screen.hours += SCREEN_SECONDS / 3600.0
+                else:
+                    db.session.add(models.ScreenTime(user_id=user_id, hours=SCREEN_SECONDS / 3600.0, date=today))
+                db.session.commit()
+                return True
+            except Exception:
+                db.session.rollback()
+                return False
+
+    return increment
+
+
+def api_increments(client, user_id):
+    def increment():
+        water = client.post(f'/api/health/water/{user_id}')
+        screen = client.post('/api/screen-time/log', json={'user_id': user_id, 'duration_seconds': SCREEN_SECONDS})
+        return water.status_code == 200 and screen.status_code == 200
+
+    return increment
+
+
+def hammer(increment, threads, requests):
+    results = {'ok': 0, 'failed': 0}
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(requests):
+            ok = increment()
+            with lock:
+                results['ok' if ok else 'failed'] += 1
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    results['elapsed'] = time.perf_counter() - started
+    return results
+
+
+def stored_totals(kidquest, models, user_id, today):
+    with kidquest.app.app_context():
+        water = models.db.session.query(models.db.func.sum(models.WaterLog.count))\
+                                 .filter_by(user_id=user_id, date=today).scalar() or 0
+        hours = models.db.session.query(models.db.func.sum(models.ScreenTime.hours))\
+                                 .filter_by(user_id=user_id, date=today).scalar() or 0.0
+    return water, round(hours * 3600 / SCREEN_SECONDS)
+
+
+def report(label, results, water, screen):
+    ok = results['ok']
+    print(f"{label:<8} ok={ok:<6} failed={results['failed']:<5} req/s={ok / results['elapsed']:8.1f}  "
+          f"water lost={ok - water:<5} screen-time lost={ok - screen}")
+    return ok - water == 0 and ok - screen == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='increments per thread')
+    parser.add_argument('--skip-legacy', action='store_true', help='only run the atomic endpoints')
+    args = parser.parse_args()
+
+    database_dir = tempfile.mkdtemp(prefix='kidquest-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(database_dir, 'bench.db')}"
+    os.environ['BACKGROUND_JOBS_ENABLED'] = '0'
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+
+    import app as kidquest
+    import models
+
+    kidquest.initialize_database()
+    today = date.today()
+    with kidquest.app.app_context():
+        for user_id in (9001, 9002):
+            models.db.session.add(models.User(id=user_id, username=f'stress{user_id}',
+                                              email=f'stress{user_id}@example.com', password_hash='x', role='child'))
+        models.db.session.commit()
+
+    print(f"{args.threads} threads x {args.requests} increments\n")
+    if not args.skip_legacy:
+        with kidquest.app.app_context():
+            # The old code relied on there being no unique index
+            models.db.session.execute(models.db.text('DROP INDEX uq_water_log_user_date'))
+            models.db.session.execute(models.db.text('DROP INDEX uq_screen_time_user_date'))
+            models.db.session.commit()
+        legacy = hammer(legacy_increments(kidquest, models, 9001, today), args.threads, args.requests)
+        report('legacy', legacy, *stored_totals(kidquest, models, 9001, today))
+        with kidquest.app.app_context():
+            models.db.session.execute(models.db.text('DELETE FROM water_log'))
+            models.db.session.execute(models.db.text('DELETE FROM screen_time'))
+            models.db.session.commit()
+        kidquest.initialize_database()  # recreates the unique indexes
+        with kidquest.app.app_context():
+            models.db.engine.dispose()  # pooled connections still have the old schema
+
+    atomic = hammer(api_increments(kidquest.app.test_client(), 9002), args.threads, args.requests)
+    if not report('atomic', atomic, *stored_totals(kidquest, models, 9002, today)):
+        print("\nFAIL: the atomic endpoints lost increments")
+        return 1
+    print("\nno increments lost")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
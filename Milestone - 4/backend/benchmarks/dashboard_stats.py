@@ -0,0 +1,188 @@
+"""Benchmark: child dashboard figures, legacy calculators vs one SQL aggregation.
+
+Seeds a throwaway SQLite database with one child who has --achievements
+achievements (plus module progress, tasks, health tasks, water and
+streaks) and times three ways of producing the dashboard figures:
+
+    legacy       the original calculate_* functions (copied below), which
+                 load every Achievement row into Python
+    aggregation  services.child_stats.calculate_dashboard_stats - one SELECT
+                 with GROUP BY / SUM(CASE ...) subqueries
+    child_stats  the ChildStats primary-key lookup served by /api/child/stats
+
+All three must return the same figures; the script checks that first.
+
+Usage (from the backend directory):
+    python benchmarks/dashboard_stats.py --achievements 10000 --repeat 20
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_dashboard_stats(models, user_id, today):
+    """The dashboard calculators as they were before ChildStats (logging removed)"""
+    db = models.db
+    Achievement, LoginStreak, HealthStreak = models.Achievement, models.LoginStreak, models.HealthStreak
+    UserModuleProgress, HomeworkSchedule = models.UserModuleProgress, models.HomeworkSchedule
+    HealthTask, WaterLog = models.HealthTask, models.WaterLog
+
+    def calculate_total_stars(user_id):
+        stars = 0
+        achievements = Achievement.query.filter_by(user_id=user_id).all()
+        for achievement in achievements:
+            if 'Memory Game' in achievement.badge_name:
+                stars += 5
+            else:
+                stars += 10
+        login_streak = LoginStreak.query.filter_by(user_id=user_id).first()
+        if login_streak:
+            stars += login_streak.current_streak * 1
+        health_streak = HealthStreak.query.filter_by(user_id=user_id).first()
+        if health_streak:
+            stars += health_streak.current_streak * 2
+        return stars
+
+    def calculate_quests_completed(user_id):
+        quests = 0
+        module_progress = UserModuleProgress.query.filter_by(user_id=user_id, completed=True).all()
+        quests += len(module_progress)
+        completed_tasks = HomeworkSchedule.query.filter_by(user_id=user_id, status='completed').all()
+        quests += len(completed_tasks)
+        achievements = Achievement.query.filter_by(user_id=user_id).all()
+        for achievement in achievements:
+            if not achievement.badge_name or not achievement.badge_name.startswith('module_'):
+                quests += 1
+        return quests
+
+    def calculate_skills_mastered(user_id):
+        return Achievement.query.filter_by(user_id=user_id).count() // 3
+
+    def calculate_todays_goals(user_id, today):
+        goals = 0
+        today_achievements = Achievement.query.filter_by(user_id=user_id).filter(
+            db.func.date(Achievement.date_awarded) == today
+        ).all()
+        for achievement in today_achievements:
+            if not achievement.badge_name or not achievement.badge_name.startswith('module_'):
+                goals += 1
+        goals += UserModuleProgress.query.filter_by(user_id=user_id, completed=True).count()
+        goals += HomeworkSchedule.query.filter_by(user_id=user_id, status='completed').count()
+        goals += HealthTask.query.filter_by(user_id=user_id, completed=True, date=today).count()
+        login_streak = LoginStreak.query.filter_by(user_id=user_id).first()
+        if login_streak and login_streak.last_login_date == today:
+            goals += 1
+        water_log = WaterLog.query.filter_by(user_id=user_id, date=today).first()
+        if water_log and water_log.count >= 8:
+            goals += 1
+        return goals
+
+    total_stars = calculate_total_stars(user_id)
+    login_streak = LoginStreak.query.filter_by(user_id=user_id).first()
+    return {
+        'totalStars': total_stars,
+        'questsCompleted': calculate_quests_completed(user_id),
+        'skillsLearned': calculate_skills_mastered(user_id),
+        'todayGoals': calculate_todays_goals(user_id, today),
+        'streakDays': login_streak.current_streak if login_streak else 0,
+        'userLevel': max(1, total_stars // 50)
+    }
+
+
+def seed(models, user_id, achievement_count, today):
+    db = models.db
+    db.session.add(models.User(id=user_id, username=f'bench{user_id}', email=f'bench{user_id}@example.com',
+                               password_hash='x', role='child'))
+    badges = ['Memory Game Master', 'Music Player Master', 'Drawing Star', 'module_math_magic']
+    now = datetime.utcnow()
+    db.session.execute(db.insert(models.Achievement), [{
+        'user_id': user_id,
+        'badge_name': random.choice(badges),
+        'description': 'Seeded achievement',
+        'date_awarded': now - timedelta(days=random.randint(0, 365))
+    } for _ in range(achievement_count)])
+    db.session.execute(db.insert(models.UserModuleProgress), [{
+        'user_id': user_id, 'module_name': f'module_{i}', 'progress': 100, 'completed': i % 2 == 0
+    } for i in range(20)])
+    db.session.execute(db.insert(models.HomeworkSchedule), [{
+        'user_id': user_id, 'subject': 'Maths', 'task': f'Task {i}',
+        'status': random.choice(['pending', 'in-progress', 'completed'])
+    } for i in range(200)])
+    db.session.execute(db.insert(models.HealthTask), [{
+        'user_id': user_id, 'task_name': f'Task {i}', 'date': today, 'completed': i < 3
+    } for i in range(5)])
+    db.session.add(models.WaterLog(user_id=user_id, date=today, count=9))
+    db.session.add(models.LoginStreak(user_id=user_id, current_streak=12, last_login_date=today,
+                                      total_logins=40, longest_streak=15))
+    db.session.add(models.HealthStreak(user_id=user_id, current_streak=4, last_updated=today))
+    db.session.commit()
+
+
+def timed(label, func, repeat, statements):
+    durations = []
+    statements[0] = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    print(f"{label:<13} median={durations[len(durations) // 2] * 1000:8.2f}ms  "
+          f"max={durations[-1] * 1000:8.2f}ms  queries/call={statements[0] / repeat:5.1f}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--achievements', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    database_dir = tempfile.mkdtemp(prefix='kidquest-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(database_dir, 'bench.db')}"
+    os.environ['BACKGROUND_JOBS_ENABLED'] = '0'
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+
+    import app as kidquest
+    import models
+    from services.child_stats import calculate_dashboard_stats, dashboard_stats, rebuild_child_stats
+
+    kidquest.initialize_database()
+    user_id, today = 9000, date.today()
+    statements = [0]
+
+    def count_statement(*_):
+        statements[0] += 1
+
+    with kidquest.app.app_context():
+        seed(models, user_id, args.achievements, today)
+        rebuild_child_stats([user_id], today)
+        models.db.session.commit()
+        models.db.event.listen(models.db.engine, 'before_cursor_execute', count_statement)
+
+        print(f"User {user_id} with {args.achievements} achievements, {args.repeat} runs each\n")
+        legacy = timed('legacy', lambda: legacy_dashboard_stats(models, user_id, today), args.repeat, statements)
+        aggregated = timed('aggregation', lambda: calculate_dashboard_stats(user_id, today), args.repeat, statements)
+
+        def lookup():
+            models.db.session.expire_all()
+            return dashboard_stats(models.db.session.get(models.ChildStats, user_id), today)
+
+        stored = timed('child_stats', lookup, args.repeat, statements)
+
+    print(f"\nfigures: {aggregated}")
+    if not legacy == aggregated == stored:
+        print(f"MISMATCH legacy={legacy} child_stats={stored}")
+        return 1
+    print("all three agree")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""Load test for the LLM-backed endpoints: chat and the psychometry test.
+
+Each worker thread keeps its own requests.Session (so the Flask session
+cookie used by the psychometry routes survives between calls) and loops
+over a weighted mix of scenarios until the duration runs out:
+
+    chat         POST /api/chat (or a streamed reply with --stream)
+    psychometry  POST /api/psychometry/start, then one
+                 POST /api/psychometry/submit per question
+
+Latency percentiles and error rates are reported per endpoint.
+
+With --spawn the script starts benchmarks/mock_llm_server.py in-process and
+the backend as a subprocess on a throwaway SQLite database, so a run needs
+no network access and never touches instance/app.db. Without it, point
+--base-url at a backend you started yourself.
+
+Usage (from the backend directory):
+    python benchmarks/loadtest.py --spawn --concurrency 16 --duration 30
+    python benchmarks/loadtest.py --base-url http://127.0.0.1:5000 --mix chat=1
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARK_DIR)
+
+CHAT_MESSAGES = [
+    "Hi! I had a great day at school today",
+    "Can you help me plan my maths homework?",
+    "I feel a bit nervous about my test tomorrow",
+    "Tell me a fun fact about space"
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Recorder:
+    """Thread-safe latency and error counters per endpoint"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            if ok:
+                self.latencies[endpoint].append(seconds)
+            else:
+                self.errors[endpoint] += 1
+
+    def report(self, duration):
+        print(f"{'endpoint':<28}{'requests':>9}{'errors':>8}{'err%':>7}{'req/s':>8}"
+              f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            latencies = self.latencies[endpoint]
+            errors = self.errors[endpoint]
+            total = len(latencies) + errors
+            print(f"{endpoint:<28}{total:>9}{errors:>8}{errors / total * 100:>6.1f}%{total / duration:>8.1f}"
+                  f"{percentile(latencies, 50) * 1000:>9.0f}{percentile(latencies, 95) * 1000:>9.0f}"
+                  f"{percentile(latencies, 99) * 1000:>9.0f}{max(latencies, default=0) * 1000:>9.0f}")
+
+
+def timed_post(http, recorder, base_url, path, label, timeout, **kwargs):
+    """POST and record the latency; returns the decoded JSON body or None on failure"""
+    started = time.perf_counter()
+    try:
+        response = http.post(base_url + path, timeout=timeout, **kwargs)
+        body = response.json()
+        ok = response.status_code == 200 and body.get('success', True) is not False and 'error' not in body
+    except (requests.RequestException, ValueError):
+        body, ok = None, False
+    recorder.record(label, time.perf_counter() - started, ok)
+    return body if ok else None
+
+
+def chat_scenario(http, recorder, args, user_id, state):
+    payload = {'message': random.choice(CHAT_MESSAGES), 'user_id': user_id}
+    if state.get('session_id'):
+        payload['session_id'] = state['session_id']
+
+    if not args.stream:
+        body = timed_post(http, recorder, args.base_url, '/api/chat', 'POST /api/chat', args.timeout, json=payload)
+        if body:
+            state['session_id'] = body.get('session_id')
+        return
+
+    payload['stream'] = True
+    started = time.perf_counter()
+    first_token = None
+    ok = False
+    try:
+        with http.post(args.base_url + '/api/chat', json=payload, stream=True, timeout=args.timeout) as response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                if first_token is None and '"token"' in line:
+                    first_token = time.perf_counter() - started
+                if '"done"' in line:
+                    ok = '"success": true' in line
+    except requests.RequestException:
+        ok = False
+    recorder.record('POST /api/chat (stream)', time.perf_counter() - started, ok)
+    if first_token is not None:
+        recorder.record('POST /api/chat (first token)', first_token, True)
+
+
+def psychometry_scenario(http, recorder, args, user_id, state):
+    question = timed_post(http, recorder, args.base_url, '/api/psychometry/start', 'POST /api/psychometry/start',
+                          args.timeout, json={'user_id': user_id})
+    while question and 'question' in question:
+        answer = random.choice(list(question.get('options') or 'ABCD'))
+        question = timed_post(http, recorder, args.base_url, '/api/psychometry/submit',
+                              'POST /api/psychometry/submit', args.timeout,
+                              json={'user_id': user_id, 'answer': answer})
+
+
+SCENARIOS = {
+    'chat': chat_scenario,
+    'psychometry': psychometry_scenario
+}
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def worker(index, args, recorder, deadline):
+    http = requests.Session()
+    user_id = args.user_id_base + index
+    state = {}
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    while time.perf_counter() < deadline:
+        SCENARIOS[random.choices(names, weights)[0]](http, recorder, args, user_id, state)
+
+
+def wait_for_backend(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(base_url + '/api/modules/info', timeout=1)
+            return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def spawn_stack(args):
+    """Start the mock LLM server in a thread and the backend as a subprocess"""
+    sys.path.insert(0, BENCHMARK_DIR)
+    from mock_llm_server import create_server
+
+    mock = create_server(port=args.mock_port, latency=args.llm_latency,
+                         tokens_per_second=args.tokens_per_second, error_rate=args.llm_error_rate)
+    threading.Thread(target=mock.serve_forever, daemon=True).start()
+
+    mock_url = f"http://127.0.0.1:{args.mock_port}/v1/chat/completions"
+    database_dir = tempfile.mkdtemp(prefix='kidquest-load-')
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(database_dir, 'load.db')}",
+               GROQ_API_URL=mock_url,
+               OPENROUTER_API_URL=mock_url)
+    port = args.base_url.rsplit(':', 1)[-1].strip('/')
+    backend = subprocess.Popen(
+        [sys.executable, '-c',
+         f"import app; app.initialize_database(); app.app.run(port={port}, threaded=True)"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return mock, backend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent simulated users')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to generate load')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('chat=3,psychometry=1'),
+                        help='weighted scenarios, e.g. chat=3,psychometry=1')
+    parser.add_argument('--stream', action='store_true', help='use streamed chat replies')
+    parser.add_argument('--timeout', type=float, default=60.0, help='per-request timeout in seconds')
+    parser.add_argument('--user-id-base', type=int, default=5000, help='first simulated user id')
+    parser.add_argument('--spawn', action='store_true', help='start the mock LLM and a throwaway backend')
+    parser.add_argument('--mock-port', type=int, default=8600)
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='mock LLM latency (with --spawn)')
+    parser.add_argument('--tokens-per-second', type=float, default=50.0, help='mock LLM token rate (with --spawn)')
+    parser.add_argument('--llm-error-rate', type=float, default=0.0, help='mock LLM 503 rate (with --spawn)')
+    args = parser.parse_args()
+    args.base_url = args.base_url.rstrip('/')
+
+    mock = backend = None
+    if args.spawn:
+        mock, backend = spawn_stack(args)
+    try:
+        if not wait_for_backend(args.base_url):
+            print(f"Backend at {args.base_url} is not reachable")
+            return 1
+
+        mix = ', '.join(f"{name}={weight:g}" for name, weight in args.mix.items())
+        print(f"Target {args.base_url}: {args.concurrency} users, {args.duration}s, mix {mix}"
+              f"{', streaming chat' if args.stream else ''}\n")
+
+        recorder = Recorder()
+        deadline = time.perf_counter() + args.duration
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(index, args, recorder, deadline))
+                   for index in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        recorder.report(time.perf_counter() - started)
+        return 0
+    finally:
+        if backend:
+            backend.terminate()
+            backend.wait()
+        if mock:
+            mock.shutdown()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""Local stand-in for Groq/OpenRouter that speaks the OpenAI chat-completions API.
+
+Answers POST .../chat/completions with canned but realistic content: chat
+replies with a [MOOD: ...] tag, a 20-question psychometry test in the format
+QuestionGenerator parses, HTML feedback, or a conversation summary. Both
+plain JSON and `"stream": true` Server-Sent Events are supported. Latency
+and token rate are configurable, so backend throughput can be measured
+without touching the real providers.
+
+Usage (from the backend directory):
+    python benchmarks/mock_llm_server.py --port 8600 --latency 0.8 --tokens-per-second 40
+
+Then start the backend pointed at it:
+    GROQ_API_URL=http://127.0.0.1:8600/v1/chat/completions \\
+    OPENROUTER_API_URL=http://127.0.0.1:8600/v1/chat/completions python app.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHAT_REPLIES = [
+    "That sounds like a really fun day! What was your favourite part? [MOOD: happy]",
+    "It's okay to feel a little worried sometimes. Do you want to tell me more about it? [MOOD: anxious]",
+    "Great question! Let's break your homework into small steps so it feels easier. [MOOD: neutral]",
+    "I'm sorry that happened. Talking to someone you trust can really help. [MOOD: sad]"
+]
+
+QUESTION_CATEGORIES = [
+    ('visual_learning', 'preference'), ('auditory_learning', 'preference'),
+    ('kinesthetic_learning', 'preference'), ('visual_learning', 'preference'),
+    ('interest_sports', 'preference'), ('interest_arts', 'preference'),
+    ('interest_technology', 'preference'), ('interest_nature', 'preference'),
+    ('personality_creative', 'preference'), ('personality_analytical', 'preference'),
+    ('personality_social', 'preference'), ('personality_practical', 'preference'),
+    ('personality_creative', 'preference'), ('concentration', 'standard'),
+    ('concentration', 'standard'), ('concentration', 'standard'),
+    ('concentration', 'standard'), ('memory', 'standard'),
+    ('memory', 'standard'), ('memory', 'standard')
+]
+
+FEEDBACK_HTML = (
+    "<h3>Great job finishing the quest!</h3><p>You learn best when you can <b>see</b> ideas, "
+    "so try drawing mind maps and using colours in your notes.</p><ul><li>Take short breaks "
+    "to keep your focus sharp.</li><li>Practise memory games with your family.</li></ul>"
+)
+
+SUMMARY_TEXT = ("The child talked about school, homework and friends. The companion offered "
+                "to help plan homework in small steps and to check in about how they feel.")
+
+_TOKEN_PATTERN = re.compile(r"\S+\s*")
+
+
+def psychometry_test_text():
+    lines = []
+    for number, (category, question_type) in enumerate(QUESTION_CATEGORIES, start=1):
+        lines += [
+            f"Question {number}: During a school trip (#{random.randint(1, 9999)}), what would you enjoy most?",
+            f"Category: {category}",
+            f"Type: {question_type}",
+            "A) Looking at the colourful maps and pictures",
+            "B) Listening to the guide's stories",
+            "C) Trying the hands-on activities",
+            "D) Chatting with my friends about it",
+            f"Correct Answer: {random.choice('ABCD')}",
+            ""
+        ]
+    return "\n".join(lines)
+
+
+def reply_for(messages):
+    """Pick canned content that matches what the backend asked for"""
+    prompt = " ".join(message.get('content') or '' for message in messages)
+    if 'Create exactly 20 questions' in prompt:
+        return psychometry_test_text()
+    if 'feedback report' in prompt:
+        return FEEDBACK_HTML
+    if 'running summary' in prompt:
+        return SUMMARY_TEXT
+    return random.choice(CHAT_REPLIES)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real providers
+    settings = None
+    stats = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            request_body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': {'message': 'invalid JSON'}})
+            return
+        if not self.path.rstrip('/').endswith('chat/completions'):
+            self._send_json(404, {'error': {'message': f'unknown path {self.path}'}})
+            return
+
+        settings = self.settings
+        self.stats.record_request()
+        time.sleep(max(0.0, random.gauss(settings.latency, settings.jitter)))
+        if random.random() < settings.error_rate:
+            self.stats.record_error()
+            self._send_json(503, {'error': {'message': 'mock provider overloaded'}})
+            return
+
+        content = reply_for(request_body.get('messages', []))
+        tokens = _TOKEN_PATTERN.findall(content)
+        token_delay = 1.0 / settings.tokens_per_second if settings.tokens_per_second > 0 else 0.0
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request_body.get('model', 'mock-model')
+
+        if request_body.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            for token in tokens:
+                time.sleep(token_delay)
+                chunk = {'id': completion_id, 'object': 'chat.completion.chunk', 'model': model,
+                         'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+            return
+
+        time.sleep(token_delay * len(tokens))
+        self._send_json(200, {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                         'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': len(tokens), 'total_tokens': len(tokens)}
+        })
+
+
+class ServerStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+
+def create_server(host='127.0.0.1', port=8600, latency=0.5, jitter=0.0, tokens_per_second=50.0, error_rate=0.0):
+    """Build a mock server; call serve_forever() on it (or run it in a thread)"""
+    settings = argparse.Namespace(latency=latency, jitter=jitter,
+                                  tokens_per_second=tokens_per_second, error_rate=error_rate)
+    handler = type('ConfiguredMockLLMHandler', (MockLLMHandler,),
+                   {'settings': settings, 'stats': ServerStats()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds before the first token')
+    parser.add_argument('--jitter', type=float, default=0.0, help='std-dev of the latency in seconds')
+    parser.add_argument('--tokens-per-second', type=float, default=50.0, help='0 sends the whole reply at once')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of calls answered with 503')
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.latency, args.jitter, args.tokens_per_second, args.error_rate)
+    print(f"Mock LLM listening on http://{args.host}:{args.port}/v1/chat/completions "
+          f"(latency {args.latency}s, {args.tokens_per_second} tokens/s, error rate {args.error_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stats = server.RequestHandlerClass.stats
+        print(f"\nServed {stats.requests} requests ({stats.errors} simulated errors)")
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
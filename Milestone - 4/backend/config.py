@@ -14,7 +14,91 @@ class Config:
 
     GROQ_API_KEY = "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"
     OPENROUTER_API_KEY = "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"
-    OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+    OPENROUTER_API_URL = os.environ.get('OPENROUTER_API_URL', "https://openrouter.ai/api/v1/chat/completions")
+    GROQ_API_URL = os.environ.get('GROQ_API_URL', "https://api.groq.com/openai/v1/chat/completions")
+
+    # LLM gateway (services/llm_gateway.py): each route lists (provider, model)
+    # in failover order; on LLM_HEDGE_ROUTES the next provider is hedged in
+    # once the first has been slower than its p95 latency on that route
+    LLM_ROUTES = {
+        'chat': [
+            ('groq', "meta-llama/llama-4-maverick-17b-128e-instruct"),
+            ('openrouter', "meta-llama/llama-4-maverick:free")
+        ],
+        'psychometry': [
+            ('openrouter', "mistralai/mistral-small-3.2-24b-instruct:free"),
+            ('groq', "meta-llama/llama-4-maverick-17b-128e-instruct")
+        ]
+    }
+    LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 2))
+    LLM_HEDGE_ENABLED = os.environ.get('LLM_HEDGE_ENABLED', '1') == '1'
+    LLM_HEDGE_DEFAULT_DELAY = float(os.environ.get('LLM_HEDGE_DEFAULT_DELAY', 3))
+    # Psychometry replies are long and take far longer than the default delay, so hedging
+    # them would pay for a duplicate call almost every time
+    LLM_HEDGE_ROUTES = [route for route in os.environ.get('LLM_HEDGE_ROUTES', 'chat').split(',') if route]
+    LLM_BREAKER_FAILURES = int(os.environ.get('LLM_BREAKER_FAILURES', 5))
+    LLM_BREAKER_RESET_SECONDS = float(os.environ.get('LLM_BREAKER_RESET_SECONDS', 30))
+    # Set LLM_FAKE_PROVIDER=1 to answer every LLM call locally (offline testing)
+    LLM_FAKE_PROVIDER = os.environ.get('LLM_FAKE_PROVIDER', '0') == '1'
+    LLM_FAKE_LATENCY = float(os.environ.get('LLM_FAKE_LATENCY', 0))
+
+    # Chatbot LLM worker pool (LLM calls run outside any database transaction)
+    LLM_MAX_WORKERS = int(os.environ.get('LLM_MAX_WORKERS', 8))
+    LLM_MAX_QUEUE = int(os.environ.get('LLM_MAX_QUEUE', 16))
+    LLM_QUEUE_WAIT = float(os.environ.get('LLM_QUEUE_WAIT', 5))
+    LLM_CALL_TIMEOUT = float(os.environ.get('LLM_CALL_TIMEOUT', 30))
+
+    # Chatbot context window: newest turns are sent until the token budget is
+    # used up, older turns are folded into ChatSession.summary in the background
+    CHAT_CONTEXT_TOKEN_BUDGET = int(os.environ.get('CHAT_CONTEXT_TOKEN_BUDGET', 1500))
+    CHAT_CONTEXT_MAX_TURNS = int(os.environ.get('CHAT_CONTEXT_MAX_TURNS', 20))
+    CHAT_SUMMARY_BATCH_TURNS = int(os.environ.get('CHAT_SUMMARY_BATCH_TURNS', 4))
+    CHAT_CACHE_MAX_SESSIONS = int(os.environ.get('CHAT_CACHE_MAX_SESSIONS', 1024))
+
+    # Chat history retention: interactions older than CHAT_RETENTION_DAYS are
+    # moved to llm_interaction_archive ('archive') or dropped ('delete') in
+    # short batches. 0 disables the job.
+    CHAT_RETENTION_DAYS = int(os.environ.get('CHAT_RETENTION_DAYS', 0))
+    CHAT_RETENTION_MODE = os.environ.get('CHAT_RETENTION_MODE', 'archive')
+    CHAT_RETENTION_BATCH_SIZE = int(os.environ.get('CHAT_RETENTION_BATCH_SIZE', 500))
+    CHAT_RETENTION_INTERVAL_HOURS = float(os.environ.get('CHAT_RETENTION_INTERVAL_HOURS', 24))
+
+    # /api/screen-time/batch sums samples per child and day in memory and writes them
+    # once SCREEN_TIME_BUFFER_MAX_KEYS are pending or the oldest is this many seconds old
+    SCREEN_TIME_BUFFER_SECONDS = float(os.environ.get('SCREEN_TIME_BUFFER_SECONDS', 5))
+    SCREEN_TIME_BUFFER_MAX_KEYS = int(os.environ.get('SCREEN_TIME_BUFFER_MAX_KEYS', 500))
+    SCREEN_TIME_BATCH_MAX_SAMPLES = int(os.environ.get('SCREEN_TIME_BATCH_MAX_SAMPLES', 500))
+
+    # Largest /api/tasks/bulk request (operations applied in one transaction)
+    TASK_BULK_MAX_ITEMS = int(os.environ.get('TASK_BULK_MAX_ITEMS', 500))
+
+    # Leaderboard snapshots are cached per scope (global / family) for this long
+    LEADERBOARD_CACHE_SECONDS = float(os.environ.get('LEADERBOARD_CACHE_SECONDS', 30))
+    LEADERBOARD_MAX_SCOPES = int(os.environ.get('LEADERBOARD_MAX_SCOPES', 256))
+
+    # DashboardMetrics rollup: each run snapshots the activity since the previous one
+    DASHBOARD_METRICS_INTERVAL_MINUTES = float(os.environ.get('DASHBOARD_METRICS_INTERVAL_MINUTES', 60))
+
+    # Open Pomodoro sessions with no start / pause / resume for POMODORO_STALE_MINUTES are
+    # closed every POMODORO_SWEEP_INTERVAL_MINUTES; a running one is credited with at most
+    # POMODORO_STALE_MAX_WORK_MINUTES of the time since it last started
+    POMODORO_STALE_MINUTES = int(os.environ.get('POMODORO_STALE_MINUTES', 120))
+    POMODORO_STALE_MAX_WORK_MINUTES = int(os.environ.get('POMODORO_STALE_MAX_WORK_MINUTES', 60))
+    POMODORO_SWEEP_INTERVAL_MINUTES = float(os.environ.get('POMODORO_SWEEP_INTERVAL_MINUTES', 15))
+
+    # Pomodoro days older than STUDY_ROLLUP_SETTLE_DAYS are summed into StudyTimeRollup
+    # by a job every STUDY_ROLLUP_INTERVAL_HOURS; newer days are read from the sessions
+    STUDY_ROLLUP_SETTLE_DAYS = int(os.environ.get('STUDY_ROLLUP_SETTLE_DAYS', 2))
+    STUDY_ROLLUP_INTERVAL_HOURS = float(os.environ.get('STUDY_ROLLUP_INTERVAL_HOURS', 6))
+
+    # Nightly job that creates the next day's default health tasks for children
+    # who logged in within HEALTH_TASK_ACTIVE_DAYS, at HEALTH_TASK_SEED_HOUR local time
+    HEALTH_TASK_SEEDING_ENABLED = os.environ.get('HEALTH_TASK_SEEDING_ENABLED', '0') == '1'
+    HEALTH_TASK_SEED_HOUR = int(os.environ.get('HEALTH_TASK_SEED_HOUR', 23))
+    HEALTH_TASK_ACTIVE_DAYS = int(os.environ.get('HEALTH_TASK_ACTIVE_DAYS', 7))
+
+    # Periodic maintenance jobs (services/scheduler.py) run inside the app process
+    BACKGROUND_JOBS_ENABLED = os.environ.get('BACKGROUND_JOBS_ENABLED', '1') == '1'
     
     # NEW: JWT Configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-super-secret-jwt-key-here-32-characters-long')
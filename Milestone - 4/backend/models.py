@@ -49,6 +49,11 @@ class ParentChild(db.Model):
     child_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     relationship_type = db.Column(db.String(20))  # e.g., 'father', 'guardian'
 
+    __table_args__ = (
+        # Parent overview resolves all of a parent's children at once
+        db.Index('ix_parent_child_parent', 'parent_id', 'child_id'),
+    )
+
 
 
 # ---------------------------
@@ -59,11 +64,26 @@ class PomodoroSession(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     homework_id = db.Column(db.Integer, db.ForeignKey('homework_schedule.id'), nullable=True)
-    start_time = db.Column(db.DateTime)
+    start_time = db.Column(db.DateTime)  # Start of the current running stretch; None while paused
+    started_at = db.Column(db.DateTime, nullable=True)  # When the session was first started, never cleared
     end_time = db.Column(db.DateTime, nullable=True)  # When session actually ended
     work_duration = db.Column(db.Integer, default=0)  # Actual work time in seconds
     break_duration = db.Column(db.Integer, default=0)  # Actual break time in seconds
     completed = db.Column(db.Boolean, default=False)
+    last_active_at = db.Column(db.DateTime, nullable=True)  # Last start / pause / resume, for the stale-session sweeper
+
+    __table_args__ = (
+        # Dashboard metrics rollup reads sessions finished since its last run
+        db.Index('ix_pomodoro_session_end_time', 'end_time'),
+        # Task list sums each task's sessions
+        db.Index('ix_pomodoro_session_homework', 'homework_id'),
+        # Study-time analytics read one child's sessions by first start; the rollup job reads a day range
+        db.Index('ix_pomodoro_session_user_started', 'user_id', 'started_at'),
+        db.Index('ix_pomodoro_session_started_at', 'started_at'),
+        # Only open sessions, for the stale-session sweeper
+        db.Index('ix_pomodoro_session_open', 'last_active_at',
+                 sqlite_where=db.text('end_time IS NULL'), postgresql_where=db.text('end_time IS NULL')),
+    )
 
 
 class HomeworkSchedule(db.Model):
@@ -76,6 +96,33 @@ class HomeworkSchedule(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # When task was created
     pomodoro_sessions = db.relationship('PomodoroSession', backref='homework', lazy=True)
 
+    __table_args__ = (
+        # Task list filtered by due-date range or by status
+        db.Index('ix_homework_schedule_user_due', 'user_id', 'due_date'),
+        db.Index('ix_homework_schedule_user_status', 'user_id', 'status'),
+    )
+
+class StudyTimeRollup(db.Model):
+    """Pomodoro totals per child, day and task for settled days (services/study_time.py).
+
+    homework_id is 0 for sessions not tied to a task. Days before the
+    'study_time' RollupWatermark are read from here instead of the sessions.
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    homework_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    work_seconds = db.Column(db.Integer, default=0, nullable=False)
+    break_seconds = db.Column(db.Integer, default=0, nullable=False)
+    sessions = db.Column(db.Integer, default=0, nullable=False)
+    completed_sessions = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class RollupWatermark(db.Model):
+    """First day a rollup job has not yet covered, by rollup name"""
+    name = db.Column(db.String(50), primary_key=True)
+    rolled_through = db.Column(db.Date, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 
 # ---------------------------
 # Creative & Doodling
@@ -102,11 +149,22 @@ class ChatSession(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     mood_tag = db.Column(db.String(50), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     interactions = db.relationship('LLMInteractions', backref='session', cascade="all, delete-orphan", lazy=True)
     summary = db.Column(db.Text, nullable=True)
 
+    # Denormalized for the chat sidebar, kept up to date by chatbot_logic
+    interaction_count = db.Column(db.Integer, default=0)
+    last_message_preview = db.Column(db.String(60), nullable=True)
+
+    # Last interaction folded into `summary` by the rolling summarizer
+    summarized_through_id = db.Column(db.Integer, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_chat_session_user_updated', 'user_id', 'updated_at', 'id'),
+    )
+
 class LLMInteractions(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('chat_session.id'), nullable=False)
@@ -116,6 +174,25 @@ class LLMInteractions(db.Model):
     llm_timestamp = db.Column(db.DateTime)
     mood_tag = db.Column(db.String(50), nullable=True)
 
+    __table_args__ = (
+        # Keyset pagination over a session's transcript
+        db.Index('ix_llm_interactions_session_ts', 'session_id', 'user_timestamp', 'id'),
+        # Retention job scans for the oldest interactions
+        db.Index('ix_llm_interactions_user_timestamp', 'user_timestamp'),
+    )
+
+class LLMInteractionArchive(db.Model):
+    """Chat interactions moved out of LLMInteractions by the retention job"""
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # original LLMInteractions.id
+    session_id = db.Column(db.Integer, nullable=False, index=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    user_message = db.Column(db.Text, nullable=False)
+    user_timestamp = db.Column(db.DateTime)
+    llm_response = db.Column(db.Text, nullable=True)
+    llm_timestamp = db.Column(db.DateTime)
+    mood_tag = db.Column(db.String(50), nullable=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 # ---------------------------
 # Financial Literacy
 # ---------------------------
@@ -146,6 +223,35 @@ class Achievement(db.Model):
     description = db.Column(db.String(255))
     date_awarded = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Dashboard metrics rollup reads badges awarded since its last run
+        db.Index('ix_achievement_date_awarded', 'date_awarded'),
+    )
+
+# ---------------------------
+# Child Dashboard Stats
+# ---------------------------
+
+class ChildStats(db.Model):
+    """Dashboard counters per child, updated by the write paths (services/child_stats.py)"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    total_stars = db.Column(db.Integer, default=0, nullable=False)
+    achievement_count = db.Column(db.Integer, default=0, nullable=False)
+    achievement_stars = db.Column(db.Integer, default=0, nullable=False)
+    quest_achievements = db.Column(db.Integer, default=0, nullable=False)  # achievements not named module_*
+    completed_modules = db.Column(db.Integer, default=0, nullable=False)
+    completed_tasks = db.Column(db.Integer, default=0, nullable=False)
+    login_streak = db.Column(db.Integer, default=0, nullable=False)
+    health_streak = db.Column(db.Integer, default=0, nullable=False)
+
+    # Daily counters are only valid while stats_date is today
+    stats_date = db.Column(db.Date)
+    today_achievements = db.Column(db.Integer, default=0, nullable=False)
+    today_health_tasks = db.Column(db.Integer, default=0, nullable=False)
+    today_login = db.Column(db.Integer, default=0, nullable=False)
+    today_water_goal = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 
 # ---------------------------
 # Quizzes (Psychometric / Self-Discovery)
@@ -183,32 +289,79 @@ class HealthTask(db.Model):
     completed = db.Column(db.Boolean, default=False)
     date = db.Column(db.Date, default=date.today)
 
+    __table_args__ = (
+        # One row per default task per day, so seeding can be an INSERT ... ON CONFLICT DO NOTHING
+        db.Index('uq_health_task_user_date_name', 'user_id', 'date', 'task_name', unique=True),
+    )
+
 class WaterLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     count = db.Column(db.Integer, default=0)
     date = db.Column(db.Date, default=date.today)
 
+    __table_args__ = (
+        # Target of the atomic upsert in services/counters.py
+        db.Index('uq_water_log_user_date', 'user_id', 'date', unique=True),
+    )
+
+class HealthRollup(db.Model):
+    """Month and year totals of a daily health counter (services/health_history.py).
+
+    Kept up to date by the same requests that write WaterLog / ScreenTime,
+    so long-range history reads a handful of rows instead of every day.
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    metric = db.Column(db.String(20), primary_key=True)  # 'water' or 'screen_time'
+    period = db.Column(db.String(10), primary_key=True)  # 'month' or 'year'
+    period_start = db.Column(db.Date, primary_key=True)
+    total = db.Column(db.Float, default=0, nullable=False)
+    days = db.Column(db.Integer, default=0, nullable=False)  # days with a record
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class HealthStreak(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True)
     current_streak = db.Column(db.Integer, default=0)
     last_updated = db.Column(db.Date, default=date.today)
 
+class ActivityCalendar(db.Model):
+    """Days a child was active in one year, one bit per day (services/streaks.py).
+
+    kind is 'login' or 'health'; bit n of `days` (little-endian) is day n+1
+    of the year. LoginStreak and HealthStreak are derived from these rows.
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    days = db.Column(db.LargeBinary(46), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class LoginStreak(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True)
     current_streak = db.Column(db.Integer, default=0)
     last_login_date = db.Column(db.Date, default=date.today)
+    first_login_at = db.Column(db.DateTime, nullable=True)  # First login on last_login_date
     total_logins = db.Column(db.Integer, default=0)
     longest_streak = db.Column(db.Integer, default=0)
 
+    __table_args__ = (
+        # Login days counted by the dashboard rollup (services/dashboard_metrics.py)
+        db.Index('ix_login_streak_first_login_at', 'first_login_at'),
+    )
+
 class ScreenTime(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     hours = db.Column(db.Float)
     date = db.Column(db.Date, default=date.today)
 
+    __table_args__ = (
+        # Target of the atomic upsert in services/counters.py
+        db.Index('uq_screen_time_user_date', 'user_id', 'date', unique=True),
+    )
+
 # ---------------------------
 # Safety Education
 # ---------------------------
@@ -245,8 +398,22 @@ class DashboardMetrics(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     active_kids = db.Column(db.Integer)
     average_session_duration = db.Column(db.Float)  
-    top_features = db.Column(db.Text) 
+    top_features = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Written by the rollup job (services/dashboard_metrics.py). period_end is
+    # the high-water mark for the next run; module progress has no timestamp,
+    # so the last processed id is kept instead.
+    period_start = db.Column(db.DateTime, nullable=True)
+    period_end = db.Column(db.DateTime, nullable=True)
+    module_progress_watermark = db.Column(db.Integer, nullable=True)
+    session_count = db.Column(db.Integer, nullable=True)
+    total_session_seconds = db.Column(db.Integer, nullable=True)
+    achievements_awarded = db.Column(db.Integer, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_dashboard_metrics_period_end', 'period_end'),
+    )
+
 
 
@@ -0,0 +1,90 @@
+# chat_context.py - Token-budgeted conversation context for the chatbot
+import math
+import re
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding('cl100k_base')
+except Exception:
+    # tiktoken is optional - fall back to a local approximation
+    _ENCODING = None
+
+_WORD_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Chat formats add a few tokens of framing around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def count_tokens(text):
+    """Count the tokens in a piece of text without calling the LLM API.
+
+    Uses tiktoken when it is installed, otherwise approximates BPE by
+    counting one token per 4 characters of each word and one per symbol.
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _WORD_PATTERN.findall(text))
+
+
+def message_tokens(message):
+    return count_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS
+
+
+def turn_messages(turn):
+    """Chat messages for a stored turn of (interaction_id, user_message, clean_reply)"""
+    _, user_message, reply = turn
+    messages = [{"role": "user", "content": user_message}]
+    if reply:
+        messages.append({"role": "assistant", "content": reply})
+    return messages
+
+
+def build_chat_messages(system_prompt, summary, turns, user_message, budget):
+    """Build the LLM messages for a chat turn within a token budget.
+
+    `turns` are earlier turns of the session, oldest first. The system
+    prompt, rolling summary and current message are always sent; the newest
+    turns are then added until the budget is used up. Returns the messages
+    and the turns that did not fit, which should be folded into the summary.
+    """
+    head = [{"role": "system", "content": system_prompt}]
+    if summary:
+        head.append({"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+    current = {"role": "user", "content": user_message}
+
+    used = sum(message_tokens(message) for message in head) + message_tokens(current)
+    window = []
+    first_included = len(turns)
+    for index in range(len(turns) - 1, -1, -1):
+        messages = turn_messages(turns[index])
+        cost = sum(message_tokens(message) for message in messages)
+        if used + cost > budget:
+            break
+        window = messages + window
+        used += cost
+        first_included = index
+
+    return head + window + [current], turns[:first_included]
+
+
+def build_summary_messages(previous_summary, turns, max_words=120):
+    """Prompt asking the LLM to fold older turns into the running summary"""
+    transcript = []
+    for _, user_message, reply in turns:
+        transcript.append(f"Child: {user_message}")
+        if reply:
+            transcript.append(f"Companion: {reply}")
+
+    instructions = (
+        "You keep a running summary of a conversation between a child and a caring "
+        "companion chatbot. Update the summary with the new conversation below. Keep the "
+        "child's feelings, worries, names and anything the companion promised to follow up "
+        f"on. Write plain sentences, no more than {max_words} words."
+    )
+    content = f"Current summary: {previous_summary or 'None yet.'}\n\nNew conversation:\n" + "\n".join(transcript)
+    return [
+        {"role": "system", "content": instructions},
+        {"role": "user", "content": content}
+    ]
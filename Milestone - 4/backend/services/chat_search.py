@@ -0,0 +1,130 @@
+# chat_search.py - SQLite FTS5 full-text index over chat interactions
+import html
+import re
+
+FTS_TABLE = 'llm_interactions_fts'
+
+# Snippet markers that can't occur in chat text; replaced with <mark> after escaping
+_MATCH_START = '\x02'
+_MATCH_END = '\x03'
+
+_TERM_PATTERN = re.compile(r'\w+\*?', re.UNICODE)
+MAX_QUERY_TERMS = 10
+
+# Whether the index exists: set by install_chat_search(), or looked up on first use
+_available = None
+
+
+def _clean_reply_sql(column):
+    """SQL equivalent of split_mood_tag(reply)[0]: drop the [MOOD: ...] tag and trim"""
+    return (f"trim(CASE WHEN instr({column}, '[MOOD:') > 0 "
+            f"THEN substr({column}, 1, instr({column}, '[MOOD:') - 1) ELSE {column} END, "
+            f"' ' || char(9, 10, 13))")
+
+
+_INSERT_NEW = (f"INSERT INTO {FTS_TABLE}(rowid, user_message, llm_response) "
+               f"VALUES (new.id, new.user_message, {_clean_reply_sql('new.llm_response')});")
+
+SCHEMA_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        user_message, llm_response, tokenize = 'unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER IF NOT EXISTS llm_interactions_fts_insert AFTER INSERT ON llm_interactions BEGIN
+        {_INSERT_NEW}
+    END""",
+    # Replies are stored in a second transaction, so updates must re-index the row
+    f"""CREATE TRIGGER IF NOT EXISTS llm_interactions_fts_update
+        AFTER UPDATE OF user_message, llm_response ON llm_interactions BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        {_INSERT_NEW}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS llm_interactions_fts_delete AFTER DELETE ON llm_interactions BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END"""
+]
+
+BACKFILL_STATEMENT = (f"INSERT INTO {FTS_TABLE}(rowid, user_message, llm_response) "
+                      f"SELECT id, user_message, {_clean_reply_sql('llm_response')} FROM llm_interactions")
+
+DROP_STATEMENTS = [
+    "DROP TRIGGER IF EXISTS llm_interactions_fts_insert",
+    "DROP TRIGGER IF EXISTS llm_interactions_fts_update",
+    "DROP TRIGGER IF EXISTS llm_interactions_fts_delete",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}"
+]
+
+SEARCH_STATEMENT = f"""
+    SELECT i.id, i.session_id, i.user_timestamp, i.llm_timestamp, i.mood_tag,
+           snippet({FTS_TABLE}, 0, '{_MATCH_START}', '{_MATCH_END}', '…', 12) AS message_snippet,
+           snippet({FTS_TABLE}, 1, '{_MATCH_START}', '{_MATCH_END}', '…', 12) AS response_snippet,
+           bm25({FTS_TABLE}) AS rank
+    FROM {FTS_TABLE}
+    JOIN llm_interactions i ON i.id = {FTS_TABLE}.rowid
+    JOIN chat_session s ON s.id = i.session_id
+    WHERE {FTS_TABLE} MATCH :query AND s.user_id = :user_id
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+"""
+
+
+def install_chat_search(connection, rebuild=False):
+    """Create the FTS5 table and sync triggers, backfilling when the table is new.
+
+    Returns True when the index is available. Only SQLite is supported;
+    other databases get no index and the search endpoint reports it as
+    unavailable. The outcome is remembered for chat_search_available().
+    """
+    global _available
+    _available = False
+    if connection.dialect.name != 'sqlite':
+        return False
+    if rebuild:
+        for statement in DROP_STATEMENTS:
+            connection.exec_driver_sql(statement)
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)).first()
+    for statement in SCHEMA_STATEMENTS:
+        connection.exec_driver_sql(statement)
+    if not exists:
+        connection.exec_driver_sql(BACKFILL_STATEMENT)
+    _available = True
+    return True
+
+
+def chat_search_available(connection):
+    """Whether the FTS index exists, from the last install or else the schema"""
+    global _available
+    if _available is None:
+        _available = connection.dialect.name == 'sqlite' and connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)).first() is not None
+    return _available
+
+
+def build_match_query(text):
+    """Turn free text into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted term (a trailing * keeps prefix matching),
+    so punctuation and stray FTS5 syntax in the input can't cause errors.
+    Terms must all match unless joined by an upper-case OR. Returns None
+    when nothing searchable is left.
+    """
+    parts = []
+    for term in _TERM_PATTERN.findall(text or '')[:MAX_QUERY_TERMS]:
+        if term in ('AND', 'NOT', 'NEAR'):
+            continue
+        if term == 'OR':
+            if parts and parts[-1] != 'OR':
+                parts.append('OR')
+            continue
+        word = term.rstrip('*')
+        if word:
+            parts.append(f'"{word}"*' if term.endswith('*') else f'"{word}"')
+    if parts and parts[-1] == 'OR':
+        parts.pop()
+    return ' '.join(parts) or None
+
+
+def render_snippet(snippet):
+    """HTML-escape a snippet and wrap the matched words in <mark> tags"""
+    if not snippet:
+        return snippet
+    return html.escape(snippet).replace(_MATCH_START, '<mark>').replace(_MATCH_END, '</mark>')
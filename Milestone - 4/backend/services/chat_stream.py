@@ -0,0 +1,74 @@
+# chat_stream.py - Helpers for streaming chatbot replies
+import json
+
+MOOD_TAG = '[MOOD:'
+
+
+def split_mood_tag(reply):
+    """Split an LLM reply into (clean_reply, mood).
+
+    The chatbot prompt asks the model to end every reply with a
+    `[MOOD: <mood>]` tag. Everything from the tag onwards is hidden from the
+    child and the mood defaults to 'neutral' when the tag is missing.
+    """
+    if not reply or MOOD_TAG not in reply:
+        return (reply or '').strip(), 'neutral'
+
+    clean_reply, _, tail = reply.partition(MOOD_TAG)
+    mood = tail.split(']')[0].strip().lower() or 'neutral'
+    return clean_reply.strip(), mood
+
+
+class MoodTagFilter:
+    """Strips the trailing `[MOOD: ...]` tag from a token stream on the fly.
+
+    Tokens are fed in as they arrive from the LLM and only text that can no
+    longer turn into the start of a mood tag is released. Trailing whitespace
+    is held back as well, so the concatenated output matches what
+    `split_mood_tag` returns for the full reply.
+    """
+
+    def __init__(self):
+        self._pending = ''
+        self._started = False
+        self._tagged = False
+
+    def feed(self, text):
+        """Feed a chunk of model output and return the text safe to show"""
+        if self._tagged or not text:
+            return ''
+
+        buffer = self._pending + text
+        tag_index = buffer.find(MOOD_TAG)
+        if tag_index != -1:
+            self._tagged = True
+            self._pending = ''
+            return self._release(buffer[:tag_index].rstrip())
+
+        # Hold back a suffix that could still be the beginning of the tag
+        hold = 0
+        for size in range(min(len(MOOD_TAG) - 1, len(buffer)), 0, -1):
+            if MOOD_TAG.startswith(buffer[-size:]):
+                hold = size
+                break
+        ready = buffer[:len(buffer) - hold]
+        stripped = ready.rstrip()
+        self._pending = ready[len(stripped):] + buffer[len(buffer) - hold:]
+        return self._release(stripped)
+
+    def flush(self):
+        """Release whatever is left once the stream has finished"""
+        remaining = '' if self._tagged else self._pending.rstrip()
+        self._pending = ''
+        return self._release(remaining)
+
+    def _release(self, text):
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+
+def sse_event(payload):
+    """Format a payload as a single Server-Sent Events message"""
+    return f"data: {json.dumps(payload)}\n\n"
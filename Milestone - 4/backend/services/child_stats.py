@@ -0,0 +1,207 @@
+# child_stats.py - Incrementally maintained dashboard counters per child
+from datetime import date, datetime
+
+from models import (db, Achievement, ChildStats, HealthStreak, HealthTask, HomeworkSchedule,
+                    LoginStreak, User, UserModuleProgress, WaterLog)
+from services.dialect import insert_for
+
+COUNTER_COLUMNS = ('achievement_count', 'achievement_stars', 'quest_achievements',
+                   'completed_modules', 'completed_tasks', 'login_streak', 'health_streak')
+DAILY_COLUMNS = ('today_achievements', 'today_health_tasks', 'today_login', 'today_water_goal')
+
+WATER_GOAL_GLASSES = 8
+
+
+def achievement_stars(badge_name):
+    """Stars for one achievement: Memory Game gives 5, everything else 10"""
+    return 5 if badge_name and 'Memory Game' in badge_name else 10
+
+
+def is_quest_achievement(badge_name):
+    """Module progress records are stored as module_* achievements and aren't quests"""
+    return not badge_name or not badge_name.startswith('module_')
+
+
+def stars_expression(achievement, login, health):
+    return achievement + login + health * 2
+
+
+def update_child_stats(user_id, deltas=None, values=None, today=None):
+    """Apply counter changes to a child's stats row inside the caller's transaction.
+
+    `deltas` are added to counters with a single relative UPDATE, so
+    concurrent writers can't lose increments; `values` overwrite columns
+    (streak mirrors, daily flags). Daily counters restart when the stored
+    stats_date isn't today. If the child has no row yet it is rebuilt from
+    the source tables instead, which already include the caller's flushed
+    change.
+    """
+    deltas = deltas or {}
+    values = values or {}
+    today = today or date.today()
+
+    db.session.flush()
+    if db.session.query(ChildStats.user_id).filter_by(user_id=user_id).first() is None:
+        rebuild_child_stats([user_id], today)
+        return
+
+    new_values = {}
+    for name in COUNTER_COLUMNS:
+        column = getattr(ChildStats, name)
+        if name in values:
+            new_values[name] = values[name]
+        elif name in deltas:
+            new_values[name] = column + deltas[name]
+
+    same_day = ChildStats.stats_date == today
+    for name in DAILY_COLUMNS:
+        column = getattr(ChildStats, name)
+        if name in values:
+            new_values[name] = values[name]
+        elif name in deltas:
+            new_values[name] = db.case((same_day, column + deltas[name]), else_=max(deltas[name], 0))
+        else:
+            new_values[name] = db.case((same_day, column), else_=0)
+
+    def current(name):
+        # Column references on the right-hand side read the pre-update values
+        return new_values.get(name, getattr(ChildStats, name))
+
+    new_values['total_stars'] = stars_expression(current('achievement_stars'), current('login_streak'),
+                                                 current('health_streak'))
+    new_values['stats_date'] = today
+    new_values['updated_at'] = datetime.utcnow()
+    ChildStats.query.filter_by(user_id=user_id).update(new_values, synchronize_session=False)
+
+
+def record_achievement(achievement, today=None):
+    """Count a newly added Achievement in its owner's stats"""
+    today = today or date.today()
+    db.session.flush()  # applies the date_awarded default
+    quest = is_quest_achievement(achievement.badge_name)
+    awarded_today = achievement.date_awarded is not None and achievement.date_awarded.date() == today
+    update_child_stats(achievement.user_id, deltas={
+        'achievement_count': 1,
+        'achievement_stars': achievement_stars(achievement.badge_name),
+        'quest_achievements': int(quest),
+        'today_achievements': int(quest and awarded_today)
+    }, today=today)
+
+
+def upsert_statement(rows):
+    """INSERT ... ON CONFLICT (user_id) DO UPDATE for SQLite and PostgreSQL"""
+    statement = insert_for(ChildStats).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=[ChildStats.user_id],
+        set_={name: statement.excluded[name] for name in rows[0] if name != 'user_id'}
+    )
+
+
+def _contains(column, text):
+    """Case-sensitive substring test (LIKE is case-insensitive on SQLite)"""
+    if db.engine.dialect.name == 'sqlite':
+        return db.func.instr(column, text) > 0
+    return column.contains(text, autoescape=True)
+
+
+def dashboard_counters_query(today, user_ids=None):
+    """One SELECT returning every dashboard counter per user.
+
+    Each source table is aggregated once with GROUP BY user_id (conditional
+    SUM(CASE ...) for the per-achievement rules) and the results are
+    outer-joined onto the users, so any number of users costs one round
+    trip. Columns are named like ChildStats, so rows can be passed to
+    dashboard_stats() or written straight into the table.
+    """
+    def grouped(*columns, where=None):
+        user_column = columns[0]
+        query = db.select(user_column.label('user_id'), *columns[1:])
+        if where is not None:
+            query = query.where(where)
+        if user_ids is not None:
+            query = query.where(user_column.in_(user_ids))
+        return query.group_by(user_column).subquery()
+
+    quest = db.or_(Achievement.badge_name.is_(None),
+                   db.not_(Achievement.badge_name.startswith('module_', autoescape=True)))
+    achievements = grouped(
+        Achievement.user_id,
+        db.func.count(Achievement.id).label('achievement_count'),
+        db.func.sum(db.case((_contains(Achievement.badge_name, 'Memory Game'), 5), else_=10)).label('stars'),
+        db.func.sum(db.case((quest, 1), else_=0)).label('quests'),
+        db.func.sum(db.case((db.and_(quest, db.func.date(Achievement.date_awarded) == today), 1),
+                            else_=0)).label('today_quests')
+    )
+    modules = grouped(UserModuleProgress.user_id, db.func.count(UserModuleProgress.id).label('completed'),
+                      where=UserModuleProgress.completed.is_(True))
+    tasks = grouped(HomeworkSchedule.user_id, db.func.count(HomeworkSchedule.id).label('completed'),
+                    where=HomeworkSchedule.status == 'completed')
+    health_tasks = grouped(HealthTask.user_id, db.func.count(HealthTask.id).label('completed'),
+                           where=db.and_(HealthTask.completed.is_(True), HealthTask.date == today))
+    logins = grouped(LoginStreak.user_id, db.func.max(LoginStreak.current_streak).label('streak'),
+                     db.func.max(db.case((LoginStreak.last_login_date == today, 1), else_=0)).label('today'))
+    health_streaks = grouped(HealthStreak.user_id, db.func.max(HealthStreak.current_streak).label('streak'))
+    water = grouped(WaterLog.user_id, db.func.max(WaterLog.count).label('glasses'), where=WaterLog.date == today)
+
+    achievement_stars_total = db.func.coalesce(achievements.c.stars, 0)
+    login_streak = db.func.coalesce(logins.c.streak, 0)
+    health_streak = db.func.coalesce(health_streaks.c.streak, 0)
+    query = db.select(
+        User.id.label('user_id'),
+        stars_expression(achievement_stars_total, login_streak, health_streak).label('total_stars'),
+        db.func.coalesce(achievements.c.achievement_count, 0).label('achievement_count'),
+        achievement_stars_total.label('achievement_stars'),
+        db.func.coalesce(achievements.c.quests, 0).label('quest_achievements'),
+        db.func.coalesce(modules.c.completed, 0).label('completed_modules'),
+        db.func.coalesce(tasks.c.completed, 0).label('completed_tasks'),
+        login_streak.label('login_streak'),
+        health_streak.label('health_streak'),
+        db.literal(today, db.Date).label('stats_date'),
+        db.func.coalesce(achievements.c.today_quests, 0).label('today_achievements'),
+        db.func.coalesce(health_tasks.c.completed, 0).label('today_health_tasks'),
+        db.func.coalesce(logins.c.today, 0).label('today_login'),
+        db.case((db.func.coalesce(water.c.glasses, 0) >= WATER_GOAL_GLASSES, 1), else_=0).label('today_water_goal')
+    ).select_from(User)
+    for subquery in (achievements, modules, tasks, health_tasks, logins, health_streaks, water):
+        query = query.outerjoin(subquery, subquery.c.user_id == User.id)
+    if user_ids is not None:
+        query = query.where(User.id.in_(user_ids))
+    return query
+
+
+def calculate_dashboard_stats(user_id, today=None):
+    """Dashboard figures straight from the source tables in one query (no ChildStats row needed)"""
+    today = today or date.today()
+    counters = db.session.execute(dashboard_counters_query(today, [user_id])).first()
+    return dashboard_stats(counters, today) if counters else None
+
+
+def rebuild_child_stats(user_ids=None, today=None):
+    """Recompute stats rows from the source tables (all users when user_ids is None).
+
+    Returns the number of rows written.
+    """
+    today = today or date.today()
+    now = datetime.utcnow()
+    rows = [dict(row, updated_at=now)
+            for row in db.session.execute(dashboard_counters_query(today, user_ids)).mappings()]
+    for start in range(0, len(rows), 500):
+        db.session.execute(upsert_statement(rows[start:start + 500]))
+    return len(rows)
+
+
+def dashboard_stats(stats, today=None):
+    """Dashboard figures for a ChildStats row, matching the legacy calculators"""
+    today = today or date.today()
+    daily = 0
+    if stats.stats_date == today:
+        daily = stats.today_achievements + stats.today_health_tasks + stats.today_login + stats.today_water_goal
+    return {
+        'totalStars': stats.total_stars,
+        'questsCompleted': stats.completed_modules + stats.completed_tasks + stats.quest_achievements,
+        'skillsLearned': stats.achievement_count // 3,  # every 3 achievements = 1 skill
+        # Completed modules and tasks count towards today's goals regardless of date, as before
+        'todayGoals': daily + stats.completed_modules + stats.completed_tasks,
+        'streakDays': stats.login_streak,
+        'userLevel': max(1, stats.total_stars // 50)  # level up every 50 stars
+    }
@@ -0,0 +1,70 @@
+# conversation_cache.py - In-process LRU cache of chat context windows
+import threading
+from collections import OrderedDict
+
+
+class ConversationCache:
+    """Bounded LRU cache of cleaned conversation windows keyed by session id.
+
+    Each entry holds the newest turns of a chat session as
+    (interaction_id, user_message, clean_reply) tuples, oldest first, so a
+    chat turn can build its context without re-reading and re-cleaning the
+    stored replies. The cache is per process; anything that rewrites a
+    session's history must call invalidate().
+    """
+
+    def __init__(self, max_sessions=1024, max_turns=20):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id):
+        """Return a copy of the cached window, or None on a miss"""
+        with self._lock:
+            turns = self._entries.get(session_id)
+            if turns is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return list(turns)
+
+    def put(self, session_id, turns):
+        with self._lock:
+            self._entries[session_id] = list(turns[-self.max_turns:])
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def append(self, session_id, turn):
+        """Add a finished turn to a cached window; no-op if the session isn't cached"""
+        with self._lock:
+            turns = self._entries.get(session_id)
+            if turns is None:
+                return
+            turns.append(turn)
+            del turns[:-self.max_turns]
+            self._entries.move_to_end(session_id)
+
+    def invalidate(self, *session_ids):
+        with self._lock:
+            for session_id in session_ids:
+                self._entries.pop(session_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'sessions': len(self._entries),
+                'max_sessions': self.max_sessions
+            }
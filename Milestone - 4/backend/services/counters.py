@@ -0,0 +1,85 @@
+# counters.py - Atomic per-day counters (water glasses, screen time) via insert-or-increment ... RETURNING
+from datetime import datetime
+
+from models import db, LoginStreak, ScreenTime, WaterLog
+from services.dialect import insert_for
+from services.health_history import add_to_rollups
+
+
+def _merge_duplicates(table, column):
+    """Fold rows sharing (user_id, date) into the oldest one, summing `column`.
+
+    Run before the unique (user_id, date) index is created on an existing
+    database; each duplicate holds increments the others missed.
+    """
+    return [
+        f"""UPDATE {table} SET {column} = (
+               SELECT SUM(d.{column}) FROM {table} d
+               WHERE d.user_id = {table}.user_id AND d.date = {table}.date)
+           WHERE id IN (SELECT MIN(id) FROM {table} GROUP BY user_id, date HAVING COUNT(*) > 1)""",
+        f"""DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY user_id, date)"""
+    ]
+
+
+WATER_LOG_DEDUPE_STATEMENTS = _merge_duplicates('water_log', 'count')
+SCREEN_TIME_DEDUPE_STATEMENTS = _merge_duplicates('screen_time', 'hours')
+
+
+def add_to_daily_counter(model, column_name, user_id, day, amount):
+    """Add `amount` to a (user_id, date) row's counter; returns (new total, created).
+
+    INSERT ... ON CONFLICT (user_id, date) DO NOTHING RETURNING c creates
+    the day's row on its first write and says so by returning it. Later
+    writes fall through to UPDATE SET c = c + amount RETURNING c, which
+    increments in the database, so concurrent requests can't overwrite
+    each other and exactly one of them sees `created`.
+    """
+    column = getattr(model, column_name)
+    inserted = db.session.execute(
+        insert_for(model).values(user_id=user_id, date=day, **{column_name: amount})
+                      .on_conflict_do_nothing(index_elements=[model.user_id, model.date])
+                      .returning(column)
+    ).scalar_one_or_none()
+    if inserted is not None:
+        return inserted, True
+    total = db.session.execute(
+        db.update(model).where(model.user_id == user_id, model.date == day)
+                        .values({column_name: db.func.coalesce(column, 0) + amount})
+                        .returning(column)
+    ).scalar_one()
+    return total, False
+
+
+def increment_water_count(user_id, day):
+    count, created = add_to_daily_counter(WaterLog, 'count', user_id, day, 1)
+    add_to_rollups('water', user_id, day, 1, new_day=created)
+    return count
+
+
+def add_screen_time_hours(user_id, day, hours):
+    total, created = add_to_daily_counter(ScreenTime, 'hours', user_id, day, hours)
+    add_to_rollups('screen_time', user_id, day, hours, new_day=created)
+    return total
+
+
+def ensure_login_streak(user_id):
+    """Create the user's LoginStreak row if it doesn't exist, without racing other logins"""
+    db.session.execute(insert_for(LoginStreak).values(
+        user_id=user_id, current_streak=0, last_login_date=None, total_logins=0, longest_streak=0
+    ).on_conflict_do_nothing(index_elements=[LoginStreak.user_id]))
+
+
+def record_login_day(user_id, day, now=None):
+    """Count a login day in LoginStreak.total_logins at most once per day.
+
+    The conditional UPDATE only matches while last_login_date isn't `day`,
+    so of several concurrent first logins exactly one increments and stamps
+    first_login_at. Returns True when this call counted the day.
+    """
+    updated = LoginStreak.query.filter(LoginStreak.user_id == user_id,
+                                       db.or_(LoginStreak.last_login_date.is_(None),
+                                              LoginStreak.last_login_date != day))\
+                               .update({'total_logins': db.func.coalesce(LoginStreak.total_logins, 0) + 1,
+                                        'last_login_date': day,
+                                        'first_login_at': now or datetime.utcnow()}, synchronize_session=False)
+    return updated == 1
@@ -0,0 +1,107 @@
+# dashboard_metrics.py - Incremental rollup of platform usage into DashboardMetrics snapshots
+import json
+from datetime import datetime
+
+from models import db, Achievement, DashboardMetrics, LoginStreak, PomodoroSession, User, UserModuleProgress
+
+TOP_FEATURES_LIMIT = 5
+
+
+def latest_snapshot():
+    return DashboardMetrics.query.filter(DashboardMetrics.period_end.isnot(None))\
+                                 .order_by(DashboardMetrics.period_end.desc(), DashboardMetrics.id.desc()).first()
+
+
+def _in_window(column, start, end):
+    """start < column <= end; no lower bound on the first run"""
+    upper = column <= end
+    return db.and_(column > start, upper) if start else upper
+
+
+def rollup_dashboard_metrics(now=None):
+    """Aggregate activity since the previous snapshot into a new DashboardMetrics row.
+
+    The previous snapshot's period_end is the high-water mark for the
+    timestamped sources (finished Pomodoro sessions, achievements, and the
+    first login of each login day, so later logins that day don't count the
+    child again); module progress has no timestamp, so its last processed id is
+    stored instead. Each run therefore only reads rows added since the last
+    one, with GROUP BY queries that the existing indexes can serve. The
+    first run covers all history. Returns the new snapshot (not committed).
+    """
+    now = now or datetime.utcnow()
+    previous = latest_snapshot()
+    start = previous.period_end if previous else None
+    module_watermark = (previous.module_progress_watermark or 0) if previous else 0
+
+    # Pomodoro sessions finished in the window
+    finished = _in_window(PomodoroSession.end_time, start, now)
+    session_count, session_seconds = db.session.execute(
+        db.select(db.func.count(PomodoroSession.id), db.func.coalesce(db.func.sum(PomodoroSession.work_duration), 0))
+        .where(finished)
+    ).one()
+
+    # Feature usage: badges awarded, modules started and Pomodoro sessions
+    awarded = _in_window(Achievement.date_awarded, start, now)
+    features = {f"badge:{name}": count for name, count in db.session.execute(
+        db.select(Achievement.badge_name, db.func.count(Achievement.id))
+        .where(awarded, Achievement.badge_name.isnot(None), db.not_(Achievement.badge_name.startswith('module_')))
+        .group_by(Achievement.badge_name)
+    )}
+    achievements_awarded = sum(features.values())
+
+    module_rows = db.session.execute(
+        db.select(UserModuleProgress.module_name, db.func.count(UserModuleProgress.id),
+                  db.func.max(UserModuleProgress.id))
+        .where(UserModuleProgress.id > module_watermark, UserModuleProgress.module_name.isnot(None))
+        .group_by(UserModuleProgress.module_name)
+    ).all()
+    for module_name, count, _ in module_rows:
+        features[f"module:{module_name}"] = count
+    new_module_watermark = max([module_watermark] + [max_id for _, _, max_id in module_rows])
+    if session_count:
+        features['pomodoro'] = session_count
+
+    # Children with any activity in the window
+    active = db.union(
+        db.select(LoginStreak.user_id).where(_in_window(LoginStreak.first_login_at, start, now) if start
+                                             else LoginStreak.last_login_date <= now.date()),
+        db.select(PomodoroSession.user_id).where(finished),
+        db.select(Achievement.user_id).where(awarded),
+        db.select(UserModuleProgress.user_id).where(UserModuleProgress.id > module_watermark,
+                                                    UserModuleProgress.id <= new_module_watermark)
+    ).subquery()
+    active_kids = db.session.execute(
+        db.select(db.func.count()).select_from(active).join(User, User.id == active.c.user_id)
+        .where(User.role == 'child')
+    ).scalar()
+
+    top_features = sorted(features.items(), key=lambda item: (-item[1], item[0]))[:TOP_FEATURES_LIMIT]
+    snapshot = DashboardMetrics(
+        active_kids=active_kids,
+        average_session_duration=round(session_seconds / session_count, 1) if session_count else 0.0,
+        top_features=json.dumps([{'feature': name, 'count': count} for name, count in top_features]),
+        created_at=now,
+        period_start=start,
+        period_end=now,
+        module_progress_watermark=new_module_watermark,
+        session_count=session_count,
+        total_session_seconds=session_seconds,
+        achievements_awarded=achievements_awarded
+    )
+    db.session.add(snapshot)
+    return snapshot
+
+
+def snapshot_to_dict(snapshot):
+    return {
+        'id': snapshot.id,
+        'period_start': snapshot.period_start.isoformat() if snapshot.period_start else None,
+        'period_end': snapshot.period_end.isoformat() if snapshot.period_end else None,
+        'active_kids': snapshot.active_kids,
+        'average_session_duration': snapshot.average_session_duration,
+        'session_count': snapshot.session_count,
+        'achievements_awarded': snapshot.achievements_awarded,
+        'top_features': json.loads(snapshot.top_features) if snapshot.top_features else [],
+        'created_at': snapshot.created_at.isoformat() if snapshot.created_at else None
+    }
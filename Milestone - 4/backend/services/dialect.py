@@ -0,0 +1,46 @@
+# dialect.py - The SQL that differs between the SQLite and PostgreSQL backends
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db
+
+INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+class UnsupportedDatabaseError(NotImplementedError):
+    """The database is neither SQLite nor PostgreSQL"""
+
+
+def dialect_name():
+    """'sqlite' or 'postgresql'; raises UnsupportedDatabaseError for anything else"""
+    name = db.engine.dialect.name
+    if name not in INSERTS:
+        raise UnsupportedDatabaseError(f"{name} is not supported; KidQuest runs on SQLite or PostgreSQL")
+    return name
+
+
+def insert_for(table):
+    """INSERT for `table` (model or Table) with on_conflict_do_nothing / on_conflict_do_update"""
+    return INSERTS[dialect_name()](table)
+
+
+def day_of(column):
+    """SQL for the calendar day of a DateTime column"""
+    if dialect_name() == 'sqlite':
+        return db.func.date(column)
+    return db.cast(column, db.Date)
+
+
+def period_start_of(column, period):
+    """SQL for the first day of the week (Monday), month or year containing `column`"""
+    if dialect_name() == 'sqlite':
+        if period == 'week':
+            return db.func.date(column, '-6 days', 'weekday 1')  # the Monday on or before
+        return db.func.date(column, {'month': 'start of month', 'year': 'start of year'}[period])
+    return db.cast(db.func.date_trunc(period, column), db.Date)
+
+
+def seconds_between(start, end):
+    """SQL for the whole seconds from `start` to `end`"""
+    if dialect_name() == 'sqlite':
+        return db.cast((db.func.julianday(end) - db.func.julianday(start)) * 86400, db.Integer)
+    return db.cast(db.func.extract('epoch', end - start), db.Integer)
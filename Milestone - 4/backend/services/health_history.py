@@ -0,0 +1,129 @@
+# health_history.py - Bucketed water / screen-time history with precomputed month and year rollups
+from datetime import date, datetime, timedelta
+
+from models import db, HealthRollup, ScreenTime, WaterLog
+from services.dialect import insert_for, period_start_of
+
+# metric -> (daily model, value column name, unit)
+METRICS = {
+    'water': (WaterLog, 'count', 'glasses'),
+    'screen_time': (ScreenTime, 'hours', 'hours')
+}
+BUCKETS = ('day', 'week', 'month', 'year')
+ROLLUP_PERIODS = ('month', 'year')
+
+# Longest range served from the daily rows; longer ones should use month or year buckets
+MAX_DAILY_RANGE_DAYS = 366
+DEFAULT_RANGE_DAYS = {'day': 30, 'week': 7 * 12, 'month': 365, 'year': 365 * 5}
+
+
+def period_start(day, bucket):
+    """First day of the bucket containing `day` (weeks start on Monday)"""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    if bucket == 'year':
+        return day.replace(month=1, day=1)
+    return day
+
+
+def next_period(start, bucket):
+    if bucket == 'day':
+        return start + timedelta(days=1)
+    if bucket == 'week':
+        return start + timedelta(days=7)
+    if bucket == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start.replace(year=start.year + 1)
+
+
+def bucket_expression(column, bucket):
+    """SQL for the first day of `column`'s bucket, for GROUP BY"""
+    return column if bucket == 'day' else period_start_of(column, bucket)
+
+
+def add_to_rollups(metric, user_id, day, amount, new_day):
+    """Add one daily increment to the month and year rollups in a single upsert.
+
+    `new_day` says whether this increment created the day's row, so the
+    rollup's day count only grows once per day.
+    """
+    statement = insert_for(HealthRollup).values([
+        {'user_id': user_id, 'metric': metric, 'period': period, 'period_start': period_start(day, period),
+         'total': amount, 'days': int(new_day), 'updated_at': datetime.utcnow()}
+        for period in ROLLUP_PERIODS
+    ])
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[HealthRollup.user_id, HealthRollup.metric, HealthRollup.period, HealthRollup.period_start],
+        set_={'total': HealthRollup.total + statement.excluded.total,
+              'days': HealthRollup.days + statement.excluded.days,
+              'updated_at': statement.excluded.updated_at}
+    ))
+
+
+def rebuild_rollups(user_ids=None):
+    """Recompute every rollup from the daily rows (all users when user_ids is None)"""
+    query = HealthRollup.query
+    if user_ids is not None:
+        query = query.filter(HealthRollup.user_id.in_(user_ids))
+    query.delete(synchronize_session=False)
+
+    written = 0
+    for metric, (model, column_name, _) in METRICS.items():
+        value = getattr(model, column_name)
+        for period in ROLLUP_PERIODS:
+            start = bucket_expression(model.date, period)
+            select = db.select(model.user_id, db.literal(metric), db.literal(period), start,
+                               db.func.sum(value), db.func.count(model.id), db.literal(datetime.utcnow()))\
+                       .where(model.user_id.isnot(None), model.date.isnot(None))\
+                       .group_by(model.user_id, start)
+            if user_ids is not None:
+                select = select.where(model.user_id.in_(user_ids))
+            result = db.session.execute(db.insert(HealthRollup).from_select(
+                ['user_id', 'metric', 'period', 'period_start', 'total', 'days', 'updated_at'], select))
+            written += result.rowcount
+    return written
+
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def health_history(user_id, metric, bucket, start, end):
+    """Per-bucket totals between `start` and `end` inclusive, empty buckets filled with zeros.
+
+    Day and week buckets GROUP BY over the (user_id, date) index range;
+    month and year buckets read the precomputed rollups and cover the whole
+    months or years that the range touches.
+    """
+    model, column_name, _ = METRICS[metric]
+    first = period_start(start, bucket)
+    if bucket in ROLLUP_PERIODS:
+        rows = db.session.execute(
+            db.select(HealthRollup.period_start, HealthRollup.total, HealthRollup.days)
+            .where(HealthRollup.user_id == user_id, HealthRollup.metric == metric, HealthRollup.period == bucket,
+                   HealthRollup.period_start.between(first, end))
+        ).all()
+    else:
+        value = getattr(model, column_name)
+        bucket_start = bucket_expression(model.date, bucket)
+        rows = db.session.execute(
+            db.select(bucket_start, db.func.sum(value), db.func.count(model.id))
+            .where(model.user_id == user_id, model.date.between(start, end))
+            .group_by(bucket_start)
+        ).all()
+    found = {_as_date(row[0]): (row[1] or 0, row[2]) for row in rows}
+
+    points = []
+    current = first
+    while current <= end:
+        total, days = found.get(current, (0, 0))
+        points.append({
+            'start': current.isoformat(),
+            'total': round(total, 4),
+            'days': days,
+            'average': round(total / days, 4) if days else 0
+        })
+        current = next_period(current, bucket)
+    return points
@@ -0,0 +1,62 @@
+# health_tasks.py - Idempotent seeding of the daily default health tasks
+from datetime import timedelta
+
+from models import db, HealthTask, LoginStreak, User
+from services.dialect import insert_for
+
+DEFAULT_HEALTH_TASKS = ['Running', 'Yoga', 'Meditation', 'Eat Fruits', 'Helping in household chores']
+
+SEED_BATCH_SIZE = 500
+
+# Run before uq_health_task_user_date_name is created on an existing database:
+# a duplicate counts as done if any copy was, then all but the oldest copy go
+HEALTH_TASK_DEDUPE_STATEMENTS = [
+    # Boolean literals rather than 1/0 so the statement also runs on PostgreSQL
+    """UPDATE health_task SET completed = TRUE
+       WHERE completed IS NOT TRUE AND EXISTS (
+           SELECT 1 FROM health_task d
+           WHERE d.user_id = health_task.user_id AND d.date = health_task.date
+             AND d.task_name = health_task.task_name AND d.completed IS TRUE)""",
+    """DELETE FROM health_task WHERE id NOT IN (
+           SELECT MIN(id) FROM health_task GROUP BY user_id, date, task_name)"""
+]
+
+
+def seed_health_tasks(user_ids, day):
+    """Insert the default tasks for `day` for each user, skipping ones that exist.
+
+    One executemany per batch of users; the unique index on
+    (user_id, date, task_name) makes concurrent or repeated seeding a
+    no-op instead of creating duplicates. Returns the rows attempted.
+    """
+    rows = [{'user_id': user_id, 'task_name': name, 'date': day, 'completed': False}
+            for user_id in user_ids for name in DEFAULT_HEALTH_TASKS]
+    statement = insert_for(HealthTask).on_conflict_do_nothing()
+    batch_rows = SEED_BATCH_SIZE * len(DEFAULT_HEALTH_TASKS)
+    for start in range(0, len(rows), batch_rows):
+        db.session.execute(statement, rows[start:start + batch_rows])
+    return len(rows)
+
+
+def active_child_ids(since):
+    """Children who have logged in on or after `since`"""
+    return db.session.execute(
+        db.select(User.id).join(LoginStreak, LoginStreak.user_id == User.id)
+        .where(User.role == 'child', LoginStreak.last_login_date >= since)
+        .order_by(User.id)
+    ).scalars().all()
+
+
+def seed_for_active_children(day, active_days=7):
+    """Pre-create `day`'s tasks for every child active in the last `active_days` days"""
+    user_ids = active_child_ids(day - timedelta(days=active_days))
+    seed_health_tasks(user_ids, day)
+    return len(user_ids)
+
+
+def seconds_until(hour, now):
+    """Seconds from `now` until the next time the local clock reads hour:00"""
+    target = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
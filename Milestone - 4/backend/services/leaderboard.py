@@ -0,0 +1,133 @@
+# leaderboard.py - Stars leaderboard served from cached, sorted snapshots
+import bisect
+import threading
+import time
+from collections import OrderedDict
+
+from models import db, ChildStats, ParentChild, User
+
+GLOBAL_SCOPE = 'global'
+
+
+class LeaderboardSnapshot:
+    """Children sorted by stars (ties broken by user id) at one point in time.
+
+    Top-K is a slice and a child's rank is a binary search over the sorted
+    keys, so both are O(log n) (plus K) however many children there are.
+    Ranks are competition ranks: equal stars share a rank (1, 2, 2, 4).
+    """
+
+    def __init__(self, rows):
+        entries = sorted(rows, key=lambda row: (-row[2], row[0]))
+        self._keys = [(-stars, user_id) for user_id, _, stars in entries]
+        self._entries = entries
+        self._stars = {user_id: stars for user_id, _, stars in entries}
+        self.built_at = time.time()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _rank_at(self, index):
+        # First entry with the same stars, found by bisecting on (-stars,)
+        return bisect.bisect_left(self._keys, (self._keys[index][0],)) + 1
+
+    def _entry(self, index):
+        user_id, username, stars = self._entries[index]
+        return {'rank': self._rank_at(index), 'user_id': user_id, 'username': username, 'totalStars': stars}
+
+    def top(self, limit):
+        return [self._entry(index) for index in range(min(limit, len(self._entries)))]
+
+    def rank_of(self, user_id):
+        """Entry for one child, or None if they aren't on this leaderboard"""
+        stars = self._stars.get(user_id)
+        if stars is None:
+            return None
+        return self._entry(bisect.bisect_left(self._keys, (-stars, user_id)))
+
+
+class LeaderboardCache:
+    """Per-scope snapshots that expire after `ttl` seconds.
+
+    Only one thread rebuilds an expired scope; concurrent requests for it
+    wait for that rebuild instead of all querying the database. At most
+    `max_scopes` scopes are kept (least recently used go first).
+    """
+
+    def __init__(self, ttl=30, max_scopes=256):
+        self.ttl = ttl
+        self.max_scopes = max_scopes
+        self._snapshots = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, scope):
+        snapshot = self._snapshots.get(scope)
+        if snapshot is not None and time.time() - snapshot.built_at < self.ttl:
+            self._snapshots.move_to_end(scope)
+            return snapshot
+        return None
+
+    def get(self, scope, loader):
+        """Cached snapshot for `scope`, calling loader() to build it on a miss"""
+        with self._lock:
+            snapshot = self._fresh(scope)
+            if snapshot is not None:
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+            build_lock = self._building.setdefault(scope, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                snapshot = self._fresh(scope)  # built while we waited
+            if snapshot is not None:
+                return snapshot
+            try:
+                snapshot = LeaderboardSnapshot(loader())
+                with self._lock:
+                    self._snapshots[scope] = snapshot
+                    self._snapshots.move_to_end(scope)
+                    while len(self._snapshots) > self.max_scopes:
+                        self._snapshots.popitem(last=False)
+            finally:
+                with self._lock:
+                    self._building.pop(scope, None)
+            return snapshot
+
+    def invalidate(self, scope=None):
+        with self._lock:
+            if scope is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(scope, None)
+
+    def stats(self):
+        with self._lock:
+            return {'scopes': len(self._snapshots), 'hits': self.hits, 'misses': self.misses, 'ttl': self.ttl}
+
+
+def family_scope(parent_id):
+    return f'family:{parent_id}'
+
+
+def first_parent_id(user_id):
+    """The guardian a child was linked to first, used when only the child is known"""
+    return db.session.execute(
+        db.select(ParentChild.parent_id).where(ParentChild.child_id == user_id).order_by(ParentChild.id).limit(1)
+    ).scalar()
+
+
+def load_scores(parent_id=None):
+    """(user_id, username, total_stars) for every child, or a parent's children.
+
+    Children without a ChildStats row yet are listed with 0 stars.
+    """
+    query = db.select(User.id, User.username, db.func.coalesce(ChildStats.total_stars, 0))\
+              .outerjoin(ChildStats, ChildStats.user_id == User.id)\
+              .where(User.role == 'child')
+    if parent_id is not None:
+        query = query.where(User.id.in_(db.select(ParentChild.child_id).where(ParentChild.parent_id == parent_id)))
+    return [tuple(row) for row in db.session.execute(query)]
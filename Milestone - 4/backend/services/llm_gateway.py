@@ -0,0 +1,395 @@
+# llm_gateway.py - Shared gateway for every LLM call made by the backend
+import json
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+FAKE_REPLY = "I'm here for you! Tell me more about how your day is going. [MOOD: neutral]"
+
+
+class LLMError(Exception):
+    """An LLM call failed; `retryable` says whether trying again may help"""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class LLMTimeout(LLMError):
+    """The call's deadline passed before any provider answered"""
+
+
+class CircuitOpenError(LLMError):
+    """Every provider on the route is currently tripped"""
+
+
+class LLMResult:
+    def __init__(self, content, provider, model, latency):
+        self.content = content
+        self.provider = provider
+        self.model = model
+        self.latency = latency
+
+
+class CircuitBreaker:
+    """Stops calling a provider after repeated failures.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    calls are refused for `reset_timeout` seconds. It then lets a single
+    trial call through (half-open) and closes again if that call succeeds.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """End a call that neither succeeded nor failed (e.g. a stream the client aborted)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies for one provider on one route"""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct, min_samples=20):
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))]
+
+
+class HTTPProvider:
+    """OpenAI-compatible chat-completions endpoint (Groq, OpenRouter, ...).
+
+    Uses one requests.Session per provider so TCP/TLS connections are kept
+    alive and reused across calls instead of reconnecting every time.
+    """
+
+    def __init__(self, name, api_url, api_key, pool_size=10):
+        self.name = name
+        self.api_url = api_url
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _post(self, payload, timeout, stream=False):
+        try:
+            response = self.session.post(self.api_url, json=payload, timeout=timeout, stream=stream)
+        except requests.Timeout as e:
+            raise LLMTimeout(f"{self.name} timed out: {e}")
+        except requests.RequestException as e:
+            raise LLMError(f"{self.name} request failed: {e}")
+
+        if response.status_code != 200:
+            retryable = response.status_code == 429 or response.status_code >= 500
+            raise LLMError(f"{self.name} API Error: {response.status_code} - {response.text[:200]}",
+                           retryable=retryable)
+        return response
+
+    def complete(self, payload, timeout):
+        response_data = self._post(payload, timeout).json()
+        choices = response_data.get('choices') or []
+        content = choices[0].get('message', {}).get('content') if choices else None
+        if not content:
+            raise LLMError(f"{self.name} returned an empty response")
+        return content
+
+    def stream(self, payload, timeout):
+        response = self._post({**payload, 'stream': True}, timeout, stream=True)
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                choices = json.loads(data).get('choices') or []
+                delta = choices[0].get('delta', {}).get('content') if choices else None
+                if delta:
+                    yield delta
+
+
+class FakeProvider:
+    """Offline stand-in for an LLM provider, for tests and local development.
+
+    Answers with `reply` after `latency` seconds. The first `fail_times`
+    calls raise an error instead, which makes retries, failover and the
+    circuit breaker easy to exercise without network access.
+    """
+
+    def __init__(self, name='fake', reply=FAKE_REPLY, latency=0.0, token_delay=0.0, fail_times=0):
+        self.name = name
+        self.reply = reply
+        self.latency = latency
+        self.token_delay = token_delay
+        self.fail_times = fail_times
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _start_call(self, timeout):
+        with self._lock:
+            self.calls += 1
+            should_fail = self.calls <= self.fail_times
+        time.sleep(min(self.latency, timeout))
+        if self.latency > timeout:
+            raise LLMTimeout(f"{self.name} timed out")
+        if should_fail:
+            raise LLMError(f"{self.name} simulated failure")
+
+    def complete(self, payload, timeout):
+        self._start_call(timeout)
+        return self.reply
+
+    def stream(self, payload, timeout):
+        self._start_call(timeout)
+        for index in range(0, len(self.reply), 4):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield self.reply[index:index + 4]
+
+
+class LLMGateway:
+    """Routes LLM calls to providers with deadlines, retries and hedging.
+
+    A route is an ordered list of (provider name, model) pairs. Each call
+    gets an overall deadline; failed attempts are retried with jittered
+    exponential backoff and then fail over to the next provider. With
+    hedging enabled, the next provider is also fired if the first one has
+    not answered within its observed p95 latency, and whichever answers
+    first wins. Latencies are tracked per route, since routes ask for very
+    different reply lengths, and hedging can be limited to `hedge_routes`
+    (None means every route). Providers that keep failing are skipped by
+    their circuit breaker until it resets.
+    """
+
+    def __init__(self, providers, routes, max_retries=2, backoff_base=0.25, backoff_max=2.0,
+                 hedge=True, hedge_default_delay=3.0, failure_threshold=5, reset_timeout=30.0,
+                 max_workers=16, hedge_routes=None):
+        self.providers = providers
+        self.routes = routes
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_default_delay = hedge_default_delay
+        self.hedge_routes = set(hedge_routes) if hedge_routes is not None else None
+        self.breakers = {name: CircuitBreaker(failure_threshold, reset_timeout) for name in providers}
+        self.latencies = {(route, name): LatencyTracker()
+                          for route, candidates in routes.items() for name, _ in candidates if name in providers}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-gateway')
+
+    def _candidates(self, route):
+        if route not in self.routes:
+            raise LLMError(f"Unknown LLM route: {route}", retryable=False)
+        return [(name, model) for name, model in self.routes[route] if name in self.providers]
+
+    def _backoff(self, attempt, deadline_at):
+        # Full jitter: sleep a random amount up to the exponential cap
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        time.sleep(max(0.0, min(delay, deadline_at - time.monotonic())))
+
+    def _call_provider(self, route, name, model, messages, params, deadline_at):
+        """Call one provider, retrying retryable failures until the deadline"""
+        provider = self.providers[name]
+        breaker = self.breakers[name]
+        payload = {'model': model, 'messages': messages, **params}
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            if not breaker.allow():
+                # Tripped by our own failed attempts: report what actually went wrong
+                raise last_error or CircuitOpenError(f"Circuit open for {name}")
+            started = time.monotonic()
+            try:
+                content = provider.complete(payload, timeout=remaining)
+            except LLMError as e:
+                breaker.record_failure()
+                last_error = e
+                if not e.retryable:
+                    raise
+                self._backoff(attempt, deadline_at)
+                continue
+            except Exception as e:
+                breaker.record_failure()
+                raise LLMError(f"{name} failed: {e}", retryable=False)
+            latency = time.monotonic() - started
+            breaker.record_success()
+            self.latencies[(route, name)].record(latency)
+            return LLMResult(content, name, model, latency)
+        raise last_error or LLMTimeout(f"{name} did not answer before the deadline")
+
+    def _hedges(self, route):
+        return self.hedge and (self.hedge_routes is None or route in self.hedge_routes)
+
+    def _hedge_delay(self, route, name):
+        p95 = self.latencies[(route, name)].percentile(95)
+        return p95 if p95 is not None else self.hedge_default_delay
+
+    def complete(self, route, messages, deadline=30.0, hedge=None, **params):
+        """Run a chat completion on `route` and return an LLMResult"""
+        candidates = [c for c in self._candidates(route) if self.breakers[c[0]].state != 'open']
+        if not candidates:
+            raise CircuitOpenError(f"No LLM provider available for route '{route}'")
+
+        hedge = self._hedges(route) if hedge is None else hedge
+        deadline_at = time.monotonic() + deadline
+        pending = set()
+        errors = []
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            name, model = candidates[next_index]
+            next_index += 1
+            pending.add(self._executor.submit(self._call_provider, route, name, model, messages, params,
+                                              deadline_at))
+
+        launch()
+        hedge_at = None
+        if hedge and len(candidates) > 1:
+            hedge_at = time.monotonic() + self._hedge_delay(route, candidates[0][0])
+
+        while True:
+            now = time.monotonic()
+            if now >= deadline_at:
+                raise LLMTimeout(f"LLM route '{route}' missed its {deadline}s deadline")
+            timeout = deadline_at - now if hedge_at is None else max(0.0, min(deadline_at, hedge_at) - now)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                errors.append(future.exception())
+
+            hedge_due = hedge_at is not None and time.monotonic() >= hedge_at
+            if (hedge_due or not pending) and next_index < len(candidates):
+                launch()
+                hedge_at = None
+            elif not pending:
+                raise errors[-1] if errors else LLMError(f"All providers failed for route '{route}'")
+
+    def stream(self, route, messages, deadline=30.0, **params):
+        """Yield reply text as it arrives, failing over only before the first token"""
+        deadline_at = time.monotonic() + deadline
+        last_error = None
+        for name, model in self._candidates(route):
+            breaker = self.breakers[name]
+            if not breaker.allow():
+                continue
+            payload = {'model': model, 'messages': messages, **params}
+            started = time.monotonic()
+            received_any = False
+            try:
+                for delta in self.providers[name].stream(payload, timeout=max(0.1, deadline_at - time.monotonic())):
+                    received_any = True
+                    yield delta
+            except Exception as e:
+                breaker.record_failure()
+                if received_any:
+                    raise
+                last_error = e
+                continue
+            except BaseException:
+                # GeneratorExit when the client disconnects: not the provider's fault, but a
+                # half-open trial must be released or the circuit would never close again
+                breaker.release_trial()
+                raise
+            breaker.record_success()
+            self.latencies[(route, name)].record(time.monotonic() - started)
+            return
+        raise last_error or CircuitOpenError(f"No LLM provider available for route '{route}'")
+
+    def stats(self):
+        return {
+            name: {
+                'circuit': self.breakers[name].state,
+                'p95_latency': {route: tracker.percentile(95)
+                                for (route, provider), tracker in self.latencies.items() if provider == name}
+            } for name in self.providers
+        }
+
+
+def create_gateway(config):
+    """Build the gateway from app config; LLM_FAKE_PROVIDER swaps in offline fakes"""
+    routes = config['LLM_ROUTES']
+    provider_names = {name for route in routes.values() for name, _ in route}
+    if config.get('LLM_FAKE_PROVIDER'):
+        providers = {name: FakeProvider(name, latency=config.get('LLM_FAKE_LATENCY', 0.0))
+                     for name in provider_names}
+    else:
+        endpoints = {
+            'groq': (config['GROQ_API_URL'], config['GROQ_API_KEY']),
+            'openrouter': (config['OPENROUTER_API_URL'], config['OPENROUTER_API_KEY'])
+        }
+        providers = {name: HTTPProvider(name, *endpoints[name], pool_size=config['LLM_MAX_WORKERS'])
+                     for name in provider_names}
+    return LLMGateway(
+        providers, routes,
+        max_retries=config['LLM_MAX_RETRIES'],
+        hedge=config['LLM_HEDGE_ENABLED'],
+        hedge_default_delay=config['LLM_HEDGE_DEFAULT_DELAY'],
+        hedge_routes=config['LLM_HEDGE_ROUTES'],
+        failure_threshold=config['LLM_BREAKER_FAILURES'],
+        reset_timeout=config['LLM_BREAKER_RESET_SECONDS'],
+        max_workers=config['LLM_MAX_WORKERS'] * 2
+    )
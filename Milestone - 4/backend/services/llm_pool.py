@@ -0,0 +1,51 @@
+# llm_pool.py - Bounded worker pool for outbound LLM calls
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class LLMPoolBusy(RuntimeError):
+    """Raised when every LLM worker slot is taken for longer than allowed"""
+
+
+class BoundedExecutor:
+    """Thread pool that caps how many LLM calls can be running or queued.
+
+    A plain ThreadPoolExecutor has an unbounded queue, so a burst of chats
+    would pile up behind a slow provider. Here every submission takes a slot
+    first and gives it back when the call finishes; if no slot frees up
+    within `wait` seconds the caller gets LLMPoolBusy instead.
+    """
+
+    def __init__(self, max_workers, max_queue=0, thread_name_prefix='llm'):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix=thread_name_prefix)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+
+    def _acquire(self, wait):
+        if not self._slots.acquire(timeout=wait):
+            raise LLMPoolBusy("All LLM workers are busy, please try again shortly")
+
+    def submit(self, fn, *args, wait=None, **kwargs):
+        """Submit a call to the pool, waiting at most `wait` seconds for a slot"""
+        self._acquire(wait)
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    @contextmanager
+    def slot(self, wait=None):
+        """Hold a slot while running an LLM call on the current thread (e.g. streaming)"""
+        self._acquire(wait)
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,27 @@
+# pagination.py - Keyset (cursor) pagination helpers
+import base64
+from datetime import datetime
+
+
+def encode_cursor(timestamp, row_id):
+    """Encode a (timestamp, id) sort key into an opaque URL-safe cursor"""
+    raw = f"{timestamp.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        timestamp, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def parse_limit(value, default=20, maximum=100):
+    """Clamp a `limit` query parameter to 1..maximum"""
+    if value is None:
+        return default
+    return max(1, min(int(value), maximum))
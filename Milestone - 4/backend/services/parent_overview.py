@@ -0,0 +1,76 @@
+# parent_overview.py - Every linked child's dashboard figures in a fixed number of queries
+from datetime import date
+
+from models import db, ChildStats, HealthTask, LoginStreak, ParentChild, User, WaterLog
+from services.child_stats import dashboard_stats, rebuild_child_stats
+
+
+def parent_children(parent_id):
+    """(child User, relationship_type) pairs linked to a parent, oldest link first"""
+    return db.session.execute(
+        db.select(User, ParentChild.relationship_type)
+        .join(ParentChild, ParentChild.child_id == User.id)
+        .where(ParentChild.parent_id == parent_id)
+        .order_by(ParentChild.id)
+    ).all()
+
+
+def _by_user(query):
+    return {row.user_id: row for row in db.session.execute(query)}
+
+
+def children_overview(children, today=None):
+    """Dashboard, health and login figures for many children at once.
+
+    Every table is read with one IN (...) query (GROUP BY user_id where
+    rows need counting), so the number of queries doesn't grow with the
+    number of children. Children without a ChildStats row are rebuilt in
+    one batch.
+    """
+    today = today or date.today()
+    child_ids = list(dict.fromkeys(child.id for child, _ in children))
+    if not child_ids:
+        return []
+
+    stats = {row.user_id: row for row in ChildStats.query.filter(ChildStats.user_id.in_(child_ids))}
+    missing = [child_id for child_id in child_ids if child_id not in stats]
+    if missing:
+        rebuild_child_stats(missing, today)
+        stats.update((row.user_id, row) for row in ChildStats.query.filter(ChildStats.user_id.in_(missing)))
+
+    logins = _by_user(db.select(LoginStreak.user_id, LoginStreak.current_streak, LoginStreak.total_logins,
+                                LoginStreak.longest_streak, LoginStreak.last_login_date)
+                      .where(LoginStreak.user_id.in_(child_ids)))
+    water = _by_user(db.select(WaterLog.user_id, db.func.max(WaterLog.count).label('glasses'))
+                     .where(WaterLog.user_id.in_(child_ids), WaterLog.date == today)
+                     .group_by(WaterLog.user_id))
+    health_tasks = _by_user(db.select(HealthTask.user_id,
+                                      db.func.count(HealthTask.id).label('total'),
+                                      db.func.sum(db.case((HealthTask.completed.is_(True), 1), else_=0)).label('completed'))
+                            .where(HealthTask.user_id.in_(child_ids), HealthTask.date == today)
+                            .group_by(HealthTask.user_id))
+
+    overview = []
+    for child, relationship_type in children:
+        child_stats = stats[child.id]
+        login = logins.get(child.id)
+        tasks = health_tasks.get(child.id)
+        overview.append({
+            'user_id': child.id,
+            'username': child.username,
+            'relationship_type': relationship_type,
+            'stats': dashboard_stats(child_stats, today),
+            'health': {
+                'streak': child_stats.health_streak,
+                'water_count': water[child.id].glasses if child.id in water else 0,
+                'tasks_completed': tasks.completed if tasks else 0,
+                'tasks_total': tasks.total if tasks else 0
+            },
+            'login_streak': {
+                'current_streak': login.current_streak if login else 0,
+                'total_logins': login.total_logins if login else 0,
+                'longest_streak': login.longest_streak if login else 0,
+                'last_login_date': login.last_login_date.isoformat() if login and login.last_login_date else None
+            }
+        })
+    return overview
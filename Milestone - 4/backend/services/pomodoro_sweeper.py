@@ -0,0 +1,48 @@
+# pomodoro_sweeper.py - Close Pomodoro sessions left open by a closed tab
+from models import db, PomodoroSession
+from services.dialect import seconds_between
+from services.study_time import reopen_rollup
+
+# Backfill for databases created before last_active_at existed
+LAST_ACTIVE_BACKFILL = """
+    UPDATE pomodoro_session SET last_active_at = COALESCE(start_time, end_time)
+    WHERE last_active_at IS NULL AND (start_time IS NOT NULL OR end_time IS NOT NULL)
+"""
+
+
+def close_stale_sessions(now, stale_after, max_unrecorded):
+    """Finish every open session with no start, pause or resume for `stale_after`.
+
+    Two bulk UPDATEs over the partial index on open sessions: a running
+    session is credited with the time since its last (re)start, capped at
+    `max_unrecorded`, since the tab may have closed at any point after it;
+    a paused session keeps the work it already recorded. Both get end_time
+    `now` and stay completed=False, like an abandoned session. Returns the
+    number of sessions closed (not committed).
+    """
+    cutoff = now - stale_after
+    stale = db.and_(PomodoroSession.end_time.is_(None),
+                    db.or_(PomodoroSession.last_active_at.is_(None), PomodoroSession.last_active_at < cutoff))
+
+    # Study-time days already rolled up must be recomputed with the new durations
+    # (running and paused alike, by the day they are counted on)
+    first_start = db.session.query(db.func.min(PomodoroSession.started_at)).filter(stale).scalar()
+    if first_start:
+        reopen_rollup(first_start.date())
+
+    cap = int(max_unrecorded.total_seconds())
+    elapsed = seconds_between(PomodoroSession.start_time, now)
+    running = PomodoroSession.query.filter(stale, PomodoroSession.start_time.isnot(None)).update({
+        'work_duration': db.func.coalesce(PomodoroSession.work_duration, 0)
+                         + db.case((elapsed > cap, cap), (elapsed < 0, 0), else_=elapsed),
+        'break_duration': db.func.coalesce(PomodoroSession.break_duration, 0),
+        'end_time': now,
+        'completed': False
+    }, synchronize_session=False)
+    paused = PomodoroSession.query.filter(stale, PomodoroSession.start_time.is_(None)).update({
+        'work_duration': db.func.coalesce(PomodoroSession.work_duration, 0),
+        'break_duration': db.func.coalesce(PomodoroSession.break_duration, 0),
+        'end_time': now,
+        'completed': False
+    }, synchronize_session=False)
+    return running + paused
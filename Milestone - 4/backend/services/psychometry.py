@@ -1,5 +1,4 @@
 # psychometry.py - Assessment Engine Module (FIXED)
-import requests
 import json
 import time
 import random
@@ -139,13 +138,9 @@ class AssessmentEngine:
         return results
 
 class QuestionGenerator:
-    def __init__(self, api_key, api_url):
-        self.api_key = api_key
-        self.api_url = api_url
-        self.headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
+    def __init__(self, llm_gateway):
+        # Shared LLM gateway (services/llm_gateway.py) - pooled, with retries and failover
+        self.llm_gateway = llm_gateway
         
     def generate_complete_test(self):
         """Generate all test questions at once using AI"""
@@ -191,35 +186,23 @@ class QuestionGenerator:
 
             prompt += f"\n\n[Random Seed: {random.randint(1, 10000)}]"
 
-            payload = {
-                "model": "mistralai/mistral-small-3.2-24b-instruct:free",
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "max_tokens": 2000,
-                "temperature": 1.2,
-                "top_p": 0.8
-            }
+            messages = [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
             
             print("Generating complete assessment test with AI...")
-            response = requests.post(self.api_url, headers=self.headers, json=payload, timeout=60)
-            
-            if response.status_code == 200:
-                response_data = response.json()
-                if 'choices' in response_data and len(response_data['choices']) > 0:
-                    generated_text = response_data['choices'][0]['message']['content']
-                    if generated_text:
-                        questions = self.parse_complete_test(generated_text)
-                        if len(questions) >= 10:  # Ensure we have enough questions
-                            print(f"AI generated {len(questions)} assessment questions successfully!")
-                            return questions
-                        else:
-                            print("AI didn't generate enough questions, using fallback...")
+            result = self.llm_gateway.complete('psychometry', messages, deadline=60,
+                                               max_tokens=2000, temperature=1.2, top_p=0.8)
+            print(f"Assessment questions generated by {result.provider} in {result.latency:.1f}s")
+            questions = self.parse_complete_test(result.content)
+            if len(questions) >= 10:  # Ensure we have enough questions
+                print(f"AI generated {len(questions)} assessment questions successfully!")
+                return questions
             else:
-                print(f"OpenRouter API Error: {response.status_code} - {response.text}")
+                print("AI didn't generate enough questions, using fallback...")
                 
         except Exception as e:
             print(f"Error generating AI questions: {e}")
@@ -660,27 +643,16 @@ class QuestionGenerator:
 
     Make it personal and actionable for the child and their parents.Try not to use the name of the child in the response.Only wishes is necessary"""
 
-            payload = {
-                "model": "mistralai/mistral-small-3.2-24b-instruct:free",
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "max_tokens": 500,
-                "temperature": 1.0,
-                "top_p": 0.8
-            }
-
-            response = requests.post(self.api_url, headers=self.headers, json=payload, timeout=30)
-
-            if response.status_code == 200:
-                response_data = response.json()
-                if 'choices' in response_data and len(response_data['choices']) > 0:
-                    feedback = response_data['choices'][0]['message']['content']
-                    if feedback:
-                        return feedback.strip()
+            messages = [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+
+            result = self.llm_gateway.complete('psychometry', messages, deadline=30,
+                                               max_tokens=500, temperature=1.0, top_p=0.8)
+            return result.content.strip()
 
         except Exception as e:
             print(f"Error generating AI feedback: {e}")
@@ -750,10 +722,8 @@ class QuestionGenerator:
         return feedback
 
 class PsychometryService:
-    def __init__(self, api_key, api_url):
-        self.api_key = api_key
-        self.api_url = api_url
-        self.question_generator = QuestionGenerator(api_key, api_url)
+    def __init__(self, llm_gateway):
+        self.question_generator = QuestionGenerator(llm_gateway)
         self.assessment_engine = None
         
     def initialize_assessment(self):
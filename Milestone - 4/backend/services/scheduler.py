@@ -0,0 +1,95 @@
+# scheduler.py - Minimal in-process scheduler for periodic maintenance jobs
+import threading
+import time
+import traceback
+
+
+class PeriodicJob:
+    """Runs `func` every `interval` seconds on a daemon thread.
+
+    The first run happens after `initial_delay` seconds. A failing run is
+    logged and the job keeps its schedule. stop() wakes the thread
+    straight away instead of waiting out the interval.
+    """
+
+    def __init__(self, name, interval, func, initial_delay=None):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.initial_delay = interval if initial_delay is None else initial_delay
+        self.last_run = None
+        self.last_result = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=f'job-{self.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def run_once(self):
+        started = time.time()
+        try:
+            self.last_result = self.func()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"❌ Job {self.name} failed: {e}")
+            traceback.print_exc()
+        finally:
+            self.last_run = started
+        return self.last_result
+
+    def _loop(self):
+        if self._stop.wait(self.initial_delay):
+            return
+        while True:
+            self.run_once()
+            if self._stop.wait(self.interval):
+                return
+
+    def status(self):
+        return {
+            'name': self.name,
+            'interval_seconds': self.interval,
+            'running': bool(self._thread and self._thread.is_alive()),
+            'last_run': self.last_run,
+            'last_result': self.last_result,
+            'last_error': self.last_error
+        }
+
+
+class Scheduler:
+    """Registry of periodic jobs that are started and stopped together"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.started = False
+
+    def add_job(self, name, interval, func, initial_delay=None):
+        job = PeriodicJob(name, interval, func, initial_delay)
+        self.jobs[name] = job
+        if self.started:
+            job.start()
+        return job
+
+    def start(self):
+        self.started = True
+        for job in self.jobs.values():
+            job.start()
+
+    def shutdown(self):
+        self.started = False
+        for job in self.jobs.values():
+            job.stop(timeout=5)
+
+    def status(self):
+        return [job.status() for job in self.jobs.values()]
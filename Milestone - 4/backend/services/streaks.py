@@ -0,0 +1,182 @@
+# streaks.py - Login and health streaks computed from per-year day bitmaps
+import calendar
+from datetime import date, datetime, timedelta
+
+from models import db, ActivityCalendar, HealthStreak, LoginStreak
+from services.dialect import insert_for
+
+KINDS = ('login', 'health')
+YEAR_BYTES = 46  # 366 bits
+
+HEALTH_TASKS_PER_DAY = 2  # completed tasks needed for a day to count towards the health streak
+
+
+def _day_bit(day):
+    return day.timetuple().tm_yday - 1
+
+
+def set_active(user_id, kind, day, active=True):
+    """Set or clear one day in a user's calendar (inside the caller's transaction).
+
+    The year's row is created with INSERT ... ON CONFLICT DO NOTHING, so
+    concurrent first logins of a year don't collide, and the bit is written
+    with an UPDATE that only matches the bytes it was computed from; if
+    another request changed them in between, it re-reads and tries again.
+    """
+    key = (ActivityCalendar.user_id == user_id, ActivityCalendar.kind == kind, ActivityCalendar.year == day.year)
+    if active:
+        db.session.execute(insert_for(ActivityCalendar).values(
+            user_id=user_id, kind=kind, year=day.year, days=bytes(YEAR_BYTES), updated_at=datetime.utcnow()
+        ).on_conflict_do_nothing())
+    byte, bit = divmod(_day_bit(day), 8)
+    while True:
+        current = db.session.execute(db.select(ActivityCalendar.days).where(*key)).scalar()
+        if current is None:
+            return
+        days = bytearray(current)
+        if active:
+            days[byte] |= 1 << bit
+        else:
+            days[byte] &= ~(1 << bit) & 0xFF
+        if bytes(days) == current:
+            return
+        updated = db.session.execute(db.update(ActivityCalendar).where(*key, ActivityCalendar.days == current)
+                                     .values(days=bytes(days), updated_at=datetime.utcnow()))
+        if updated.rowcount:
+            return
+
+
+def load_timeline(user_id, kind):
+    """All of a user's calendar years joined into one integer.
+
+    Returns (origin, bits) where bit n means the day with ordinal
+    origin + n was active; (None, 0) when there are no rows.
+    """
+    rows = ActivityCalendar.query.filter_by(user_id=user_id, kind=kind).order_by(ActivityCalendar.year).all()
+    if not rows:
+        return None, 0
+    origin = date(rows[0].year, 1, 1).toordinal()
+    bits = 0
+    for row in rows:
+        bits |= int.from_bytes(row.days, 'little') << (date(row.year, 1, 1).toordinal() - origin)
+    return origin, bits
+
+
+def run_ending_at(bits, position):
+    """Length of the run of set bits ending at `position` (0 if that bit is clear)"""
+    if position < 0 or not (bits >> position) & 1:
+        return 0
+    mask = (1 << (position + 1)) - 1
+    gaps = ~bits & mask
+    return position + 1 - gaps.bit_length()
+
+
+def longest_run(bits):
+    """Longest run of set bits: each AND with a shifted copy shortens every run by one"""
+    length = 0
+    while bits:
+        bits &= bits >> 1
+        length += 1
+    return length
+
+
+def runs(bits):
+    """(start, length) of every run of set bits, lowest first"""
+    while bits:
+        start = (bits & -bits).bit_length() - 1
+        shifted = bits >> start
+        length = (shifted ^ (shifted + 1)).bit_length() - 1
+        yield start, length
+        bits &= ~(((1 << length) - 1) << start)
+
+
+def current_streak(bits, origin, today):
+    """Run ending today, or yesterday while today isn't done yet"""
+    if origin is None:
+        return 0
+    position = today.toordinal() - origin
+    return run_ending_at(bits, position) or run_ending_at(bits, position - 1)
+
+
+def streak_summary(user_id, kind, today=None, history_limit=10):
+    """Current, longest and recent streaks for one kind of activity"""
+    today = today or date.today()
+    origin, bits = load_timeline(user_id, kind)
+    history = []
+    if origin is not None:
+        for start, length in runs(bits):
+            history.append({
+                'start': date.fromordinal(origin + start).isoformat(),
+                'end': date.fromordinal(origin + start + length - 1).isoformat(),
+                'length': length
+            })
+    last_active = date.fromordinal(origin + bits.bit_length() - 1) if bits else None
+    return {
+        'current_streak': current_streak(bits, origin, today),
+        'longest_streak': longest_run(bits),
+        'active_days': bin(bits).count('1'),
+        'last_active_date': last_active.isoformat() if last_active else None,
+        'history': history[::-1][:history_limit]
+    }
+
+
+def heatmap(user_id, kind, year):
+    """Active dates and per-month counts for one calendar year"""
+    row = db.session.get(ActivityCalendar, (user_id, kind, year))
+    bits = int.from_bytes(row.days, 'little') if row else 0
+    months, first = [], 0
+    for month in range(1, 13):
+        length = calendar.monthrange(year, month)[1]
+        months.append(bin((bits >> first) & ((1 << length) - 1)).count('1'))
+        first += length
+    jan_first = date(year, 1, 1)
+    return {
+        'year': year,
+        'active_dates': [(jan_first + timedelta(days=start + offset)).isoformat()
+                         for start, length in runs(bits) for offset in range(length)],
+        'monthly_counts': months,
+        'active_days': sum(months)
+    }
+
+
+def refresh_login_streak(login_streak, today):
+    """Recompute a LoginStreak cache row from the login calendar"""
+    origin, bits = load_timeline(login_streak.user_id, 'login')
+    login_streak.current_streak = current_streak(bits, origin, today)
+    login_streak.longest_streak = max(login_streak.longest_streak or 0, login_streak.current_streak)
+
+
+def refresh_health_streak(user_id, completed_today, today):
+    """Mark today from the completed task count and recompute the HealthStreak cache row.
+
+    Returns the HealthStreak row, or None when the child has never had a
+    health day.
+    """
+    set_active(user_id, 'health', today, completed_today >= HEALTH_TASKS_PER_DAY)
+    origin, bits = load_timeline(user_id, 'health')
+    streak = HealthStreak.query.filter_by(user_id=user_id).first()
+    if streak is None:
+        if not bits:
+            return None
+        streak = HealthStreak(user_id=user_id)
+        db.session.add(streak)
+    streak.current_streak = current_streak(bits, origin, today)
+    streak.last_updated = date.fromordinal(origin + bits.bit_length() - 1) if bits else today
+    return streak
+
+
+def backfill_from_counters():
+    """Seed calendars from the existing streak counters (only the current run is known).
+
+    Used once when the table is introduced. Returns the number of days marked.
+    """
+    marked = 0
+    sources = [('login', LoginStreak, LoginStreak.last_login_date), ('health', HealthStreak, HealthStreak.last_updated)]
+    for kind, model, last_day_column in sources:
+        for user_id, last_day, streak in db.session.query(model.user_id, last_day_column, model.current_streak):
+            if last_day is None:
+                continue
+            for offset in range(max(streak or 0, 1 if kind == 'login' else 0)):
+                set_active(user_id, kind, last_day - timedelta(days=offset))
+                marked += 1
+    return marked
@@ -0,0 +1,152 @@
+# study_time.py - Daily and per-subject Pomodoro study time, with settled days kept in a rollup table
+from datetime import datetime, time, timedelta
+
+from models import db, HomeworkSchedule, PomodoroSession, RollupWatermark, StudyTimeRollup
+from services.dialect import day_of
+
+WATERMARK = 'study_time'
+MAX_RANGE_DAYS = 366
+DEFAULT_RANGE_DAYS = 7
+
+# Sessions from before started_at existed; a paused one has lost its start_time, so use its end
+STARTED_AT_BACKFILL = """
+    UPDATE pomodoro_session SET started_at = COALESCE(start_time, end_time)
+    WHERE started_at IS NULL AND (start_time IS NOT NULL OR end_time IS NOT NULL)
+"""
+
+
+def _started_between(first_day, end_day):
+    """Sessions first started on first_day up to (not including) end_day; uses the started_at indexes.
+
+    started_at, unlike start_time, survives pauses, so a session stays on
+    the day it began however often it is paused and resumed.
+    """
+    return db.and_(PomodoroSession.started_at >= datetime.combine(first_day, time.min),
+                   PomodoroSession.started_at < datetime.combine(end_day, time.min))
+
+
+def _session_buckets(*conditions):
+    """SELECT of per (user, day, task) session totals, in StudyTimeRollup column order"""
+    day = day_of(PomodoroSession.started_at)
+    homework = db.func.coalesce(PomodoroSession.homework_id, 0)
+    return db.select(
+        PomodoroSession.user_id, day, homework,
+        db.func.coalesce(db.func.sum(PomodoroSession.work_duration), 0),
+        db.func.coalesce(db.func.sum(PomodoroSession.break_duration), 0),
+        db.func.count(PomodoroSession.id),
+        db.func.sum(db.case((PomodoroSession.completed.is_(True), 1), else_=0))
+    ).where(PomodoroSession.user_id.isnot(None), *conditions).group_by(PomodoroSession.user_id, day, homework)
+
+
+def rolled_through():
+    """First day not covered by StudyTimeRollup (None before the first rollup)"""
+    mark = db.session.get(RollupWatermark, WATERMARK)
+    return mark.rolled_through if mark else None
+
+
+def reopen_rollup(day):
+    """Move the watermark back to `day` so the next rollup recomputes it (sessions there changed)"""
+    mark = db.session.get(RollupWatermark, WATERMARK)
+    if mark and mark.rolled_through > day:
+        mark.rolled_through = day
+
+
+def reopen_session_day(session):
+    """reopen_rollup() for the day a session is counted on, after its durations changed"""
+    if session.started_at:
+        reopen_rollup(session.started_at.date())
+
+
+def rollup_study_time(today, settle_days):
+    """Move the days before today - settle_days into StudyTimeRollup.
+
+    Starts at the watermark (or the first session on the first run) and
+    rewrites those days from the sessions, so rerunning a range is
+    harmless. Sessions on more recent days can still be paused, resumed or
+    completed and are always read live; one that changes after its day was
+    rolled up moves the watermark back (reopen_session_day). Returns the
+    number of rows written (not committed).
+    """
+    cutoff = today - timedelta(days=settle_days)
+    start = rolled_through()
+    if start is None:
+        first_start = db.session.query(db.func.min(PomodoroSession.started_at)).scalar()
+        start = first_start.date() if first_start else cutoff
+    if start >= cutoff:
+        return 0
+
+    StudyTimeRollup.query.filter(StudyTimeRollup.day >= start, StudyTimeRollup.day < cutoff)\
+                         .delete(synchronize_session=False)
+    result = db.session.execute(db.insert(StudyTimeRollup).from_select(
+        ['user_id', 'day', 'homework_id', 'work_seconds', 'break_seconds', 'sessions', 'completed_sessions'],
+        _session_buckets(_started_between(start, cutoff))))
+
+    mark = db.session.get(RollupWatermark, WATERMARK)
+    if mark is None:
+        mark = RollupWatermark(name=WATERMARK, rolled_through=cutoff)
+        db.session.add(mark)
+    mark.rolled_through = cutoff
+    return result.rowcount
+
+
+def _daily_rows(user_id, start, end, homework_id=None):
+    """(day, homework_id, work, break, sessions, completed) for start..end inclusive.
+
+    Days before the watermark come from StudyTimeRollup, the rest are
+    grouped from the sessions over the (user_id, started_at) index.
+    """
+    boundary = rolled_through()
+    boundary = min(max(boundary, start), end + timedelta(days=1)) if boundary else start
+    rows = []
+    if boundary > start:
+        query = db.select(StudyTimeRollup.day, StudyTimeRollup.homework_id, StudyTimeRollup.work_seconds,
+                          StudyTimeRollup.break_seconds, StudyTimeRollup.sessions,
+                          StudyTimeRollup.completed_sessions)\
+                  .where(StudyTimeRollup.user_id == user_id, StudyTimeRollup.day >= start,
+                         StudyTimeRollup.day < boundary)
+        if homework_id:
+            query = query.where(StudyTimeRollup.homework_id == homework_id)
+        rows.extend(db.session.execute(query).all())
+    if boundary <= end:
+        conditions = [PomodoroSession.user_id == user_id, _started_between(boundary, end + timedelta(days=1))]
+        if homework_id:
+            conditions.append(PomodoroSession.homework_id == homework_id)
+        rows.extend(row[1:] for row in db.session.execute(_session_buckets(*conditions)))
+    return rows
+
+
+def study_time_series(user_id, start, end, homework_id=None):
+    """Per-day buckets (zero-filled) and per-subject totals of work and break seconds"""
+    daily = {}
+    by_homework = {}
+    for day, homework, work, brk, sessions, completed in _daily_rows(user_id, start, end, homework_id):
+        day = day if not isinstance(day, str) else datetime.strptime(day, '%Y-%m-%d').date()
+        for totals in (daily.setdefault(day, [0, 0, 0, 0]), by_homework.setdefault(homework, [0, 0, 0, 0])):
+            totals[0] += work
+            totals[1] += brk
+            totals[2] += sessions
+            totals[3] += completed or 0
+
+    task_ids = [homework for homework in by_homework if homework]
+    subjects = dict(db.session.query(HomeworkSchedule.id, HomeworkSchedule.subject)
+                              .filter(HomeworkSchedule.id.in_(task_ids))) if task_ids else {}
+    by_subject = {}
+    for homework, (work, brk, sessions, completed) in by_homework.items():
+        totals = by_subject.setdefault(subjects.get(homework), [0, 0, 0, 0])
+        totals[0] += work
+        totals[1] += brk
+        totals[2] += sessions
+        totals[3] += completed
+
+    def bucket(totals):
+        work, brk, sessions, completed = totals
+        return {'work_time': work, 'break_time': brk, 'sessions': sessions, 'completed_sessions': completed}
+
+    days = []
+    current = start
+    while current <= end:
+        days.append({'date': current.isoformat(), **bucket(daily.get(current, [0, 0, 0, 0]))})
+        current += timedelta(days=1)
+    subjects_out = [{'subject': subject, **bucket(totals)}
+                    for subject, totals in sorted(by_subject.items(), key=lambda item: -item[1][0])]
+    return days, subjects_out
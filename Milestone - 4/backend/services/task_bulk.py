@@ -0,0 +1,134 @@
+# task_bulk.py - Create, re-status and delete many homework tasks in one transaction
+from collections import defaultdict
+from datetime import date, datetime
+
+from models import db, HomeworkSchedule, ParentChild, PomodoroSession
+from services.child_stats import update_child_stats
+
+OPERATIONS = ('create', 'update_status', 'delete')
+TASK_STATUSES = ('pending', 'in-progress', 'completed')
+
+
+def _task_id(item):
+    task_id = item.get('id')
+    if not isinstance(task_id, int) or isinstance(task_id, bool):
+        raise ValueError('id must be a task id')
+    return task_id
+
+
+def _parse_create(item, allowed_users):
+    user_id = item.get('user_id')
+    if not isinstance(user_id, int) or isinstance(user_id, bool) or user_id not in allowed_users:
+        raise ValueError('Unauthorized: can only create tasks for yourself or your children')
+    task = item.get('task')
+    if not isinstance(task, str) or not task.strip() or len(task) > 255:
+        raise ValueError('task is required (at most 255 characters)')
+    subject = item.get('subject')
+    if subject is not None and (not isinstance(subject, str) or len(subject) > 100):
+        raise ValueError('subject must be text (at most 100 characters)')
+    due_date_str = item.get('due_date')
+    due_date = None
+    if due_date_str and str(due_date_str).strip():
+        try:
+            due_date = date.fromisoformat(str(due_date_str))
+        except ValueError:
+            raise ValueError('Invalid date format. Use YYYY-MM-DD')
+    return {'user_id': user_id, 'subject': subject, 'task': task, 'due_date': due_date}
+
+
+def validate_operations(operations, current_user):
+    """Check every operation in one pass; returns (parsed, errors).
+
+    `parsed` holds (index, op, value) for valid items, where value is the
+    insert row for creates and the task id otherwise. Tasks referenced by
+    updates and deletes are loaded with one query; a user may touch their
+    own tasks and, for parents, those of their linked children. Each task
+    may appear at most once.
+    """
+    allowed_users = {current_user.id}
+    if current_user.role == 'parent':
+        allowed_users.update(child_id for (child_id,) in db.session.query(ParentChild.child_id)
+                                                                    .filter_by(parent_id=current_user.id))
+
+    # Malformed ids (lists, strings, ...) are reported per item below, not looked up
+    referenced = {item['id'] for item in operations
+                  if isinstance(item, dict) and item.get('op') in ('update_status', 'delete')
+                  and isinstance(item.get('id'), int) and not isinstance(item.get('id'), bool)}
+    owners = dict(db.session.query(HomeworkSchedule.id, HomeworkSchedule.user_id)
+                            .filter(HomeworkSchedule.id.in_(referenced))) if referenced else {}
+
+    parsed, errors, seen = [], [], set()
+    for index, item in enumerate(operations):
+        op = item.get('op') if isinstance(item, dict) else None
+        try:
+            if op not in OPERATIONS:
+                raise ValueError(f"op must be one of {', '.join(OPERATIONS)}")
+            if op == 'create':
+                parsed.append((index, op, _parse_create(item, allowed_users)))
+                continue
+            task_id = _task_id(item)
+            if task_id not in owners:
+                raise ValueError('Task not found')
+            if owners[task_id] not in allowed_users:
+                raise ValueError('Unauthorized: can only change your own or your children\'s tasks')
+            if task_id in seen:
+                raise ValueError('Task appears more than once in this request')
+            seen.add(task_id)
+            if op == 'update_status':
+                status = item.get('status')
+                if status not in TASK_STATUSES:
+                    raise ValueError(f"status must be one of {', '.join(TASK_STATUSES)}")
+                parsed.append((index, op, (task_id, status)))
+            else:
+                parsed.append((index, op, task_id))
+        except ValueError as e:
+            errors.append({'index': index, 'op': op, 'success': False, 'error': str(e)})
+    return parsed, errors
+
+
+def apply_operations(parsed):
+    """Write validated operations inside the caller's transaction; returns per-item results.
+
+    Creates are one executemany INSERT ... RETURNING id, status updates one
+    executemany UPDATE by primary key, deletes one DELETE ... IN (sessions
+    keep their study time but lose the task link). ChildStats'
+    completed_tasks moves by one net delta per child.
+    """
+    creates = [(index, row) for index, op, row in parsed if op == 'create']
+    updates = {value[0]: value[1] for _, op, value in parsed if op == 'update_status'}
+    deletes = [task_id for _, op, task_id in parsed if op == 'delete']
+
+    completed_deltas = defaultdict(int)
+    changed = list(updates) + deletes
+    if changed:
+        for task_id, user_id, status in db.session.query(HomeworkSchedule.id, HomeworkSchedule.user_id,
+                                                         HomeworkSchedule.status)\
+                                                  .filter(HomeworkSchedule.id.in_(changed)):
+            new_status = updates.get(task_id)  # None for deletes
+            completed_deltas[user_id] += int(new_status == 'completed') - int(status == 'completed')
+
+    created_ids = []
+    if creates:
+        now = datetime.utcnow()
+        created_ids = db.session.execute(
+            db.insert(HomeworkSchedule).returning(HomeworkSchedule.id, sort_by_parameter_order=True),
+            [{**row, 'status': 'pending', 'created_at': now} for _, row in creates]
+        ).scalars().all()
+    if updates:
+        db.session.execute(db.update(HomeworkSchedule),
+                           [{'id': task_id, 'status': status} for task_id, status in updates.items()])
+    if deletes:
+        PomodoroSession.query.filter(PomodoroSession.homework_id.in_(deletes))\
+                             .update({'homework_id': None}, synchronize_session=False)
+        HomeworkSchedule.query.filter(HomeworkSchedule.id.in_(deletes)).delete(synchronize_session=False)
+
+    for user_id, delta in completed_deltas.items():
+        if delta:
+            update_child_stats(user_id, deltas={'completed_tasks': delta})
+
+    new_ids = iter(created_ids)
+    results = []
+    for index, op, value in parsed:
+        task_id = next(new_ids) if op == 'create' else value[0] if op == 'update_status' else value
+        results.append({'index': index, 'op': op, 'success': True, 'id': task_id})
+    return results
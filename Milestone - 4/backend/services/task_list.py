@@ -0,0 +1,76 @@
+# task_list.py - Homework tasks with their pomodoro session totals in a single query
+from datetime import timedelta
+
+from models import db, HomeworkSchedule, PomodoroSession
+
+MAX_RANGE_DAYS = 366
+
+
+def tasks_with_session_stats(user_id, start=None, end=None, statuses=None):
+    """One user's tasks, earliest due first, each with its aggregated pomodoro sessions.
+
+    Sessions are LEFT JOINed on the homework_id index and summed with
+    GROUP BY, so the whole list is one query however many tasks there are.
+    With `start`/`end` only tasks due in that range are read (over the
+    (user_id, due_date) index; undated tasks are left out), and with
+    `statuses` only tasks in one of those statuses.
+    """
+    query = db.select(
+        HomeworkSchedule,
+        db.func.count(PomodoroSession.id).label('total_sessions'),
+        db.func.sum(db.case((PomodoroSession.completed.is_(True), 1), else_=0)).label('completed_sessions'),
+        db.func.sum(db.case((PomodoroSession.completed.is_(False), 1), else_=0)).label('incomplete_sessions'),
+        db.func.coalesce(db.func.sum(PomodoroSession.work_duration), 0).label('work_seconds'),
+        db.func.coalesce(db.func.sum(PomodoroSession.break_duration), 0).label('break_seconds')
+    ).outerjoin(PomodoroSession, PomodoroSession.homework_id == HomeworkSchedule.id)\
+     .where(HomeworkSchedule.user_id == user_id)\
+     .group_by(HomeworkSchedule.id)\
+     .order_by(HomeworkSchedule.due_date.asc(), HomeworkSchedule.id)
+    if start is not None:
+        query = query.where(HomeworkSchedule.due_date >= start)
+    if end is not None:
+        query = query.where(HomeworkSchedule.due_date <= end)
+    if statuses:
+        query = query.where(HomeworkSchedule.status.in_(statuses))
+    return db.session.execute(query).all()
+
+
+def task_to_dict(row):
+    """Serialize a tasks_with_session_stats() row the way the task list returns it"""
+    task = row.HomeworkSchedule
+    total_work_time = row.work_seconds // 60  # Convert to minutes
+    return {
+        'id': task.id,
+        'subject': task.subject,
+        'task': task.task,
+        'due_date': task.due_date.isoformat() if task.due_date else None,
+        'status': task.status,
+        'created_at': task.created_at.isoformat() if task.created_at else None,
+        'time_spent': total_work_time,
+        'session_stats': {
+            'total_sessions': row.total_sessions,
+            'completed_sessions': row.completed_sessions or 0,
+            'incomplete_sessions': row.incomplete_sessions or 0,
+            'total_work_time': total_work_time,
+            'total_break_time': row.break_seconds // 60
+        }
+    }
+
+
+def tasks_by_day(tasks, start, end):
+    """Serialized tasks grouped per due date, one entry for every day from start to end"""
+    days = {}
+    for task in tasks:
+        days.setdefault(task['due_date'], []).append(task)
+    calendar = []
+    current = start
+    while current <= end:
+        day_tasks = days.get(current.isoformat(), [])
+        calendar.append({
+            'date': current.isoformat(),
+            'tasks': day_tasks,
+            'completed': sum(1 for task in day_tasks if task['status'] == 'completed'),
+            'total': len(day_tasks)
+        })
+        current += timedelta(days=1)
+    return calendar
@@ -0,0 +1,104 @@
+# write_buffer.py - Coalesce high-rate counter increments in memory and write them in batches
+import threading
+import time
+import traceback
+from collections import defaultdict
+
+
+class CoalescingBuffer:
+    """Sums increments per key (e.g. (user_id, day)) and hands them to `flush_func` in batches.
+
+    A flush happens when `max_keys` distinct keys are pending, when the
+    oldest pending increment is `max_age` seconds old (checked on add and
+    by a periodic flush()), or on shutdown. flush_func receives a list of
+    (key, amount) pairs and returns the keys it could not write. Those are
+    merged back and retried, and dropped (counted in `dropped`) after
+    `max_attempts` failed flushes, so one bad key can't hold back the
+    others. If flush_func raises, the whole batch is merged back.
+    """
+
+    def __init__(self, flush_func, max_keys=500, max_age=5.0, max_attempts=3):
+        self.flush_func = flush_func
+        self.max_keys = max_keys
+        self.max_age = max_age
+        self.max_attempts = max_attempts
+        self._pending = defaultdict(float)
+        self._attempts = {}
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.samples = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def add(self, key, amount):
+        self.add_many([(key, amount)])
+
+    def add_many(self, items):
+        """Add (key, amount) pairs under one lock acquisition"""
+        with self._lock:
+            for key, amount in items:
+                self._pending[key] += amount
+                self.samples += 1
+            if self._pending and self._oldest is None:
+                self._oldest = time.monotonic()
+            due = len(self._pending) >= self.max_keys or \
+                (self._oldest is not None and time.monotonic() - self._oldest >= self.max_age)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write everything pending; returns the number of rows handed to flush_func"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending, self._oldest = self._pending, defaultdict(float), None
+            items = list(batch.items())
+            try:
+                failed = set(self.flush_func(items) or ())
+            except Exception:
+                self.failures += 1
+                print(f"❌ Buffered write of {len(items)} rows failed, will retry")
+                traceback.print_exc()
+                with self._lock:
+                    for key, amount in items:
+                        self._pending[key] += amount
+                    if self._oldest is None:
+                        self._oldest = time.monotonic()
+                return 0
+            with self._lock:
+                for key, amount in items:
+                    if key not in failed:
+                        self._attempts.pop(key, None)
+                        continue
+                    attempts = self._attempts.get(key, 0) + 1
+                    if attempts < self.max_attempts:
+                        self._attempts[key] = attempts
+                        self._pending[key] += amount
+                        continue
+                    self._attempts.pop(key, None)
+                    self.dropped += 1
+                    print(f"❌ Dropped buffered write for {key!r} after {attempts} failed attempts")
+                if self._pending and self._oldest is None:
+                    self._oldest = time.monotonic()
+            written = len(items) - len(failed)
+            self.flushes += 1
+            self.failures += bool(failed)
+            self.rows_written += written
+            return written
+
+    def flush_if_due(self):
+        """Periodic hook: flush when the oldest pending increment has waited max_age"""
+        with self._lock:
+            due = self._oldest is not None and time.monotonic() - self._oldest >= self.max_age
+        return self.flush() if due else 0
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {'pending_keys': pending, 'samples': self.samples, 'flushes': self.flushes,
+                'rows_written': self.rows_written, 'failures': self.failures, 'dropped': self.dropped,
+                'max_keys': self.max_keys, 'max_age': self.max_age}
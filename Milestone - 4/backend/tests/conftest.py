@@ -0,0 +1,57 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Configure the app before it is imported: throwaway SQLite file, no jobs, offline LLM
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='kidquest-tests-'), 'test.db')}"
+os.environ['BACKGROUND_JOBS_ENABLED'] = '0'
+os.environ['LLM_FAKE_PROVIDER'] = '1'
+
+
+@pytest.fixture(scope='session')
+def kidquest():
+    os.chdir(BACKEND_DIR)
+    import app as kidquest
+    kidquest.app.config['TESTING'] = True
+    kidquest.initialize_database()
+    return kidquest
+
+
+@pytest.fixture
+def app(kidquest):
+    """App context with every table emptied afterwards"""
+    from models import db
+    with kidquest.app.app_context():
+        yield kidquest.app
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def child(app):
+    """Id of a new child user"""
+    from models import db, User
+    user = User(username='kid', email='kid@example.com', password_hash='x', role='child')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+@pytest.fixture
+def auth_headers(app, monkeypatch):
+    """Builds the Authorization header for a user id"""
+    from flask_jwt_extended import create_access_token
+    monkeypatch.setitem(app.config, 'JWT_VERIFY_SUB', False)  # identities are integer user ids
+    return lambda user_id: {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
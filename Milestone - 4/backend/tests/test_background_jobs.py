@@ -0,0 +1,45 @@
+import pytest
+
+from services.scheduler import Scheduler
+
+
+@pytest.fixture
+def scheduler(kidquest, monkeypatch):
+    """A fresh scheduler whose start() only records that it was called"""
+    scheduler = Scheduler()
+    monkeypatch.setattr(scheduler, 'start', lambda: setattr(scheduler, 'started', True))
+    monkeypatch.setattr(kidquest, 'scheduler', scheduler)
+    monkeypatch.setitem(kidquest.app.config, 'BACKGROUND_JOBS_ENABLED', True)
+    return scheduler
+
+
+def test_first_request_starts_jobs_without_dunder_main(client, scheduler):
+    client.get('/api/leaderboard')
+
+    assert scheduler.started
+    assert {'screen-time-flush', 'dashboard-metrics', 'pomodoro-sweeper', 'study-time-rollup'} <= set(scheduler.jobs)
+
+
+def test_jobs_are_registered_once(kidquest, client, scheduler):
+    client.get('/api/leaderboard')
+    jobs = dict(scheduler.jobs)
+    kidquest.start_background_jobs()
+
+    assert scheduler.jobs == jobs
+
+
+def test_reloader_parent_does_not_start_jobs(kidquest, scheduler, monkeypatch):
+    monkeypatch.setattr(kidquest.app, 'debug', True)
+    monkeypatch.delenv('WERKZEUG_RUN_MAIN', raising=False)
+    kidquest.start_background_jobs()
+    assert not scheduler.started
+
+    monkeypatch.setenv('WERKZEUG_RUN_MAIN', 'true')
+    kidquest.start_background_jobs()
+    assert scheduler.started
+
+
+def test_disabled_jobs_never_start(kidquest, client, scheduler, monkeypatch):
+    monkeypatch.setitem(kidquest.app.config, 'BACKGROUND_JOBS_ENABLED', False)
+    client.get('/api/leaderboard')
+    assert not scheduler.started
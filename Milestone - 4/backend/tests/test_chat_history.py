@@ -0,0 +1,22 @@
+from models import db, ChatSession, LLMInteractions
+
+
+def add_chat(user_id, messages):
+    chat = ChatSession(user_id=user_id)
+    db.session.add(chat)
+    db.session.flush()
+    db.session.add_all(LLMInteractions(session_id=chat.id, user_message=message) for message in messages)
+    return chat.id
+
+
+def test_purge_deletes_only_the_users_sessions_and_interactions(kidquest, child):
+    purged = [add_chat(child, ['hi', 'again']), add_chat(child, ['hello'])]
+    kept = add_chat(child + 1, ['mine'])
+    db.session.commit()
+
+    session_ids, deleted = kidquest.purge_user_chat_history(child)
+    db.session.commit()
+
+    assert (sorted(session_ids), deleted) == (sorted(purged), 3)
+    assert [chat.id for chat in ChatSession.query] == [kept]
+    assert [interaction.user_message for interaction in LLMInteractions.query] == ['mine']
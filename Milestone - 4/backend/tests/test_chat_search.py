@@ -0,0 +1,24 @@
+from models import db, ChatSession, LLMInteractions
+from services import chat_search
+
+
+def test_search_finds_a_users_messages(client, child):
+    chat = ChatSession(user_id=child)
+    db.session.add(chat)
+    db.session.flush()
+    db.session.add(LLMInteractions(session_id=chat.id, user_message='I am worried about school'))
+    db.session.commit()
+
+    response = client.get(f'/api/chat/search?user_id={child}&q=worried')
+
+    assert response.status_code == 200
+    assert [result['session_id'] for result in response.get_json()['results']] == [chat.id]
+
+
+def test_search_without_an_index_is_reported_unavailable(client, child, monkeypatch):
+    monkeypatch.setattr(chat_search, '_available', False)  # e.g. PostgreSQL, where no index is installed
+
+    response = client.get(f'/api/chat/search?user_id={child}&q=worried')
+
+    assert response.status_code == 503
+    assert response.get_json() == {'success': False, 'error': 'Chat search is not available on this database'}
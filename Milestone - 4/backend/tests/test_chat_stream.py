@@ -0,0 +1,40 @@
+import json
+
+from models import db, LLMInteractions
+
+
+def events(stream, count):
+    return [json.loads(next(stream)[len('data: '):]) for _ in range(count)]
+
+
+def test_disconnect_mid_reply_saves_the_partial_reply(kidquest, child):
+    stream = kidquest.stream_chatbot_logic(child, 'Hi there')
+    session_event, first_token = events(stream, 2)
+    stream.close()  # client went away
+
+    interaction = LLMInteractions.query.one()
+    db.session.refresh(interaction)
+    assert first_token['type'] == 'token'
+    assert interaction.llm_response == first_token['content'].strip()
+    assert interaction.mood_tag == 'neutral'
+    assert kidquest.conversation_cache.get(session_event['session_id'])[-1] == \
+        (interaction.id, 'Hi there', interaction.llm_response)
+
+
+def test_disconnect_before_any_reply_marks_the_turn_interrupted(kidquest, child):
+    stream = kidquest.stream_chatbot_logic(child, 'Hi there')
+    events(stream, 1)
+    stream.close()
+
+    interaction = LLMInteractions.query.one()
+    db.session.refresh(interaction)
+    assert interaction.llm_response == kidquest.CHAT_INTERRUPTED_REPLY
+    assert interaction.llm_timestamp is not None
+
+
+def test_finished_stream_saves_the_whole_reply(kidquest, child):
+    stream = list(kidquest.stream_chatbot_logic(child, 'Hi there'))
+    done = json.loads(stream[-1][len('data: '):])
+
+    assert done['type'] == 'done'
+    assert LLMInteractions.query.one().llm_response.startswith(done['response'])
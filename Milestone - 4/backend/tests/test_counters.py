@@ -0,0 +1,31 @@
+from datetime import date
+
+from models import db, HealthRollup, ScreenTime
+from services.counters import add_screen_time_hours, increment_water_count
+from services.health_history import rebuild_rollups
+
+DAY = date(2025, 3, 14)
+
+
+def month_rollup(metric, user_id):
+    row = HealthRollup.query.filter_by(metric=metric, user_id=user_id, period='month').one()
+    return row.total, row.days
+
+
+def test_water_day_is_counted_once(child):
+    assert [increment_water_count(child, DAY) for _ in range(3)] == [1, 2, 3]
+    db.session.commit()
+
+    assert month_rollup('water', child) == (3, 1)
+
+
+def test_screen_time_days_follow_row_creation_not_the_logged_amount(child):
+    add_screen_time_hours(child, DAY, 0.0)  # creates the day's row
+    assert add_screen_time_hours(child, DAY, 0.5) == 0.5  # total equals this increment
+    add_screen_time_hours(child, date(2025, 3, 15), 0.0)
+    db.session.commit()
+    incremental = month_rollup('screen_time', child)
+
+    rebuild_rollups([child])
+    assert incremental == month_rollup('screen_time', child) == (0.5, 2)
+    assert ScreenTime.query.filter_by(user_id=child, date=DAY).one().hours == 0.5
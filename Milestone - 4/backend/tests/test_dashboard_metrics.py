@@ -0,0 +1,37 @@
+from datetime import date, datetime, timedelta
+
+from models import db
+from services.counters import ensure_login_streak, record_login_day
+from services.dashboard_metrics import rollup_dashboard_metrics
+
+MORNING = datetime(2025, 3, 14, 8, 0)
+
+
+def rollup(now):
+    snapshot = rollup_dashboard_metrics(now)
+    db.session.commit()
+    return snapshot.active_kids
+
+
+def test_login_day_is_counted_in_one_snapshot(child):
+    ensure_login_streak(child)
+    assert rollup(MORNING) == 0
+
+    record_login_day(child, MORNING.date(), now=MORNING + timedelta(minutes=5))
+    assert rollup(MORNING + timedelta(hours=1)) == 1
+
+    # Logging in again the same day doesn't make the child active in the next hour's snapshot
+    assert not record_login_day(child, MORNING.date(), now=MORNING + timedelta(hours=1, minutes=30))
+    assert rollup(MORNING + timedelta(hours=2)) == 0
+
+    next_day = MORNING + timedelta(days=1)
+    record_login_day(child, next_day.date(), now=next_day)
+    assert rollup(next_day + timedelta(hours=1)) == 1
+
+
+def test_first_rollup_counts_every_child_who_has_logged_in(child):
+    ensure_login_streak(child)
+    record_login_day(child, date(2025, 1, 2))
+    db.session.commit()
+
+    assert rollup(datetime.utcnow()) == 1
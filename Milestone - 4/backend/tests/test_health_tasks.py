@@ -0,0 +1,26 @@
+from models import db
+from services.health_tasks import DEFAULT_HEALTH_TASKS, HEALTH_TASK_DEDUPE_STATEMENTS
+
+
+def test_task_order_is_the_same_on_the_seeding_call_and_later_calls(client, child):
+    first = client.get(f'/api/health/tasks/{child}').get_json()['tasks']
+    second = client.get(f'/api/health/tasks/{child}').get_json()['tasks']
+
+    assert [task['name'] for task in first] == DEFAULT_HEALTH_TASKS
+    assert first == second
+
+
+def test_dedupe_keeps_oldest_copy_and_any_completion():
+    # A database from before the unique index, which could hold duplicates
+    engine = db.create_engine('sqlite://')
+    with engine.begin() as connection:
+        connection.execute(db.text('CREATE TABLE health_task (id INTEGER PRIMARY KEY, user_id INTEGER, '
+                                   'task_name VARCHAR(100), date DATE, completed BOOLEAN)'))
+        connection.execute(db.text("""INSERT INTO health_task (user_id, task_name, date, completed) VALUES
+                                      (1, 'Yoga', '2025-01-28', 0), (1, 'Yoga', '2025-01-28', 1),
+                                      (1, 'Running', '2025-01-28', NULL), (1, 'Running', '2025-01-28', 0)"""))
+        for statement in HEALTH_TASK_DEDUPE_STATEMENTS:
+            connection.execute(db.text(statement))
+        rows = connection.execute(db.text('SELECT id, task_name, completed FROM health_task ORDER BY id')).all()
+
+    assert [tuple(row) for row in rows] == [(1, 'Yoga', 1), (3, 'Running', None)]
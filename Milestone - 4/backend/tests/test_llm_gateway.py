@@ -0,0 +1,66 @@
+import pytest
+
+from services.llm_gateway import CircuitBreaker, CircuitOpenError, FakeProvider, LLMError, LLMGateway
+
+
+def make_gateway(providers, routes, **options):
+    options.setdefault('backoff_base', 0)
+    return LLMGateway({provider.name: provider for provider in providers}, routes, **options)
+
+
+def test_breaker_opens_after_threshold_and_allows_one_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'half_open'
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial at a time
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_aborted_stream_releases_half_open_trial():
+    provider = FakeProvider('a', reply='hello there, friend')
+    gateway = make_gateway([provider], {'chat': [('a', 'm')]}, failure_threshold=1, reset_timeout=0)
+    breaker = gateway.breakers['a']
+    breaker.record_failure()
+    assert breaker.state == 'half_open'
+
+    stream = gateway.stream('chat', [])
+    assert next(stream) == 'hell'  # the trial is in flight
+    stream.close()  # client disconnected mid-reply
+
+    assert breaker.allow(), "the aborted trial must not keep the circuit stuck"
+
+
+def test_failed_retries_raise_the_provider_error_not_circuit_open():
+    provider = FakeProvider('a', fail_times=10)
+    gateway = make_gateway([provider], {'chat': [('a', 'm')]}, failure_threshold=1, max_retries=2, hedge=False)
+
+    with pytest.raises(LLMError) as excinfo:
+        gateway.complete('chat', [], deadline=5)
+
+    assert not isinstance(excinfo.value, CircuitOpenError)
+    assert 'simulated failure' in str(excinfo.value)
+
+
+def test_hedging_is_limited_to_hedge_routes():
+    slow = FakeProvider('slow', reply='slow', latency=0.3)
+    fast = FakeProvider('fast', reply='fast')
+    routes = {'chat': [('slow', 'm'), ('fast', 'm')], 'psychometry': [('slow', 'm'), ('fast', 'm')]}
+    gateway = make_gateway([slow, fast], routes, hedge_default_delay=0.05, hedge_routes=['chat'])
+
+    assert gateway.complete('chat', [], deadline=5).provider == 'fast'
+    assert gateway.complete('psychometry', [], deadline=5).provider == 'slow'
+    assert fast.calls == 1  # psychometry was not hedged
+
+
+def test_long_route_latencies_do_not_change_other_routes_hedge_delay():
+    routes = {'chat': [('a', 'm'), ('b', 'm')], 'psychometry': [('a', 'm'), ('b', 'm')]}
+    gateway = make_gateway([FakeProvider('a'), FakeProvider('b')], routes, hedge_default_delay=2.0)
+    for _ in range(20):
+        gateway.latencies[('psychometry', 'a')].record(40.0)
+
+    assert gateway._hedge_delay('psychometry', 'a') == 40.0
+    assert gateway._hedge_delay('chat', 'a') == 2.0
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from models import db, PomodoroSession, StudyTimeRollup
+from services.pomodoro_sweeper import close_stale_sessions
+from services.study_time import rolled_through, rollup_study_time, study_time_series
+
+
+def add_session(user_id, started_at, running):
+    """A session started at `started_at` and left open, paused five minutes in unless `running`"""
+    session = PomodoroSession(user_id=user_id, started_at=started_at, work_duration=0 if running else 300,
+                              start_time=started_at if running else None,
+                              last_active_at=started_at if running else started_at + timedelta(minutes=5))
+    db.session.add(session)
+    return session
+
+
+def test_sweeper_reopens_rolled_up_days_of_paused_and_running_sessions(child):
+    now = datetime.utcnow()
+    today = now.date()
+    paused_day = datetime.combine(today - timedelta(days=6), datetime.min.time()) + timedelta(hours=16)
+    running_day = paused_day + timedelta(days=1)
+    add_session(child, paused_day, running=False)
+    add_session(child, running_day, running=True)
+    rollup_study_time(today, settle_days=2)
+    db.session.commit()
+    assert StudyTimeRollup.query.filter_by(user_id=child).count() == 2
+
+    closed = close_stale_sessions(now, stale_after=timedelta(hours=2), max_unrecorded=timedelta(minutes=60))
+    assert closed == 2
+    assert rolled_through() == paused_day.date()  # the paused session's day, not only the running one's
+
+    rollup_study_time(today, settle_days=2)
+    db.session.commit()
+    days, _ = study_time_series(child, paused_day.date(), running_day.date())
+    assert [(day['sessions'], day['work_time']) for day in days] == [(1, 300), (1, 3600)]
+    assert PomodoroSession.query.filter(PomodoroSession.end_time.is_(None)).count() == 0
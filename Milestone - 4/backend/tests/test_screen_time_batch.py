@@ -0,0 +1,47 @@
+from datetime import date
+
+import pytest
+
+from models import ScreenTime
+from services.write_buffer import CoalescingBuffer
+
+DAY = date(2025, 3, 14)
+
+
+@pytest.fixture
+def buffer(kidquest):
+    return CoalescingBuffer(kidquest.write_screen_time_batch, max_keys=1000, max_age=3600)
+
+
+@pytest.mark.parametrize('user_id', [10**20, True, 0, -1, 999999])
+def test_bad_user_ids_are_rejected_before_buffering(client, kidquest, user_id):
+    pending = kidquest.screen_time_buffer.stats()['pending_keys']
+    response = client.post('/api/screen-time/batch',
+                           json={'user_id': user_id, 'samples': [{'duration_seconds': 60}]})
+
+    assert response.status_code == 400
+    assert kidquest.screen_time_buffer.stats()['pending_keys'] == pending
+
+
+def test_a_failing_key_does_not_block_the_others(child, buffer):
+    buffer.add_many([((10**20, DAY), 1.0), ((child, DAY), 0.5)])
+
+    assert buffer.flush() == 1
+    assert ScreenTime.query.filter_by(user_id=child, date=DAY).one().hours == 0.5
+
+    buffer.flush()
+    buffer.flush()
+    stats = buffer.stats()
+    assert (stats['pending_keys'], stats['dropped'], stats['rows_written']) == (0, 1, 1)
+
+
+def test_a_failing_flush_keeps_the_whole_batch():
+    def broken(items):
+        raise RuntimeError('database unavailable')
+    buffer = CoalescingBuffer(broken, max_keys=1000, max_age=3600)
+    buffer.add_many([('a', 1.0), ('b', 2.0)])
+
+    assert buffer.flush() == 0
+    assert buffer.stats()['pending_keys'] == 2
+    buffer.flush_func = lambda items: []
+    assert buffer.flush() == 2
@@ -0,0 +1,35 @@
+from datetime import date
+
+from models import db, ActivityCalendar
+from services.streaks import YEAR_BYTES, heatmap, set_active, streak_summary
+
+DAY = date(2025, 3, 14)
+
+
+def test_first_day_of_year_keeps_a_row_another_login_created(child, monkeypatch):
+    # A concurrent login creates the year's row (with one day set) just after this one looked for it
+    db.session.execute(db.insert(ActivityCalendar).values(user_id=child, kind='login', year=2025,
+                                                          days=b'\x01' + bytes(YEAR_BYTES - 1)))
+    monkeypatch.setattr(db.session, 'get', lambda *args, **kwargs: None)
+    set_active(child, 'login', DAY)
+    monkeypatch.undo()
+    db.session.commit()
+
+    assert heatmap(child, 'login', 2025)['active_dates'] == ['2025-01-01', '2025-03-14']
+
+
+def test_set_and_clear_update_a_loaded_row(child):
+    set_active(child, 'health', DAY)
+    set_active(child, 'health', date(2025, 3, 13))
+    db.session.commit()
+    assert db.session.get(ActivityCalendar, (child, 'health', 2025)) is not None
+
+    set_active(child, 'health', DAY, active=False)
+    db.session.commit()
+    assert heatmap(child, 'health', 2025)['active_dates'] == ['2025-03-13']
+    assert streak_summary(child, 'health', today=date(2025, 3, 13))['current_streak'] == 1
+
+
+def test_clearing_a_day_creates_no_row(child):
+    set_active(child, 'health', DAY, active=False)
+    assert ActivityCalendar.query.count() == 0
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, HomeworkSchedule, PomodoroSession, StudyTimeRollup
+from services.study_time import rolled_through, rollup_study_time, study_time_series
+
+
+@pytest.fixture
+def start_session(client, child, auth_headers):
+    """Starts a Math session for the child through the API, then moves it back to `started_at`"""
+    task = HomeworkSchedule(user_id=child, subject='Math', task='Fractions')
+    db.session.add(task)
+    db.session.commit()
+
+    def start(started_at):
+        response = client.post('/api/pomodoro/start', json={'user_id': child, 'homework_id': task.id},
+                               headers=auth_headers(child))
+        session = db.session.get(PomodoroSession, response.get_json()['session_id'])
+        session.start_time = session.started_at = session.last_active_at = started_at
+        db.session.commit()
+        return session.id
+    return start
+
+
+def test_paused_session_is_in_the_daily_and_subject_series(client, child, start_session):
+    now = datetime.utcnow()
+    session_id = start_session(now - timedelta(minutes=10))
+    assert client.put(f'/api/pomodoro/pause/{session_id}').status_code == 200
+
+    days, subjects = study_time_series(child, now.date(), now.date())
+
+    assert days[0]['sessions'] == 1 and days[0]['work_time'] >= 600
+    assert [(subject['subject'], subject['sessions']) for subject in subjects] == [('Math', 1)]
+
+
+def test_resumed_session_stays_on_the_day_it_began(client, child, start_session):
+    now = datetime.utcnow()
+    session_id = start_session(now - timedelta(days=1))
+    client.put(f'/api/pomodoro/pause/{session_id}')
+    client.put(f'/api/pomodoro/resume/{session_id}')  # start_time is now today
+
+    days, _ = study_time_series(child, now.date() - timedelta(days=1), now.date())
+
+    assert [day['sessions'] for day in days] == [1, 0]
+
+
+def test_rollup_counts_paused_sessions_and_is_reopened_when_they_finish(client, child, auth_headers, start_session):
+    today = datetime.utcnow().date()
+    began = datetime.combine(today - timedelta(days=5), datetime.min.time()) + timedelta(hours=16)
+    session_id = start_session(began)
+    client.put(f'/api/pomodoro/pause/{session_id}')
+    rollup_study_time(today, settle_days=2)
+    db.session.commit()
+
+    row = StudyTimeRollup.query.filter_by(user_id=child, day=began.date()).one()
+    assert row.sessions == 1 and row.work_seconds > 0
+
+    response = client.put(f'/api/pomodoro/complete/{session_id}', json={'work_duration': 1500}, headers=auth_headers(child))
+    assert response.status_code == 200
+    assert rolled_through() == began.date()
+
+    rollup_study_time(today, settle_days=2)
+    db.session.commit()
+    days, _ = study_time_series(child, began.date(), began.date())
+    assert (days[0]['work_time'], days[0]['completed_sessions']) == (1500, 1)
@@ -0,0 +1,95 @@
+import pytest
+
+from models import db, ChildStats, HomeworkSchedule, PomodoroSession
+from services import task_bulk
+from services.child_stats import rebuild_child_stats
+
+
+def add_tasks(user_id, *statuses):
+    tasks = [HomeworkSchedule(user_id=user_id, subject='Math', task=f'Task {n}', status=status)
+             for n, status in enumerate(statuses)]
+    db.session.add_all(tasks)
+    db.session.commit()
+    rebuild_child_stats([user_id])
+    db.session.commit()
+    return [task.id for task in tasks]
+
+
+def snapshot(user_id):
+    db.session.expire_all()
+    tasks = db.session.query(HomeworkSchedule.id, HomeworkSchedule.status).filter_by(user_id=user_id)
+    return sorted(tasks), db.session.get(ChildStats, user_id).completed_tasks
+
+
+def bulk(client, headers, *operations):
+    return client.post('/api/tasks/bulk', json={'operations': list(operations)}, headers=headers)
+
+
+def test_malformed_ids_are_reported_per_item(client, child, auth_headers):
+    user_id, headers = child, auth_headers(child)
+    response = bulk(client, headers,
+                    {'op': 'delete', 'id': [1]},
+                    {'op': 'update_status', 'id': '3', 'status': 'completed'},
+                    {'op': 'delete', 'id': True},
+                    {'op': 'create', 'user_id': [user_id], 'task': 'Read'})
+
+    assert response.status_code == 400
+    assert [(error['index'], error['success']) for error in response.get_json()['results']] == \
+        [(0, False), (1, False), (2, False), (3, False)]
+
+
+def test_true_is_not_user_id_1():
+    with pytest.raises(ValueError):
+        task_bulk._parse_create({'user_id': True, 'task': 'Read'}, allowed_users={1})
+
+
+def test_one_invalid_operation_writes_nothing(client, child, auth_headers):
+    user_id, headers = child, auth_headers(child)
+    pending, = add_tasks(user_id, 'pending')
+    before = snapshot(user_id)
+
+    response = bulk(client, headers,
+                    {'op': 'create', 'user_id': user_id, 'task': 'Read a chapter'},
+                    {'op': 'update_status', 'id': pending, 'status': 'completed'},
+                    {'op': 'delete', 'id': pending + 1000})
+
+    assert response.status_code == 400
+    assert [error['index'] for error in response.get_json()['results']] == [2]
+    assert snapshot(user_id) == before
+
+
+def test_completed_task_count_moves_by_the_net_change(client, child, auth_headers):
+    user_id, headers = child, auth_headers(child)
+    pending, completed, also_completed = add_tasks(user_id, 'pending', 'completed', 'completed')
+    db.session.add(PomodoroSession(user_id=user_id, homework_id=completed, work_duration=600))
+    db.session.commit()
+
+    response = bulk(client, headers,
+                    {'op': 'update_status', 'id': pending, 'status': 'completed'},
+                    {'op': 'delete', 'id': completed},
+                    {'op': 'update_status', 'id': also_completed, 'status': 'pending'},
+                    {'op': 'create', 'user_id': user_id, 'task': 'Read a chapter', 'due_date': '2025-04-01'})
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['id'] for result in results[:3]] == [pending, completed, also_completed]
+    tasks, completed_count = snapshot(user_id)
+    assert [status for _, status in tasks] == ['completed', 'pending', 'pending']
+    assert completed_count == 1
+    assert PomodoroSession.query.one().homework_id is None  # the session keeps its time, not the task
+
+
+def test_failure_while_writing_rolls_everything_back(client, child, auth_headers, monkeypatch):
+    user_id, headers = child, auth_headers(child)
+    pending, = add_tasks(user_id, 'pending')
+    before = snapshot(user_id)
+
+    def broken_stats(*args, **kwargs):
+        raise RuntimeError('stats unavailable')
+    monkeypatch.setattr(task_bulk, 'update_child_stats', broken_stats)
+    response = bulk(client, headers,
+                    {'op': 'create', 'user_id': user_id, 'task': 'Read a chapter'},
+                    {'op': 'update_status', 'id': pending, 'status': 'completed'})
+
+    assert response.status_code == 500
+    assert snapshot(user_id) == before